@@ -0,0 +1,99 @@
+"""
+Compares the serial WhatsApp Cloud phone-number lookup with the bounded
+fan-out of the SyncEngine against a local fake Graph API server.
+OBS: Run in development environment only, it needs the local '.env' file
+
+Usage: python contrib/benchmark_phone_number_sync.py [apps] [latency_ms]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import django
+
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "marketplace.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from marketplace.core.sync.engine import SyncEngine  # noqa: E402
+from marketplace.core.types.channels.whatsapp.apis import (  # noqa: E402
+    FacebookPhoneNumbersAPI,
+)
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    latency = 0.1
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        phone_number_id = self.path.strip("/").split("/")[-1]
+        body = json.dumps(
+            {
+                "id": phone_number_id,
+                "display_phone_number": "+55 84 99999-9999",
+                "verified_name": "Benchmark",
+            }
+        ).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serial(api: FacebookPhoneNumbersAPI, phone_number_ids: list) -> None:
+    for phone_number_id in phone_number_ids:
+        api.get_phone_number(phone_number_id)
+
+
+def fan_out(api: FacebookPhoneNumbersAPI, phone_number_ids: list) -> None:
+    SyncEngine.from_settings().run(
+        phone_number_ids,
+        fetch=api.get_phone_number,
+        apply=lambda phone_number_id, phone_number: None,
+        key=lambda phone_number_id: "benchmark-token",
+    )
+
+
+def measure(function, *args) -> float:
+    started_at = time.monotonic()
+    function(*args)
+    return time.monotonic() - started_at
+
+
+if __name__ == "__main__":
+    apps = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    FakeGraphHandler.latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 100) / 1000
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGraphHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.WHATSAPP_API_URL = f"http://127.0.0.1:{server.server_port}/v16.0"
+
+    api = FacebookPhoneNumbersAPI("benchmark-token")
+    phone_number_ids = [str(index) for index in range(apps)]
+
+    serial_time = measure(serial, api, phone_number_ids)
+    fan_out_time = measure(fan_out, api, phone_number_ids)
+
+    print(f"apps: {apps}, graph latency: {FakeGraphHandler.latency * 1000:.0f}ms")
+    print(f"serial loop: {serial_time:.2f}s")
+    print(
+        f"sync engine ({settings.WHATSAPP_SYNC_BACKEND}, "
+        f"{settings.WHATSAPP_SYNC_MAX_WORKERS} workers, "
+        f"{settings.WHATSAPP_SYNC_MAX_REQUESTS_PER_TOKEN} per token): {fan_out_time:.2f}s"
+    )
+    print(f"speedup: {serial_time / fan_out_time:.1f}x")
+
+    server.shutdown()
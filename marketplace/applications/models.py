@@ -1,16 +1,96 @@
+import json
+
 from typing import TYPE_CHECKING, Generator
 
-from django.db import models
-from django.db.models import Q
+from django.db import connections, models, transaction
+from django.db.models import Case, F, Func, Q, Value, When
 from django.db.models.constraints import UniqueConstraint
+from django.db.models.functions import Cast
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from marketplace.core.models import AppTypeBaseModel
 
 if TYPE_CHECKING:
+    from marketplace.accounts.models import User
     from marketplace.core.types.base import AppType
 
 
+class JSONMerge(Func):
+    """
+    Shallow merge of two jsonb values, the keys on the right side win
+    """
+
+    arg_joiner = " || "
+    template = "(%(expressions)s)"
+    output_field = models.JSONField()
+
+
+class AppQuerySet(models.QuerySet):
+    def _supports_json_merge(self) -> bool:
+        return connections[self.db].vendor == "postgresql"
+
+    def _get_changes(self, user: "User" = None) -> dict:
+        changes = dict(modified_on=timezone.now())
+        if user is not None:
+            changes["modified_by"] = user
+
+        return changes
+
+    def _merge_expression(self, patch: dict) -> JSONMerge:
+        return JSONMerge(
+            F("config"), Cast(Value(json.dumps(patch)), models.JSONField())
+        )
+
+    def patch_config(self, patch: dict, user: "User" = None) -> int:
+        """
+        Sets the `patch` keys on the config of every app of the queryset without
+        touching the other keys, returns the amount of patched apps
+        """
+        if self._supports_json_merge():
+            return self.update(
+                config=self._merge_expression(patch), **self._get_changes(user)
+            )
+
+        return self.bulk_patch_config(
+            {pk: patch for pk in self.values_list("pk", flat=True)}, user
+        )
+
+    def bulk_patch_config(self, patches: dict, user: "User" = None) -> int:
+        """
+        Applies a distinct config patch per app, `patches` maps the app pk to its
+        patch. Postgres merges the patches in a single UPDATE, other databases
+        lock the rows and write only the changed columns.
+        """
+        if not patches:
+            return 0
+
+        changes = self._get_changes(user)
+        apps = self.filter(pk__in=patches.keys())
+
+        if self._supports_json_merge():
+            changes["config"] = Case(
+                *[
+                    When(pk=pk, then=self._merge_expression(patch))
+                    for pk, patch in patches.items()
+                ],
+                default=F("config"),
+                output_field=models.JSONField(),
+            )
+            return apps.update(**changes)
+
+        with transaction.atomic(using=self.db):
+            locked_apps = list(apps.select_for_update())
+
+            for app in locked_apps:
+                app.config.update(patches[app.pk])
+                for field, value in changes.items():
+                    setattr(app, field, value)
+
+            self.bulk_update(locked_apps, ["config", *changes.keys()])
+            return len(locked_apps)
+
+
 class App(AppTypeBaseModel):
     name: str = None
     description: str = None
@@ -34,6 +114,8 @@ class App(AppTypeBaseModel):
     flow_object_uuid = models.UUIDField(null=True, unique=True)
     configured = models.BooleanField(default=False)
 
+    objects = models.Manager.from_queryset(AppQuerySet)()
+
     class Meta:
         verbose_name = _("App")
         verbose_name_plural = _("Apps")
@@ -51,6 +133,17 @@ class App(AppTypeBaseModel):
         self.flows_type_code = app_type.flows_type_code
         # TODO: Add `icon` property
 
+    def patch_config(self, patch: dict, user: "User" = None) -> None:
+        """
+        Writes only the `patch` keys of the config, keeping the keys changed
+        concurrently by other syncs of the same app
+        """
+        App.objects.filter(pk=self.pk).patch_config(patch, user)
+        self.config.update(patch)
+
+        if user is not None:
+            self.modified_by = user
+
 
 class AppTypeAsset(AppTypeBaseModel):
     ASSET_TYPE_IMAGE_BANNER = "IB"
@@ -54,6 +54,63 @@ class TestModelApp(TestCase):
         self.assertEqual(str(self.app), self.app_data["code"])
 
 
+class TestAppConfigPatch(TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.user = User.objects.create_superuser(
+            email="admin@marketplace.ai", password="fake@pass#$"
+        )
+        self.apps = [
+            App.objects.create(
+                config=dict(title=str(index), waba={"id": index}),
+                project_uuid=uuid.uuid4(),
+                platform=App.PLATFORM_WENI_FLOWS,
+                code="wpp-cloud",
+                created_by=self.user,
+            )
+            for index in range(2)
+        ]
+
+    def test_patch_config_keeps_the_other_keys(self):
+        app = self.apps[0]
+
+        # Simulates a concurrent sync writing another key of the same app
+        App.objects.filter(pk=app.pk).update(
+            config=dict(title="0", waba={"id": 0}, phone_number={"id": "1"})
+        )
+        app.patch_config({"waba": {"id": "updated"}}, user=self.user)
+
+        app.refresh_from_db()
+        self.assertEqual(
+            app.config,
+            dict(title="0", waba={"id": "updated"}, phone_number={"id": "1"}),
+        )
+        self.assertEqual(app.modified_by, self.user)
+
+    def test_queryset_patch_config(self):
+        patched = App.objects.filter(code="wpp-cloud").patch_config({"title": "new"})
+
+        self.assertEqual(patched, 2)
+        for app in App.objects.filter(code="wpp-cloud"):
+            self.assertEqual(app.config["title"], "new")
+            self.assertIn("waba", app.config)
+
+    def test_bulk_patch_config(self):
+        patched = App.objects.bulk_patch_config(
+            {app.pk: {"title": f"new {app.pk}"} for app in self.apps}, self.user
+        )
+
+        self.assertEqual(patched, 2)
+        for app in self.apps:
+            app.refresh_from_db()
+            self.assertEqual(app.config["title"], f"new {app.pk}")
+            self.assertEqual(app.config["waba"], {"id": self.apps.index(app)})
+
+    def test_bulk_patch_config_without_patches(self):
+        self.assertEqual(App.objects.bulk_patch_config({}), 0)
+
+
 @override_settings(USE_S3=False)
 class TestModelAppTypeAsset(TestCase):
     def setUp(self):
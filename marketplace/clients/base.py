@@ -19,9 +19,9 @@ class RequestClient:
                 "Cannot use both 'data' and 'json' arguments simultaneously."
             )
 
-        response = requests.request(
-            method=method,
-            url=url,
+        response = self._send(
+            method,
+            url,
             headers=headers,
             json=json,
             data=data,
@@ -39,3 +39,6 @@ class RequestClient:
             raise CustomAPIException(detail=detail, status_code=response.status_code)
 
         return response
+
+    def _send(self, method: str, url: str, **kwargs):
+        return requests.request(method=method, url=url, **kwargs)
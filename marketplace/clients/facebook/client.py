@@ -4,6 +4,7 @@ import json
 from django.conf import settings
 
 from marketplace.clients.base import RequestClient
+from marketplace.clients.facebook.transport import graph_request
 
 WHATSAPP_VERSION = settings.WHATSAPP_VERSION
 ACCESS_TOKEN = settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN
@@ -25,6 +26,9 @@ class FacebookAuthorization:
 
 
 class FacebookClient(FacebookAuthorization, RequestClient):
+    def _send(self, method: str, url: str, **kwargs):
+        return graph_request(method, url, **kwargs)
+
     # Product Catalog
     def create_catalog(self, business_id, name, category=None):
         url = self.get_url + f"{business_id}/owned_product_catalogs"
@@ -133,18 +137,29 @@ class FacebookClient(FacebookAuthorization, RequestClient):
 
         return all_products
 
-    def list_all_catalogs(self, wa_business_id):
+    def iter_catalogs(self, wa_business_id, fields="id,name,vertical", limit=100):
+        """
+        Yields the catalogs owned by the business with the requested fields,
+        following the pages of the listing
+        """
         url = self.get_url + f"{wa_business_id}/owned_product_catalogs"
         headers = self._get_headers()
-        all_catalog_ids = []
+        # The next page URL already carries the fields and the limit
+        params = {"fields": fields, "limit": limit}
 
         while url:
-            response = self.make_request(url, method="GET", headers=headers).json()
-            catalog_data = response.get("data", [])
-            all_catalog_ids.extend([item["id"] for item in catalog_data])
+            response = self.make_request(
+                url, method="GET", headers=headers, params=params
+            ).json()
+            yield from response.get("data", [])
+
             url = response.get("paging", {}).get("next")
+            params = None
 
-        return all_catalog_ids
+    def list_all_catalogs(self, wa_business_id):
+        return [
+            catalog["id"] for catalog in self.iter_catalogs(wa_business_id, fields="id")
+        ]
 
     def destroy_feed(self, feed_id):
         url = self.get_url + f"{feed_id}"
@@ -0,0 +1,228 @@
+"""
+Token bucket shared by every worker calling the Graph API.
+
+There is one bucket per access token and WABA stored in redis, refilled at
+GRAPH_RATE_LIMIT_PER_SECOND. The usage Meta reports in the
+`X-Business-Use-Case-Usage` and `X-App-Usage` headers scales the refill rate
+down once it goes over GRAPH_RATE_LIMIT_USAGE_THRESHOLD percent, and blocks the
+bucket while Meta asks the caller to wait before regaining access.
+"""
+
+import hashlib
+import json
+import logging
+import time
+
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+
+# Returns how many milliseconds the caller must wait before its request, 0 when
+# the tokens it costs were taken from the bucket
+ACQUIRE_SCRIPT = """
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated_at", "factor", "blocked_until")
+local capacity = tonumber(ARGV[1])
+local now = tonumber(ARGV[3])
+
+local blocked_until = tonumber(state[4]) or 0
+if blocked_until > now then
+    return blocked_until - now
+end
+
+local rate = tonumber(ARGV[2]) * (tonumber(state[3]) or 1)
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate / 1000)
+
+-- A request costing more than the burst waits for a full bucket
+local cost = math.min(tonumber(ARGV[5]), capacity)
+
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = math.ceil((cost - tokens) * 1000 / rate)
+end
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", now)
+redis.call("PEXPIRE", KEYS[1], ARGV[4])
+return wait
+"""
+
+
+class GraphRateLimitExceeded(Exception):
+    pass
+
+
+class GraphRateLimiter(object):
+    KEY = "graph-rate-limit:{token}:{waba_id}"
+    # Seconds the limiter stays disabled after redis fails, the calls go through
+    UNAVAILABLE_BACKOFF = 30
+    # Seconds a bucket is blocked when Meta throttles without telling for how long
+    DEFAULT_BLOCK = 60
+    MIN_FACTOR = 0.05
+
+    _unavailable_until = 0
+
+    def __init__(
+        self,
+        rate: float = None,
+        burst: int = None,
+        usage_threshold: int = None,
+        max_wait: int = None,
+    ) -> None:
+        self.rate = rate or settings.GRAPH_RATE_LIMIT_PER_SECOND
+        self.burst = burst or settings.GRAPH_RATE_LIMIT_BURST
+        self.usage_threshold = (
+            usage_threshold or settings.GRAPH_RATE_LIMIT_USAGE_THRESHOLD
+        )
+        self.max_wait = (
+            max_wait if max_wait is not None else settings.GRAPH_RATE_LIMIT_MAX_WAIT
+        )
+
+        self._redis = None
+        self._script = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    def get_key(self, access_token: Optional[str], waba_id: Optional[str]) -> str:
+        token = hashlib.sha256((access_token or "").encode()).hexdigest()[:16]
+        return self.KEY.format(token=token, waba_id=waba_id or "-")
+
+    def acquire(self, key: str, max_wait: int = None, tokens: int = 1) -> float:
+        """
+        Blocks until the bucket grants a request costing `tokens` and returns the
+        seconds waited, giving up once the wait would go over `max_wait`
+        """
+        max_wait = max_wait if max_wait is not None else self.max_wait
+        waited = 0.0
+
+        while True:
+            wait = self._call(self._take_token, key, tokens)
+            if not wait:
+                return waited
+
+            wait = wait / 1000
+            if waited + wait > max_wait:
+                raise GraphRateLimitExceeded(
+                    f"The Graph API rate limit of {key} would take {waited + wait:.0f}s to free up"
+                )
+
+            time.sleep(wait)
+            waited += wait
+
+    def update(self, key: str, headers) -> bool:
+        """
+        Adapts the bucket rate to the usage reported by Meta in the response headers,
+        returns whether the bucket was blocked
+        """
+        usage, regain_seconds = self.get_usage(headers)
+        if usage is None:
+            return False
+
+        mapping = dict(factor=self.get_factor(usage))
+        if regain_seconds or usage >= 100:
+            mapping["blocked_until"] = (
+                self._now() + (regain_seconds or self.DEFAULT_BLOCK) * 1000
+            )
+
+        stored = self._call(self.redis.hset, key, mapping=mapping) is not None
+        return stored and "blocked_until" in mapping
+
+    def block(self, key: str, seconds: int = None) -> bool:
+        """
+        Pauses the bucket, returns False when the pause could not be stored
+        """
+        blocked_until = self._now() + (seconds or self.DEFAULT_BLOCK) * 1000
+        mapping = dict(blocked_until=blocked_until)
+
+        return self._call(self.redis.hset, key, mapping=mapping) is not None
+
+    def get_factor(self, usage: float) -> float:
+        if usage < self.usage_threshold:
+            return 1.0
+
+        factor = (100 - usage) / (100 - self.usage_threshold)
+        return round(max(self.MIN_FACTOR, factor), 3)
+
+    def get_usage(self, headers) -> Tuple[Optional[float], int]:
+        """
+        Returns the highest usage percentage reported by Meta and how many seconds
+        it asks to wait before regaining access
+        """
+        usages, regain_minutes = [], 0
+
+        app_usage = self._load_header(headers, "X-App-Usage")
+        if isinstance(app_usage, dict):
+            usages.append(self._max_percentage(app_usage))
+
+        business_usage = self._load_header(headers, "X-Business-Use-Case-Usage")
+        if isinstance(business_usage, dict):
+            for use_cases in business_usage.values():
+                for use_case in use_cases if isinstance(use_cases, list) else []:
+                    usages.append(self._max_percentage(use_case))
+                    regain_minutes = max(
+                        regain_minutes,
+                        use_case.get("estimated_time_to_regain_access") or 0,
+                    )
+
+        if not usages:
+            return None, 0
+
+        return max(usages), regain_minutes * 60
+
+    def _take_token(self, key: str, tokens: int = 1) -> int:
+        if self._script is None:
+            self._script = self.redis.register_script(ACQUIRE_SCRIPT)
+
+        # The bucket outlives the longest wait so its state is not lost mid-burst
+        ttl = (self.max_wait + self.DEFAULT_BLOCK) * 1000
+        return int(
+            self._script(
+                keys=[key], args=[self.burst, self.rate, self._now(), ttl, tokens]
+            )
+        )
+
+    def _call(self, function, *args, **kwargs):
+        if time.monotonic() < GraphRateLimiter._unavailable_until:
+            return None
+
+        try:
+            return function(*args, **kwargs)
+        except RedisError as error:
+            GraphRateLimiter._unavailable_until = (
+                time.monotonic() + self.UNAVAILABLE_BACKOFF
+            )
+            logger.warning(
+                f"Graph rate limiter unavailable, requests are not limited: {error}"
+            )
+            return None
+
+    @staticmethod
+    def _load_header(headers, name: str):
+        try:
+            return json.loads(headers.get(name) or "null")
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _max_percentage(usage: dict) -> float:
+        values = [
+            usage.get(field) or 0
+            for field in ("call_count", "total_cputime", "total_time")
+        ]
+        return float(max(values))
+
+    @staticmethod
+    def _now() -> int:
+        return int(time.time() * 1000)
@@ -0,0 +1,185 @@
+"""
+Single entry point of the Graph API calls, every request takes a token from the
+shared rate limiter before being sent and feeds the usage headers back to it.
+
+Celery tasks wait longer for the limiter than web requests. The task is only
+known on the thread running it, so the functions handed to a worker pool are
+wrapped with `with_task_context` to keep waiting as a task there.
+"""
+
+import functools
+import logging
+import time
+
+from contextvars import ContextVar
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from celery import current_task
+from django.conf import settings
+from requests.models import Response
+
+from .rate_limiter import GraphRateLimiter, GraphRateLimitExceeded
+
+
+logger = logging.getLogger(__name__)
+
+
+# Graph error codes returned when the app, the user or the business is throttled
+THROTTLING_ERROR_CODES = (4, 17, 32, 613, 80004, 80007, 80008)
+# Seconds between retries of a throttled request when the limiter is unavailable
+FALLBACK_RETRY_DELAY = 10
+
+# Set on the worker threads started from a Celery task
+_in_task = ContextVar("graph_in_task", default=False)
+
+
+class GraphTransport(object):
+    def __init__(self, limiter: GraphRateLimiter = None, max_retries: int = None):
+        self.limiter = limiter or GraphRateLimiter()
+        self.max_retries = (
+            max_retries
+            if max_retries is not None
+            else settings.GRAPH_RATE_LIMIT_MAX_RETRIES
+        )
+
+    def request(
+        self, method: str, url: str, waba_id: str = None, tokens: int = 1, **kwargs
+    ) -> Response:
+        """
+        Sends the request with `requests` once the bucket of its access token and
+        WABA has room for it. Throttled responses are retried after the bucket is
+        blocked for the time Meta asked, the last response is always returned.
+        A `batch` request takes as many `tokens` as the calls it carries.
+
+        Only Celery tasks wait up to GRAPH_RATE_LIMIT_MAX_WAIT for the bucket, web
+        requests give up after GRAPH_RATE_LIMIT_REQUEST_MAX_WAIT.
+        """
+        if not settings.GRAPH_RATE_LIMIT_ENABLED:
+            return getattr(requests, method.lower())(url, **kwargs)
+
+        key = self.limiter.get_key(self.get_access_token(url, kwargs), waba_id)
+        in_task = self.in_task()
+        max_wait = (
+            settings.GRAPH_RATE_LIMIT_MAX_WAIT
+            if in_task
+            else settings.GRAPH_RATE_LIMIT_REQUEST_MAX_WAIT
+        )
+        max_retries = self.max_retries if self.is_replayable(kwargs) else 0
+        response = None
+
+        for attempt in range(1, max_retries + 2):
+            try:
+                self.limiter.acquire(key, max_wait=max_wait, tokens=tokens)
+            except GraphRateLimitExceeded as error:
+                logger.warning(str(error))
+                break
+
+            response = getattr(requests, method.lower())(url, **kwargs)
+            blocked = self.limiter.update(key, response.headers)
+
+            if not self.is_throttled(response):
+                return response
+
+            logger.info(f"Graph API throttled the request to {urlparse(url).path}")
+
+            if attempt > max_retries:
+                break
+
+            if blocked or self.limiter.block(key):
+                continue
+
+            if not in_task:
+                # Web requests do not hold the worker to back off locally
+                break
+
+            # The limiter could not pause the bucket, back off locally instead
+            time.sleep(FALLBACK_RETRY_DELAY * attempt)
+
+        if response is None:
+            return self._throttled_response()
+
+        return response
+
+    @staticmethod
+    def in_task() -> bool:
+        return _in_task.get() or bool(current_task and current_task.request.id)
+
+    @staticmethod
+    def is_replayable(kwargs: dict) -> bool:
+        """
+        Streamed bodies and uploaded files are consumed by the first attempt, the
+        request can not be sent again
+        """
+        if kwargs.get("files"):
+            return False
+
+        data = kwargs.get("data")
+        return data is None or isinstance(data, (str, bytes, dict, list, tuple))
+
+    @staticmethod
+    def get_access_token(url: str, kwargs: dict) -> str:
+        authorization = (kwargs.get("headers") or {}).get("Authorization", "")
+        if authorization:
+            return authorization.split(" ")[-1]
+
+        params = kwargs.get("params") or {}
+        if isinstance(params, dict) and params.get("access_token"):
+            return params["access_token"]
+
+        return parse_qs(urlparse(url).query).get("access_token", [""])[0]
+
+    @staticmethod
+    def is_throttled(response: Response) -> bool:
+        if response.status_code == 429:
+            return True
+
+        try:
+            content = response.json()
+        except ValueError:
+            return False
+
+        error = content.get("error") if isinstance(content, dict) else None
+        return isinstance(error, dict) and error.get("code") in THROTTLING_ERROR_CODES
+
+    @staticmethod
+    def _throttled_response() -> Response:
+        response = Response()
+        response.status_code = 429
+        response._content = (
+            b'{"error": {"message": "Graph API rate limit reached", "code": 4}}'
+        )
+        return response
+
+
+_transport = None
+
+
+def graph_request(
+    method: str, url: str, waba_id: str = None, tokens: int = 1, **kwargs
+) -> Response:
+    global _transport
+
+    if _transport is None:
+        _transport = GraphTransport()
+
+    return _transport.request(method, url, waba_id=waba_id, tokens=tokens, **kwargs)
+
+
+def with_task_context(function):
+    """
+    Wraps a function to be run on a worker thread so that its Graph calls are
+    handled as those of the calling thread, in or out of a Celery task
+    """
+    in_task = GraphTransport.in_task()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        token = _in_task.set(in_task)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _in_task.reset(token)
+
+    return wrapper
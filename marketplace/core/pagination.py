@@ -0,0 +1,76 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination over a composite ordering key, the last field must be
+    unique so that rows sharing the leading values keep a stable order
+    """
+
+    def __init__(self, ordering: tuple, **options) -> None:
+        self.ordering = ordering
+        for name, value in options.items():
+            setattr(self, name, value)
+
+    def get_ordering(self, request, queryset, view) -> tuple:
+        return self.ordering
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Page number pagination that switches to keyset pagination when the request
+    sends `pagination=cursor` or a `cursor`.
+
+    Deep pages of the page number mode cost a COUNT and an OFFSET scan, the cursor
+    mode filters on the ordering key instead, so with an index on it every page
+    costs the same as the first one. The `sort` parameter is honored in both
+    modes for the fields listed in `cursor_sort_fields`.
+    """
+
+    cursor_query_param = "cursor"
+    pagination_query_param = "pagination"
+    sort_query_param = "sort"
+
+    # Default ordering of the cursor mode, ends with the unique tiebreaker
+    cursor_ordering = ("-created_on", "-id")
+    cursor_sort_fields = ()
+
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request):
+            return super().paginate_queryset(queryset, request, view)
+
+        self.cursor_paginator = KeysetCursorPagination(
+            self.get_cursor_ordering(request),
+            page_size=self.page_size,
+            page_size_query_param=self.page_size_query_param,
+            max_page_size=self.max_page_size,
+            cursor_query_param=self.cursor_query_param,
+        )
+        return self.cursor_paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+
+        return super().get_paginated_response(data)
+
+    def use_cursor(self, request) -> bool:
+        params = request.query_params
+        return (
+            params.get(self.pagination_query_param) == "cursor"
+            or self.cursor_query_param in params
+        )
+
+    def get_cursor_ordering(self, request) -> tuple:
+        sort = request.query_params.get(self.sort_query_param)
+
+        if sort not in self.cursor_sort_fields:
+            return self.cursor_ordering
+
+        tiebreaker = self.cursor_ordering[-1].lstrip("-")
+        if sort.startswith("-"):
+            tiebreaker = f"-{tiebreaker}"
+
+        return (sort, tiebreaker)
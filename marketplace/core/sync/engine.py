@@ -0,0 +1,206 @@
+"""
+Bounded-concurrency fan-out for sync tasks.
+
+The upstream call of each item (`fetch`) runs on a worker pool, while the
+result is handed to `apply` on the calling thread, so database writes keep
+happening on the task connection. The amount of in-flight requests sharing
+the same key (usually the access token) is capped independently from the
+pool size.
+"""
+
+import asyncio
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, Optional
+
+from django.conf import settings
+
+from marketplace.clients.facebook.transport import with_task_context
+
+from .reports import UNCHANGED, SyncReport
+
+
+logger = logging.getLogger(__name__)
+
+
+class SyncEngine(object):
+    BACKEND_THREADS = "threads"
+    BACKEND_ASYNCIO = "asyncio"
+
+    BACKENDS = (BACKEND_THREADS, BACKEND_ASYNCIO)
+
+    def __init__(
+        self,
+        max_workers: int = 10,
+        max_in_flight_per_key: int = 5,
+        backend: str = BACKEND_THREADS,
+    ) -> None:
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Invalid sync backend: {backend}")
+
+        self.max_workers = max(1, max_workers)
+        self.max_in_flight_per_key = max(1, max_in_flight_per_key)
+        self.backend = backend
+
+    @classmethod
+    def from_settings(cls) -> "SyncEngine":
+        return cls(
+            max_workers=settings.WHATSAPP_SYNC_MAX_WORKERS,
+            max_in_flight_per_key=settings.WHATSAPP_SYNC_MAX_REQUESTS_PER_TOKEN,
+            backend=settings.WHATSAPP_SYNC_BACKEND,
+        )
+
+    def run(
+        self,
+        items: Iterable,
+        fetch: Callable[[Any], Any],
+        apply: Callable[[Any, Any], None],
+        key: Optional[Callable[[Any], str]] = None,
+        report: SyncReport = None,
+        identifier: Callable[[Any], str] = str,
+    ) -> SyncReport:
+        """
+        Calls `fetch(item)` for every item on the worker pool and `apply(item, result)`
+        on the calling thread. The threads backend applies each result as soon as its
+        fetch completes, the asyncio backend applies them after all fetches finish.
+        `apply` returns UNCHANGED when the result did not need to be written.
+        """
+        report = report or SyncReport(name="sync")
+
+        def handle(item, fetch_result, error):
+            self._handle(item, fetch_result, error, apply, report, identifier)
+
+        self._execute(list(items), fetch, key or (lambda item: None), handle)
+        return report.finish()
+
+    def run_batched(
+        self,
+        items: Iterable,
+        fetch_batch: Callable[[list], list],
+        apply: Callable[[Any, Any], None],
+        key: Optional[Callable[[Any], str]] = None,
+        batch_size: int = 50,
+        report: SyncReport = None,
+        identifier: Callable[[Any], str] = str,
+    ) -> SyncReport:
+        """
+        Groups the items by key in batches of `batch_size` and fans the batches out.
+        `fetch_batch(batch)` must return one result per item, in the same order, where
+        an exception instance marks the item as failed. Items are still applied and
+        reported one by one.
+        """
+        report = report or SyncReport(name="sync")
+        key = key or (lambda item: None)
+
+        def handle_batch(batch, fetch_results, error):
+            if error is not None:
+                fetch_results = [error] * len(batch)
+
+            for item, fetch_result in zip(batch, fetch_results):
+                if isinstance(fetch_result, Exception):
+                    self._handle(item, None, fetch_result, apply, report, identifier)
+                else:
+                    self._handle(item, fetch_result, None, apply, report, identifier)
+
+        batches = self.make_batches(items, key, batch_size)
+        self._execute(batches, fetch_batch, lambda batch: key(batch[0]), handle_batch)
+        return report.finish()
+
+    @staticmethod
+    def make_batches(items: Iterable, key: Callable[[Any], str], size: int) -> list:
+        grouped = {}
+        for item in items:
+            grouped.setdefault(key(item), []).append(item)
+
+        size = max(1, size)
+        batches = []
+        for group in grouped.values():
+            for start in range(0, len(group), size):
+                end = start + size
+                batches.append(group[start:end])
+
+        return batches
+
+    def _execute(self, items: list, fetch, key, handle) -> None:
+        if not items:
+            return
+
+        fetch = with_task_context(fetch)
+
+        if self.backend == self.BACKEND_ASYNCIO:
+            # Django refuses ORM calls while an event loop is running on the
+            # thread, so results are handled once the loop has finished
+            fetched = asyncio.run(self._fetch_asyncio(items, fetch, key))
+            for item, fetch_result, error in fetched:
+                handle(item, fetch_result, error)
+        else:
+            self._run_threads(items, fetch, key, handle)
+
+    def _handle(self, item, fetch_result, error, apply, report, identifier) -> None:
+        if error is not None:
+            logger.error(
+                f"Unable to fetch the sync data of {identifier(item)}: {error}"
+            )
+            report.add_failed(identifier(item), error)
+            return
+
+        try:
+            if apply(item, fetch_result) == UNCHANGED:
+                report.add_unchanged()
+            else:
+                report.add_synced()
+        except Exception as error:
+            logger.error(
+                f"Unable to apply the sync result of {identifier(item)}: {error}"
+            )
+            report.add_failed(identifier(item), error)
+
+    def _run_threads(self, items, fetch, key, handle) -> None:
+        semaphores = {}
+        semaphores_lock = threading.Lock()
+
+        def get_semaphore(item_key) -> threading.BoundedSemaphore:
+            with semaphores_lock:
+                if item_key not in semaphores:
+                    semaphores[item_key] = threading.BoundedSemaphore(
+                        self.max_in_flight_per_key
+                    )
+                return semaphores[item_key]
+
+        def bounded_fetch(item):
+            with get_semaphore(key(item)):
+                return fetch(item)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(bounded_fetch, item): item for item in items}
+
+            for future in as_completed(futures):
+                fetch_result, error = None, None
+                try:
+                    fetch_result = future.result()
+                except Exception as fetch_error:
+                    error = fetch_error
+
+                handle(futures[future], fetch_result, error)
+
+    async def _fetch_asyncio(self, items, fetch, key) -> list:
+        loop = asyncio.get_running_loop()
+        semaphores = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+
+            async def bounded_fetch(item):
+                item_key = key(item)
+                if item_key not in semaphores:
+                    semaphores[item_key] = asyncio.Semaphore(self.max_in_flight_per_key)
+
+                async with semaphores[item_key]:
+                    try:
+                        fetch_result = await loop.run_in_executor(executor, fetch, item)
+                        return item, fetch_result, None
+                    except Exception as error:
+                        return item, None, error
+
+            return await asyncio.gather(*[bounded_fetch(item) for item in items])
@@ -0,0 +1,118 @@
+"""
+Content hashes of the payloads last written by a sync, kept per sync kind in a
+redis hash keyed by app uuid. Each fingerprint also covers the value stored on
+the app, so a config changed in the database since the last sync is written
+again, and carries its write time, so it is trusted for `timeout` seconds only.
+A payload matching a fresh fingerprint does not need to be written again.
+"""
+
+import hashlib
+import json
+import time
+
+from typing import Any, Iterable
+
+from .reconciliation import chunked
+
+
+def get_fingerprint(payload: Any, stored: Any = None) -> str:
+    content = json.dumps(
+        [payload, stored], sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class SyncFingerprints(object):
+    KEY = "sync-fingerprints:{kind}"
+    CHUNK_SIZE = 1000
+
+    def __init__(self, redis, kind: str, timeout: int) -> None:
+        self.redis = redis
+        self.key = self.KEY.format(kind=kind)
+        self.timeout = timeout
+
+        self._fingerprints = {}
+        self._changed = {}
+
+    def load(self, apps: Iterable) -> None:
+        """
+        Reads the stored fingerprints of the apps with one HMGET per chunk, the
+        ones written more than `timeout` seconds ago are left out
+        """
+        uuids = [str(app.uuid) for app in apps]
+        oldest = int(time.time()) - self.timeout
+
+        for chunk in chunked(uuids, self.CHUNK_SIZE):
+            entries = self.redis.hmget(self.key, chunk)
+
+            for uuid, entry in zip(chunk, entries):
+                if isinstance(entry, bytes):
+                    entry = entry.decode()
+
+                fingerprint, _, written_at = (entry or "").partition(":")
+                if written_at.isdigit() and int(written_at) >= oldest:
+                    self._fingerprints[uuid] = fingerprint
+
+    def is_unchanged(self, app, payload: Any, stored: Any) -> bool:
+        """
+        Whether `payload` and the value `stored` on the app are the ones of the
+        last write
+        """
+        return self._fingerprints.get(str(app.uuid)) == get_fingerprint(payload, stored)
+
+    def remember(self, app, payload: Any, stored: Any) -> None:
+        """
+        Keeps the fingerprint of a written payload, `stored` is the value of the
+        app once written
+        """
+        fingerprint = get_fingerprint(payload, stored)
+
+        self._fingerprints[str(app.uuid)] = fingerprint
+        self._changed[str(app.uuid)] = fingerprint
+
+    def discard(self) -> None:
+        """
+        Drops the fingerprints remembered since the last flush, their payloads are
+        written again by the next run
+        """
+        for uuid in self._changed:
+            self._fingerprints.pop(uuid, None)
+
+        self._changed = {}
+
+    def forget(self, apps: Iterable) -> None:
+        """
+        Deletes the fingerprints of removed apps
+        """
+        uuids = [str(app.uuid) for app in apps]
+
+        for uuid in uuids:
+            self._fingerprints.pop(uuid, None)
+            self._changed.pop(uuid, None)
+
+        for chunk in chunked(uuids, self.CHUNK_SIZE):
+            self.redis.hdel(self.key, *chunk)
+
+    def flush(self) -> int:
+        """
+        Writes the fingerprints of the changed payloads along with their write
+        time. The hash expiration is renewed as well, it only drops the whole
+        hash once its sync stops running
+        """
+        changed, self._changed = self._changed, {}
+
+        if changed:
+            written_at = int(time.time())
+
+            pipeline = self.redis.pipeline(transaction=False)
+            pipeline.hset(
+                self.key,
+                mapping={
+                    uuid: f"{fingerprint}:{written_at}"
+                    for uuid, fingerprint in changed.items()
+                },
+            )
+            pipeline.expire(self.key, self.timeout)
+            pipeline.execute()
+
+        return len(changed)
@@ -0,0 +1,135 @@
+"""
+Redis lease held by a long-running sync.
+
+The lease is a key set with `NX` holding a random token and a short expiration,
+a heartbeat thread renews it while the sync runs so a crashed worker frees it
+within SYNC_LEASE_TIMEOUT. Next to the lease the sync stores a checkpoint cursor
+(the last item it wrote), an interrupted sync resumes after it instead of
+starting from scratch.
+"""
+
+import logging
+import threading
+
+from typing import Callable, Iterable, Optional
+from uuid import uuid4
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+# Both scripts only touch the lease when it still holds the token of the caller
+RENEW_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class SyncLease(object):
+    CHECKPOINT_KEY = "{key}:checkpoint"
+
+    def __init__(
+        self, redis, key: str, timeout: float = None, checkpoint_timeout: int = None
+    ) -> None:
+        self.redis = redis
+        self.key = key
+        self.checkpoint_key = self.CHECKPOINT_KEY.format(key=key)
+        self.timeout = timeout or settings.SYNC_LEASE_TIMEOUT
+        self.checkpoint_timeout = checkpoint_timeout or settings.SYNC_CHECKPOINT_TIMEOUT
+
+        self.token = uuid4().hex
+        self.lost = False
+
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    @property
+    def heartbeat_interval(self) -> float:
+        return self.timeout / 3
+
+    def acquire(self) -> bool:
+        """
+        Takes the lease without blocking and starts renewing it, returns False
+        when another worker holds it
+        """
+        acquired = self.redis.set(
+            self.key, self.token, nx=True, px=int(self.timeout * 1000)
+        )
+        if not acquired:
+            return False
+
+        self._heartbeat = threading.Thread(target=self._beat, daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def renew(self) -> bool:
+        script = self.redis.register_script(RENEW_SCRIPT)
+        return bool(
+            script(keys=[self.key], args=[self.token, int(self.timeout * 1000)])
+        )
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+
+        script = self.redis.register_script(RELEASE_SCRIPT)
+        script(keys=[self.key], args=[self.token])
+
+    @property
+    def checkpoint(self) -> Optional[str]:
+        checkpoint = self.redis.get(self.checkpoint_key)
+        if isinstance(checkpoint, bytes):
+            return checkpoint.decode()
+        return checkpoint
+
+    def save_checkpoint(self, checkpoint: str) -> None:
+        self.redis.set(self.checkpoint_key, str(checkpoint), ex=self.checkpoint_timeout)
+
+    def clear_checkpoint(self) -> None:
+        self.redis.delete(self.checkpoint_key)
+
+    def remaining(self, items: Iterable, cursor: Callable) -> list:
+        """
+        Sorts the items by their cursor and drops the ones up to the checkpoint
+        left by an interrupted run
+        """
+        items = sorted(items, key=lambda item: str(cursor(item)))
+        checkpoint = self.checkpoint
+
+        if checkpoint is None:
+            return items
+
+        logger.info(f"Resuming {self.key} after the checkpoint {checkpoint}")
+        return [item for item in items if str(cursor(item)) > checkpoint]
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                renewed = self.renew()
+            except Exception as error:
+                logger.warning(f"Could not renew the lease {self.key}: {error}")
+                continue
+
+            if not renewed:
+                logger.warning(f"The lease {self.key} was lost by this worker")
+                self.lost = True
+                return
+
+    def __enter__(self) -> "SyncLease":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.release()
@@ -0,0 +1,182 @@
+import logging
+
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from marketplace.applications.models import App
+from marketplace.wpp_templates.models import TemplateMessage
+
+if TYPE_CHECKING:
+    from marketplace.accounts.models import User  # pragma: no cover
+    from marketplace.core.types.base import AppType  # pragma: no cover
+    from .fingerprints import SyncFingerprints  # pragma: no cover
+
+
+logger = logging.getLogger(__name__)
+
+
+def chunked(items: list, size: int) -> Iterable[list]:
+    for start in range(0, len(items), size):
+        end = start + size
+        yield items[start:end]
+
+
+class AppReconciler(object):
+    """
+    Reconciles the apps of an AppType with the channels listed by Flows.
+
+    Every app of the listed channels is loaded with a single query keyed by
+    `flow_object_uuid`, the creations, updates and deactivations are collected
+    in memory and written with `bulk_create`/`bulk_update`/`delete` in chunked
+    transactions. Config patches only write their own keys, see
+    `AppQuerySet.bulk_patch_config`. The `fingerprints` of the deactivated apps
+    are deleted along with them.
+    """
+
+    UPDATE_FIELDS = ["code", "config", "modified_by", "modified_on"]
+
+    def __init__(
+        self,
+        apptype: "AppType",
+        user: "User",
+        chunk_size: int = None,
+        fingerprints: Iterable["SyncFingerprints"] = (),
+    ):
+        self.apptype = apptype
+        self.user = user
+        self.chunk_size = chunk_size or settings.WHATSAPP_SYNC_DB_CHUNK_SIZE
+        self.fingerprints = list(fingerprints)
+
+        self._apps = {}
+        self._to_create = []
+        self._to_update = {}
+        self._to_patch = {}
+        self._to_deactivate = {}
+
+    def load_apps(self, flow_object_uuids: Iterable) -> dict:
+        flow_object_uuids = sorted(
+            {
+                str(flow_object_uuid)
+                for flow_object_uuid in flow_object_uuids
+                if flow_object_uuid
+            }
+        )
+
+        for chunk in chunked(flow_object_uuids, self.chunk_size):
+            for app in App.objects.filter(flow_object_uuid__in=chunk):
+                self._apps[str(app.flow_object_uuid)] = app
+
+        return self._apps
+
+    def get(self, flow_object_uuid) -> Optional[App]:
+        return self._apps.get(str(flow_object_uuid))
+
+    def create(self, project_uuid: str, flow_object_uuid: str, config: dict) -> App:
+        app = App(
+            code=self.apptype.code,
+            platform=self.apptype.platform,
+            project_uuid=project_uuid,
+            flow_object_uuid=flow_object_uuid,
+            config=config,
+            created_by=self.user,
+        )
+
+        self._apps[str(flow_object_uuid)] = app
+        self._to_create.append(app)
+        return app
+
+    def update(self, app: App) -> None:
+        app.modified_by = self.user
+        app.modified_on = timezone.now()
+
+        if app.pk is not None:
+            self._to_update[app.pk] = app
+
+    def patch(self, app: App, patch: dict) -> None:
+        app.config.update(patch)
+        app.modified_by = self.user
+
+        if app.pk is not None:
+            self._to_patch.setdefault(app.pk, {}).update(patch)
+
+    def deactivate(self, app: App) -> None:
+        """
+        Removes the app of an inactive channel along with its templates
+        """
+        if app.pk is None:
+            return
+
+        self._to_deactivate[app.pk] = app
+        self._to_update.pop(app.pk, None)
+        self._to_patch.pop(app.pk, None)
+
+    def commit(self) -> dict:
+        """
+        Writes the collected changes, a failing chunk is logged and does not
+        prevent the remaining chunks from being written
+        """
+        created, updated, deleted, failed = 0, 0, 0, 0
+
+        for chunk in chunked(self._to_create, self.chunk_size):
+            try:
+                with transaction.atomic():
+                    App.objects.bulk_create(chunk)
+            except Exception as error:
+                logger.error(f"An error occurred while creating the app: {error}")
+                failed += len(chunk)
+                continue
+
+            created += len(chunk)
+            for app in chunk:
+                logger.info(
+                    f"A new {self.apptype.code} app was created automatically. UUID: {app.uuid}"
+                )
+
+        for chunk in chunked(list(self._to_update.values()), self.chunk_size):
+            try:
+                with transaction.atomic():
+                    App.objects.bulk_update(chunk, self.UPDATE_FIELDS)
+            except Exception as error:
+                logger.error(f"An error occurred while updating the apps: {error}")
+                failed += len(chunk)
+                continue
+
+            updated += len(chunk)
+
+        patches = [
+            (pk, patch)
+            for pk, patch in self._to_patch.items()
+            if pk not in self._to_update
+        ]
+        for chunk in chunked(patches, self.chunk_size):
+            try:
+                updated += App.objects.bulk_patch_config(dict(chunk), self.user)
+            except Exception as error:
+                logger.error(f"An error occurred while updating the apps: {error}")
+                failed += len(chunk)
+
+        for chunk in chunked(list(self._to_deactivate.values()), self.chunk_size):
+            pks = [app.pk for app in chunk]
+            try:
+                with transaction.atomic():
+                    # The templates protect their app from being deleted
+                    TemplateMessage.objects.filter(app_id__in=pks).delete()
+                    App.objects.filter(pk__in=pks).delete()
+            except Exception as error:
+                logger.error(f"An error occurred while deleting the apps: {error}")
+                failed += len(chunk)
+                continue
+
+            deleted += len(chunk)
+            for app in chunk:
+                logger.info(f"Inactive app: [{app.uuid}] deleted successfully")
+
+            for fingerprints in self.fingerprints:
+                fingerprints.forget(chunk)
+
+        self._to_create, self._to_update, self._to_patch = [], {}, {}
+        self._to_deactivate = {}
+        return dict(created=created, updated=updated, deleted=deleted, failed=failed)
@@ -0,0 +1,113 @@
+import time
+
+from dataclasses import dataclass, field
+
+
+# Returned by an `apply` callback when the fetched payload matched the stored one
+UNCHANGED = "unchanged"
+
+
+@dataclass
+class SyncReport:
+    """
+    Collects the outcome of every item processed by a sync run
+    """
+
+    name: str
+    synced: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    failed: int = 0
+    # Rows removed locally because they no longer exist upstream
+    deleted: int = 0
+    # Wall clock seconds from the first start to the last finish of the run
+    duration: float = 0.0
+    # Seconds spent syncing, summed over the merged shards
+    busy_duration: float = 0.0
+    errors: list = field(default_factory=list)
+    started_at: float = field(default_factory=time.monotonic, repr=False)
+    # Unix timestamps, comparable between the workers running the shards
+    started_on: float = field(default_factory=time.time, repr=False)
+    finished_on: float = field(default=None, repr=False)
+
+    @property
+    def total(self) -> int:
+        return self.synced + self.unchanged + self.skipped + self.failed
+
+    def add_synced(self) -> None:
+        self.synced += 1
+
+    def add_unchanged(self) -> None:
+        self.unchanged += 1
+
+    def add_skipped(self) -> None:
+        self.skipped += 1
+
+    def add_failed(self, identifier: str, error: Exception) -> None:
+        self.failed += 1
+        self.errors.append(f"{identifier}: {error}")
+
+    def add_deleted(self, count: int = 1) -> None:
+        self.deleted += count
+
+    def finish(self) -> "SyncReport":
+        self.duration = round(time.monotonic() - self.started_at, 3)
+        self.finished_on = time.time()
+        if not self.busy_duration:
+            self.busy_duration = self.duration
+        return self
+
+    def merge(self, other: "SyncReport") -> "SyncReport":
+        self.synced += other.synced
+        self.unchanged += other.unchanged
+        self.skipped += other.skipped
+        self.failed += other.failed
+        self.deleted += other.deleted
+        self.busy_duration = round(self.busy_duration + other.busy_duration, 3)
+        self.errors.extend(other.errors)
+
+        # Shards run in parallel lanes, the run lasts from the first start to
+        # the last finish rather than the sum of the shards
+        self.started_on = min(self.started_on, other.started_on)
+        if other.finished_on is not None:
+            self.finished_on = max(self.finished_on or 0, other.finished_on)
+            self.duration = round(self.finished_on - self.started_on, 3)
+        return self
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SyncReport":
+        return cls(
+            name=data.get("name", "sync"),
+            synced=data.get("synced", 0),
+            unchanged=data.get("unchanged", 0),
+            skipped=data.get("skipped", 0),
+            failed=data.get("failed", 0),
+            deleted=data.get("deleted", 0),
+            duration=data.get("duration", 0.0),
+            busy_duration=data.get("busy_duration", data.get("duration", 0.0)),
+            errors=list(data.get("errors", [])),
+            started_on=data.get("started_on") or time.time(),
+            finished_on=data.get("finished_on"),
+        )
+
+    def as_dict(self) -> dict:
+        return dict(
+            name=self.name,
+            synced=self.synced,
+            unchanged=self.unchanged,
+            skipped=self.skipped,
+            failed=self.failed,
+            deleted=self.deleted,
+            duration=self.duration,
+            busy_duration=self.busy_duration,
+            errors=self.errors,
+            started_on=self.started_on,
+            finished_on=self.finished_on,
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.synced} synced, {self.unchanged} unchanged, "
+            f"{self.skipped} skipped, {self.failed} failed, "
+            f"{self.deleted} deleted in {self.duration}s"
+        )
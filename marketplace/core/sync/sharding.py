@@ -0,0 +1,164 @@
+"""
+Splits the app set of a periodic sync task in fixed-size shards.
+
+When the beat calls a sharded task without `app_ids`, the task dispatches its
+shards as a Celery chord instead of syncing the apps itself. The shards are
+spread over `max_parallel_shards` lanes: the lanes run in parallel on any
+worker and each lane syncs its shards one after another, so no more than
+`max_parallel_shards` shards of the same task are in flight. Each shard calls
+the task again with `app_ids` and the chord callback merges their reports.
+
+A shard running over `time_limit` seconds is interrupted and its apps are
+reported as failed, as are those of a shard that raises, the next shard of its
+lane runs regardless.
+"""
+
+import logging
+
+from typing import Optional, Tuple
+
+from celery import chain, chord
+from celery.exceptions import SoftTimeLimitExceeded
+from django.conf import settings
+from django.db.models import QuerySet
+
+from marketplace.celery import app as celery_app
+
+from .reconciliation import chunked
+from .reports import SyncReport
+
+
+logger = logging.getLogger(__name__)
+
+
+class SyncSharding(object):
+    # Seconds a shard gets to handle the soft time limit before being killed
+    TIME_LIMIT_GRACE = 30
+
+    def __init__(
+        self,
+        task_name: str,
+        shard_size: int,
+        max_parallel_shards: int,
+        time_limit: int = None,
+    ):
+        self.task_name = task_name
+        self.shard_size = max(1, shard_size)
+        self.max_parallel_shards = max(1, max_parallel_shards)
+        self.time_limit = time_limit
+
+    @classmethod
+    def from_settings(cls, task_name: str, **defaults) -> "SyncSharding":
+        """
+        Builds the sharding of a task from the global settings, the task defaults
+        and the SYNC_SHARDING overrides, in increasing precedence
+        """
+        task_settings = dict(
+            shard_size=settings.SYNC_SHARD_SIZE,
+            max_parallel_shards=settings.SYNC_MAX_PARALLEL_SHARDS,
+        )
+        task_settings.update(defaults)
+        task_settings.update(settings.SYNC_SHARDING.get(task_name, {}))
+
+        return cls(
+            task_name,
+            shard_size=task_settings["shard_size"],
+            max_parallel_shards=task_settings["max_parallel_shards"],
+            time_limit=task_settings.get("time_limit"),
+        )
+
+    def shard(self, apps, app_ids: list = None) -> Tuple[object, Optional[dict]]:
+        """
+        Returns the apps this run must sync and, when the shards were dispatched
+        instead, a summary the task should return right away
+        """
+        if not isinstance(apps, QuerySet):
+            return apps, None
+
+        if app_ids is not None:
+            return apps.filter(pk__in=app_ids), None
+
+        shards = self.get_shards(apps)
+        if len(shards) <= 1:
+            return apps, None
+
+        return apps, self.dispatch(shards)
+
+    def get_shards(self, apps: QuerySet) -> list:
+        app_ids = list(apps.order_by("pk").values_list("pk", flat=True))
+        return list(chunked(app_ids, self.shard_size))
+
+    def get_lanes(self, shards: list) -> list:
+        lanes = [[] for _ in range(min(len(shards), self.max_parallel_shards))]
+
+        for index, shard in enumerate(shards):
+            lanes[index % len(lanes)].append(shard)
+
+        return lanes
+
+    def dispatch(self, shards: list) -> dict:
+        lanes = self.get_lanes(shards)
+        header = []
+
+        for lane in lanes:
+            first_shard, *next_shards = lane
+            signatures = [run_sync_shard.si(None, self.task_name, first_shard)]
+            signatures += [
+                run_sync_shard.s(self.task_name, shard) for shard in next_shards
+            ]
+            if self.time_limit:
+                signatures = [
+                    signature.set(
+                        soft_time_limit=self.time_limit,
+                        time_limit=self.time_limit + self.TIME_LIMIT_GRACE,
+                    )
+                    for signature in signatures
+                ]
+            header.append(chain(*signatures))
+
+        chord(header)(merge_sync_reports.s(self.task_name))
+
+        logger.info(
+            f"{self.task_name}: dispatched {len(shards)} shard(s) in {len(lanes)} lane(s)"
+        )
+        return dict(name=self.task_name, shards=len(shards), lanes=len(lanes))
+
+
+@celery_app.task(name="run_sync_shard")
+def run_sync_shard(previous_report: Optional[dict], task_name: str, app_ids: list):
+    """
+    Syncs a shard inline and merges its report with the one of the previous
+    shard of the same lane
+    """
+    report = SyncReport.from_dict(previous_report or dict(name=task_name))
+
+    try:
+        shard_report = celery_app.tasks[task_name](app_ids=app_ids)
+    except SoftTimeLimitExceeded:
+        logger.error(f"{task_name}: the shard {app_ids} ran out of time")
+        for app_id in app_ids:
+            report.add_failed(str(app_id), "time limit exceeded")
+        return report.as_dict()
+    except Exception as error:
+        # An exception would break the lane chain and the chord callback
+        logger.exception(f"{task_name}: the shard {app_ids} failed")
+        for app_id in app_ids:
+            report.add_failed(str(app_id), error)
+        return report.as_dict()
+
+    if isinstance(shard_report, dict):
+        report.merge(SyncReport.from_dict(shard_report))
+
+    return report.as_dict()
+
+
+@celery_app.task(name="merge_sync_reports")
+def merge_sync_reports(lane_reports: list, task_name: str) -> dict:
+    report = SyncReport(name=task_name)
+
+    for lane_report in lane_reports:
+        if isinstance(lane_report, dict):
+            report.merge(SyncReport.from_dict(lane_report))
+
+    logger.info(f"Sharded {report}")
+    return report.as_dict()
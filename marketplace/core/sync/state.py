@@ -0,0 +1,56 @@
+from typing import Iterable, Tuple
+
+from .reconciliation import chunked
+
+
+class SyncStateStore(object):
+    """
+    Keeps a redis marker per app recently synced by a task. The markers of the
+    whole app set are read with `MGET` and written back in a single pipeline.
+    """
+
+    CHUNK_SIZE = 1000
+
+    def __init__(self, redis, key: str, timeout: int) -> None:
+        self.redis = redis
+        self.key = key
+        self.timeout = timeout
+
+        self._synced_keys = []
+
+    def get_key(self, app) -> str:
+        return self.key.format(app_uuid=str(app.uuid))
+
+    def split_due(self, apps: Iterable) -> Tuple[list, list]:
+        """
+        Returns the apps due for sync and the ones synced recently
+        """
+        apps_due, apps_synced = [], []
+
+        for chunk in chunked(list(apps), self.CHUNK_SIZE):
+            markers = self.redis.mget([self.get_key(app) for app in chunk])
+
+            for app, marker in zip(chunk, markers):
+                if marker is None:
+                    apps_due.append(app)
+                else:
+                    apps_synced.append(app)
+
+        return apps_due, apps_synced
+
+    def mark_synced(self, app) -> None:
+        self._synced_keys.append(self.get_key(app))
+
+    def flush(self) -> int:
+        """
+        Writes the buffered markers and returns how many were written
+        """
+        keys, self._synced_keys = self._synced_keys, []
+
+        for chunk in chunked(keys, self.CHUNK_SIZE):
+            pipeline = self.redis.pipeline(transaction=False)
+            for key in chunk:
+                pipeline.set(key, "synced", self.timeout)
+            pipeline.execute()
+
+        return len(keys)
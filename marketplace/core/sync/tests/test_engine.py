@@ -0,0 +1,146 @@
+import threading
+import time
+
+from django.test import SimpleTestCase, override_settings
+
+from marketplace.core.sync.engine import SyncEngine
+from marketplace.core.sync.reports import SyncReport
+
+
+class InFlightCounter(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def fetch(self, item):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+        time.sleep(0.01)
+
+        with self._lock:
+            self.current -= 1
+
+        if item == "fail":
+            raise Exception("Something wrong")
+
+        return item.upper()
+
+
+class SyncEngineTestCase(SimpleTestCase):
+    def _run(self, backend: str, items: list, **kwargs) -> tuple:
+        counter = InFlightCounter()
+        applied = {}
+
+        engine = SyncEngine(backend=backend, **kwargs)
+        report = engine.run(
+            items,
+            fetch=counter.fetch,
+            apply=lambda item, result: applied.update({item: result}),
+            report=SyncReport(name="test"),
+        )
+        return report, applied, counter
+
+    def test_threads_backend_applies_every_result(self):
+        report, applied, _ = self._run("threads", ["a", "b", "c"], max_workers=3)
+
+        self.assertEqual(applied, {"a": "A", "b": "B", "c": "C"})
+        self.assertEqual(report.synced, 3)
+        self.assertEqual(report.failed, 0)
+
+    def test_asyncio_backend_applies_every_result(self):
+        report, applied, _ = self._run("asyncio", ["a", "b", "c"], max_workers=3)
+
+        self.assertEqual(applied, {"a": "A", "b": "B", "c": "C"})
+        self.assertEqual(report.synced, 3)
+
+    def test_failed_fetch_is_reported(self):
+        for backend in SyncEngine.BACKENDS:
+            report, applied, _ = self._run(backend, ["a", "fail"], max_workers=2)
+
+            self.assertEqual(applied, {"a": "A"})
+            self.assertEqual(report.synced, 1)
+            self.assertEqual(report.failed, 1)
+            self.assertIn("fail: Something wrong", report.errors)
+
+    def test_failed_apply_is_reported(self):
+        def apply(item, result):
+            raise ValueError("Invalid result")
+
+        report = SyncEngine().run(["a"], fetch=str.upper, apply=apply)
+
+        self.assertEqual(report.synced, 0)
+        self.assertEqual(report.failed, 1)
+
+    def test_in_flight_requests_are_capped_per_key(self):
+        for backend in SyncEngine.BACKENDS:
+            _, _, counter = self._run(
+                backend,
+                [str(index) for index in range(12)],
+                max_workers=8,
+                max_in_flight_per_key=2,
+            )
+            self.assertLessEqual(counter.peak, 2)
+
+    def test_empty_items_returns_finished_report(self):
+        report = SyncEngine().run([], fetch=str.upper, apply=lambda item, result: None)
+        self.assertEqual(report.total, 0)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            SyncEngine(backend="processes")
+
+    @override_settings(
+        WHATSAPP_SYNC_MAX_WORKERS=3,
+        WHATSAPP_SYNC_MAX_REQUESTS_PER_TOKEN=2,
+        WHATSAPP_SYNC_BACKEND="asyncio",
+    )
+    def test_from_settings(self):
+        engine = SyncEngine.from_settings()
+
+        self.assertEqual(engine.max_workers, 3)
+        self.assertEqual(engine.max_in_flight_per_key, 2)
+        self.assertEqual(engine.backend, "asyncio")
+
+    def test_run_batched_groups_items_by_key(self):
+        batches = []
+
+        def fetch_batch(batch):
+            batches.append(batch)
+            return [
+                Exception("Something wrong") if item.endswith("fail") else item.upper()
+                for item in batch
+            ]
+
+        applied = {}
+        items = ["a1", "a2", "a3", "b1", "b-fail"]
+
+        for backend in SyncEngine.BACKENDS:
+            batches.clear()
+            applied.clear()
+
+            report = SyncEngine(backend=backend).run_batched(
+                items,
+                fetch_batch=fetch_batch,
+                apply=lambda item, result: applied.update({item: result}),
+                key=lambda item: item[0],
+                batch_size=2,
+            )
+
+            self.assertCountEqual(batches, [["a1", "a2"], ["a3"], ["b1", "b-fail"]])
+            self.assertEqual(applied, {"a1": "A1", "a2": "A2", "a3": "A3", "b1": "B1"})
+            self.assertEqual(report.synced, 4)
+            self.assertEqual(report.failed, 1)
+
+    def test_run_batched_fails_every_item_of_a_failed_batch(self):
+        def fetch_batch(batch):
+            raise Exception("Invalid token")
+
+        report = SyncEngine().run_batched(
+            ["a", "b"], fetch_batch=fetch_batch, apply=lambda item, result: None
+        )
+
+        self.assertEqual(report.failed, 2)
+        self.assertEqual(report.errors, ["a: Invalid token", "b: Invalid token"])
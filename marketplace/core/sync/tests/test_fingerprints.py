@@ -0,0 +1,106 @@
+import time
+
+from uuid import uuid4
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from marketplace.core.sync.fingerprints import SyncFingerprints, get_fingerprint
+
+
+class GetFingerprintTestCase(SimpleTestCase):
+    def test_fingerprint_ignores_key_order(self):
+        self.assertEqual(
+            get_fingerprint({"id": "1", "name": "waba"}),
+            get_fingerprint({"name": "waba", "id": "1"}),
+        )
+
+    def test_fingerprint_changes_with_the_content(self):
+        self.assertNotEqual(get_fingerprint({"id": "1"}), get_fingerprint({"id": "2"}))
+
+    def test_fingerprint_changes_with_the_stored_value(self):
+        self.assertNotEqual(
+            get_fingerprint({"id": "1"}, {"id": "1"}),
+            get_fingerprint({"id": "1"}, {"id": "2"}),
+        )
+
+
+class SyncFingerprintsTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.redis = MagicMock()
+        self.fingerprints = SyncFingerprints(self.redis, "waba", 60)
+        self.apps = [MagicMock(uuid=uuid4()) for _ in range(2)]
+
+    def test_load_and_compare(self):
+        entry = f"{get_fingerprint({'id': '1'}, {'id': '1'})}:{int(time.time())}"
+        self.redis.hmget.return_value = [entry.encode(), None]
+
+        self.fingerprints.load(self.apps)
+
+        self.redis.hmget.assert_called_once_with(
+            "sync-fingerprints:waba", [str(app.uuid) for app in self.apps]
+        )
+        app = self.apps[0]
+        self.assertTrue(self.fingerprints.is_unchanged(app, {"id": "1"}, {"id": "1"}))
+        self.assertFalse(self.fingerprints.is_unchanged(app, {"id": "2"}, {"id": "1"}))
+        self.assertFalse(
+            self.fingerprints.is_unchanged(self.apps[1], {"id": "1"}, {"id": "1"})
+        )
+
+    def test_drifted_stored_value_is_changed(self):
+        entry = f"{get_fingerprint({'id': '1'}, {'id': '1'})}:{int(time.time())}"
+        self.redis.hmget.return_value = [entry, None]
+
+        self.fingerprints.load(self.apps)
+
+        self.assertFalse(self.fingerprints.is_unchanged(self.apps[0], {"id": "1"}, {}))
+
+    def test_expired_fingerprints_are_changed(self):
+        fingerprint = get_fingerprint({"id": "1"}, {"id": "1"})
+        self.redis.hmget.return_value = [
+            f"{fingerprint}:{int(time.time()) - 61}",
+            fingerprint,
+        ]
+
+        self.fingerprints.load(self.apps)
+
+        for app in self.apps:
+            self.assertFalse(
+                self.fingerprints.is_unchanged(app, {"id": "1"}, {"id": "1"})
+            )
+
+    @patch("marketplace.core.sync.fingerprints.time.time", return_value=1000)
+    def test_flush_writes_only_the_changed_fingerprints(self, time_mock):
+        self.assertEqual(self.fingerprints.flush(), 0)
+        self.redis.pipeline.assert_not_called()
+
+        self.fingerprints.remember(self.apps[0], {"id": "1"}, {"id": "1"})
+
+        self.assertTrue(
+            self.fingerprints.is_unchanged(self.apps[0], {"id": "1"}, {"id": "1"})
+        )
+        self.assertEqual(self.fingerprints.flush(), 1)
+
+        pipeline = self.redis.pipeline.return_value
+        pipeline.hset.assert_called_once_with(
+            "sync-fingerprints:waba",
+            mapping={
+                str(
+                    self.apps[0].uuid
+                ): f"{get_fingerprint({'id': '1'}, {'id': '1'})}:1000"
+            },
+        )
+        pipeline.expire.assert_called_once_with("sync-fingerprints:waba", 60)
+
+    def test_forget_deletes_the_fingerprints(self):
+        self.fingerprints.remember(self.apps[0], {"id": "1"}, {"id": "1"})
+
+        self.fingerprints.forget(self.apps)
+
+        self.redis.hdel.assert_called_once_with(
+            "sync-fingerprints:waba", *[str(app.uuid) for app in self.apps]
+        )
+        self.assertFalse(
+            self.fingerprints.is_unchanged(self.apps[0], {"id": "1"}, {"id": "1"})
+        )
+        self.assertEqual(self.fingerprints.flush(), 0)
@@ -0,0 +1,75 @@
+import threading
+
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+
+from marketplace.core.sync.locks import SyncLease
+
+
+class SyncLeaseTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.redis = MagicMock()
+        self.redis.get.return_value = None
+        self.script = self.redis.register_script.return_value
+        self.lease = SyncLease(self.redis, "sync-lock", timeout=60)
+
+    def tearDown(self) -> None:
+        self.lease._stop.set()
+
+    def test_acquire_sets_the_token_only_if_free(self):
+        self.assertTrue(self.lease.acquire())
+        self.redis.set.assert_called_once_with(
+            "sync-lock", self.lease.token, nx=True, px=60000
+        )
+
+    def test_acquire_fails_while_another_worker_holds_it(self):
+        self.redis.set.return_value = None
+
+        self.assertFalse(self.lease.acquire())
+        self.assertIsNone(self.lease._heartbeat)
+
+    def test_release_only_deletes_its_own_token(self):
+        with self.lease:
+            self.lease.acquire()
+
+        self.script.assert_called_with(keys=["sync-lock"], args=[self.lease.token])
+        self.assertIsNone(self.lease._heartbeat)
+
+    def test_heartbeat_renews_the_lease(self):
+        renewed = threading.Event()
+        self.script.side_effect = lambda keys, args: renewed.set() or 1
+        self.lease.timeout = 0.03
+
+        with self.lease:
+            self.lease.acquire()
+            self.assertTrue(renewed.wait(1))
+
+        self.assertFalse(self.lease.lost)
+
+    def test_heartbeat_flags_a_lost_lease(self):
+        self.script.return_value = 0
+        self.lease.timeout = 0.03
+        self.lease.acquire()
+
+        self.lease._heartbeat.join(1)
+
+        self.assertTrue(self.lease.lost)
+
+    def test_checkpoint_is_saved_with_an_expiration(self):
+        self.lease.checkpoint_timeout = 3600
+        self.lease.save_checkpoint("b")
+
+        self.redis.set.assert_called_once_with("sync-lock:checkpoint", "b", ex=3600)
+
+    def test_remaining_skips_the_items_up_to_the_checkpoint(self):
+        self.redis.get.return_value = b"b"
+
+        remaining = self.lease.remaining(["c", "a", "d", "b"], lambda item: item)
+
+        self.assertEqual(remaining, ["c", "d"])
+
+    def test_remaining_without_checkpoint_keeps_every_item(self):
+        remaining = self.lease.remaining(["b", "a"], lambda item: item)
+
+        self.assertEqual(remaining, ["a", "b"])
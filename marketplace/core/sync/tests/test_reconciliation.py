@@ -0,0 +1,104 @@
+from uuid import uuid4
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from marketplace.core.types import APPTYPES
+from marketplace.applications.models import App
+from marketplace.core.sync.reconciliation import AppReconciler
+from marketplace.wpp_templates.models import TemplateMessage
+
+
+User = get_user_model()
+
+
+class AppReconcilerTestCase(TestCase):
+    def setUp(self) -> None:
+        self.apptype = APPTYPES.get("wpp-cloud")
+        self.user = User.objects.get_admin_user()
+
+        self.apps = [
+            App.objects.create(
+                code="wpp-cloud",
+                platform=App.PLATFORM_WENI_FLOWS,
+                project_uuid=uuid4(),
+                flow_object_uuid=uuid4(),
+                config={"title": str(index)},
+                created_by=self.user,
+            )
+            for index in range(3)
+        ]
+
+    def test_load_apps_in_chunked_queries(self):
+        reconciler = AppReconciler(self.apptype, self.user, chunk_size=2)
+        flow_object_uuids = [app.flow_object_uuid for app in self.apps] + [None]
+
+        with self.assertNumQueries(2):
+            apps = reconciler.load_apps(flow_object_uuids)
+
+        self.assertEqual(len(apps), 3)
+        self.assertEqual(reconciler.get(self.apps[0].flow_object_uuid), self.apps[0])
+        self.assertIsNone(reconciler.get(uuid4()))
+
+    def test_commit_writes_changes_in_bulk(self):
+        reconciler = AppReconciler(self.apptype, self.user)
+        reconciler.load_apps([app.flow_object_uuid for app in self.apps])
+
+        for app in self.apps:
+            app.config["title"] = "updated"
+            reconciler.update(app)
+
+        new_flow_object_uuids = [str(uuid4()), str(uuid4())]
+        for flow_object_uuid in new_flow_object_uuids:
+            reconciler.create(
+                project_uuid=str(uuid4()),
+                flow_object_uuid=flow_object_uuid,
+                config={"title": "created"},
+            )
+
+        # One insert and one update, each wrapped in its own savepoint
+        with self.assertNumQueries(6):
+            result = reconciler.commit()
+
+        self.assertEqual(result, dict(created=2, updated=3, deleted=0, failed=0))
+        self.assertEqual(App.objects.filter(config__title="updated").count(), 3)
+        self.assertEqual(
+            App.objects.filter(flow_object_uuid__in=new_flow_object_uuids).count(), 2
+        )
+
+    def test_failed_chunk_does_not_stop_the_others(self):
+        reconciler = AppReconciler(self.apptype, self.user, chunk_size=1)
+
+        for index in range(2):
+            reconciler.create(
+                project_uuid=str(uuid4()),
+                flow_object_uuid=str(uuid4()),
+                config={"title": str(index)},
+            )
+
+        bulk_create = App.objects.bulk_create
+
+        def fail_first_chunk(apps):
+            if apps[0].config["title"] == "0":
+                raise Exception("Something wrong")
+            return bulk_create(apps)
+
+        with patch.object(App.objects, "bulk_create", side_effect=fail_first_chunk):
+            result = reconciler.commit()
+
+        self.assertEqual(result, dict(created=1, updated=0, deleted=0, failed=1))
+        self.assertTrue(App.objects.filter(config__title="1").exists())
+
+    def test_inactive_apps_are_deleted_in_bulk(self):
+        reconciler = AppReconciler(self.apptype, self.user)
+        for app in self.apps:
+            TemplateMessage.objects.create(app=app, name="welcome")
+            reconciler.update(app)
+            reconciler.deactivate(app)
+
+        result = reconciler.commit()
+
+        self.assertEqual(result, dict(created=0, updated=0, deleted=3, failed=0))
+        self.assertFalse(App.objects.filter(pk__in=[app.pk for app in self.apps]))
+        self.assertFalse(TemplateMessage.objects.exists())
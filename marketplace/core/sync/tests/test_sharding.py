@@ -0,0 +1,174 @@
+from uuid import uuid4
+from unittest.mock import MagicMock, patch
+
+from celery.exceptions import SoftTimeLimitExceeded
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+
+from marketplace.applications.models import App
+from marketplace.core.sync.sharding import (
+    SyncSharding,
+    merge_sync_reports,
+    run_sync_shard,
+)
+
+
+User = get_user_model()
+
+
+class SyncShardingTestCase(TestCase):
+    def setUp(self) -> None:
+        user = User.objects.get_admin_user()
+
+        for _ in range(5):
+            App.objects.create(
+                code="wpp-cloud",
+                platform=App.PLATFORM_WENI_FLOWS,
+                project_uuid=uuid4(),
+                created_by=user,
+            )
+
+        self.apps = App.objects.filter(code="wpp-cloud")
+        self.sharding = SyncSharding("sync_test", shard_size=2, max_parallel_shards=2)
+
+    @override_settings(
+        SYNC_SHARD_SIZE=10,
+        SYNC_MAX_PARALLEL_SHARDS=3,
+        SYNC_SHARDING={"sync_test": {"shard_size": 5}},
+    )
+    def test_from_settings(self):
+        sharding = SyncSharding.from_settings("sync_test")
+
+        self.assertEqual(sharding.shard_size, 5)
+        self.assertEqual(sharding.max_parallel_shards, 3)
+        self.assertIsNone(sharding.time_limit)
+
+    @override_settings(
+        SYNC_SHARD_SIZE=10,
+        SYNC_MAX_PARALLEL_SHARDS=3,
+        SYNC_SHARDING={"sync_test": {"max_parallel_shards": 6}},
+    )
+    def test_from_settings_with_task_defaults(self):
+        sharding = SyncSharding.from_settings(
+            "sync_test", shard_size=1, max_parallel_shards=4, time_limit=60
+        )
+
+        self.assertEqual(sharding.shard_size, 1)
+        self.assertEqual(sharding.max_parallel_shards, 6)
+        self.assertEqual(sharding.time_limit, 60)
+
+    def test_get_lanes_caps_parallel_shards(self):
+        shards = self.sharding.get_shards(self.apps)
+        lanes = self.sharding.get_lanes(shards)
+
+        self.assertEqual([len(shard) for shard in shards], [2, 2, 1])
+        self.assertEqual(len(lanes), 2)
+        self.assertEqual(sum(len(lane) for lane in lanes), 3)
+
+    @patch("marketplace.core.sync.sharding.chord")
+    def test_shard_dispatches_a_chord(self, chord_mock):
+        apps, sharded = self.sharding.shard(self.apps)
+
+        self.assertEqual(sharded, dict(name="sync_test", shards=3, lanes=2))
+        header = chord_mock.call_args[0][0]
+        self.assertEqual(len(header), 2)
+        chord_mock.return_value.assert_called_once()
+
+    @patch("marketplace.core.sync.sharding.chord")
+    def test_shards_run_with_a_time_limit(self, chord_mock):
+        sharding = SyncSharding("sync_test", 1, 2, time_limit=60)
+
+        sharding.shard(self.apps)
+
+        for lane in chord_mock.call_args[0][0]:
+            for signature in lane.tasks:
+                self.assertEqual(signature.options["soft_time_limit"], 60)
+                self.assertEqual(signature.options["time_limit"], 90)
+
+    @patch("marketplace.core.sync.sharding.chord")
+    def test_shard_runs_inline(self, chord_mock):
+        app_ids = list(self.apps.values_list("pk", flat=True)[:2])
+
+        apps, sharded = self.sharding.shard(self.apps, app_ids)
+        self.assertIsNone(sharded)
+        self.assertCountEqual(apps.values_list("pk", flat=True), app_ids)
+
+        apps, sharded = SyncSharding("sync_test", 10, 2).shard(self.apps)
+        self.assertIsNone(sharded)
+        self.assertEqual(apps, self.apps)
+
+        apps, sharded = self.sharding.shard([1, 2, 3])
+        self.assertIsNone(sharded)
+
+        chord_mock.assert_not_called()
+
+    @patch("marketplace.core.sync.sharding.celery_app")
+    def test_run_sync_shard_merges_the_lane_report(self, celery_app_mock):
+        task = MagicMock(return_value=dict(name="sync_test", synced=2, failed=1))
+        celery_app_mock.tasks = {"sync_test": task}
+
+        report = run_sync_shard(
+            dict(name="sync_test", synced=1, skipped=1), "sync_test", [1, 2, 3]
+        )
+
+        task.assert_called_once_with(app_ids=[1, 2, 3])
+        self.assertEqual(report["synced"], 3)
+        self.assertEqual(report["skipped"], 1)
+        self.assertEqual(report["failed"], 1)
+
+    @patch("marketplace.core.sync.sharding.celery_app")
+    def test_timed_out_shard_is_reported_as_failed(self, celery_app_mock):
+        task = MagicMock(side_effect=SoftTimeLimitExceeded())
+        celery_app_mock.tasks = {"sync_test": task}
+
+        report = run_sync_shard(dict(name="sync_test", synced=1), "sync_test", [7])
+
+        self.assertEqual(report["synced"], 1)
+        self.assertEqual(report["failed"], 1)
+        self.assertEqual(report["errors"], ["7: time limit exceeded"])
+
+    @patch("marketplace.core.sync.sharding.celery_app")
+    def test_failed_shard_is_reported_as_failed(self, celery_app_mock):
+        task = MagicMock(side_effect=Exception("Database unavailable"))
+        celery_app_mock.tasks = {"sync_test": task}
+
+        report = run_sync_shard(None, "sync_test", [7, 8])
+
+        self.assertEqual(report["failed"], 2)
+        self.assertEqual(report["errors"][0], "7: Database unavailable")
+
+    def test_merged_duration_is_the_wall_clock_of_the_lanes(self):
+        report = merge_sync_reports(
+            [
+                dict(
+                    name="sync_test",
+                    duration=30.0,
+                    started_on=1000.0,
+                    finished_on=1030.0,
+                ),
+                dict(
+                    name="sync_test",
+                    duration=40.0,
+                    started_on=1005.0,
+                    finished_on=1045.0,
+                ),
+            ],
+            "sync_test",
+        )
+
+        self.assertEqual(report["duration"], 45.0)
+        self.assertEqual(report["busy_duration"], 70.0)
+
+    def test_merge_sync_reports(self):
+        report = merge_sync_reports(
+            [
+                dict(name="sync_test", synced=2, errors=["a: error"]),
+                dict(name="sync_test", synced=1, failed=1, errors=["b: error"]),
+                None,
+            ],
+            "sync_test",
+        )
+
+        self.assertEqual(report["synced"], 3)
+        self.assertEqual(report["failed"], 1)
+        self.assertEqual(report["errors"], ["a: error", "b: error"])
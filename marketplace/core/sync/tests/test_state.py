@@ -0,0 +1,49 @@
+from uuid import uuid4
+from unittest.mock import MagicMock, call
+
+from django.test import SimpleTestCase
+
+from marketplace.core.sync.state import SyncStateStore
+
+
+class SyncStateStoreTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.redis = MagicMock()
+        self.store = SyncStateStore(self.redis, "sync-app:{app_uuid}", 60)
+        self.apps = [MagicMock(uuid=uuid4()) for _ in range(3)]
+
+    def test_split_due_in_a_single_mget(self):
+        self.redis.mget.return_value = [None, "synced", None]
+
+        apps_due, apps_synced = self.store.split_due(self.apps)
+
+        self.assertEqual(apps_due, [self.apps[0], self.apps[2]])
+        self.assertEqual(apps_synced, [self.apps[1]])
+        self.redis.mget.assert_called_once_with(
+            [f"sync-app:{app.uuid}" for app in self.apps]
+        )
+        self.redis.get.assert_not_called()
+
+    def test_split_due_in_chunks(self):
+        self.store.CHUNK_SIZE = 2
+        self.redis.mget.side_effect = lambda keys: [None] * len(keys)
+
+        apps_due, _ = self.store.split_due(self.apps)
+
+        self.assertEqual(apps_due, self.apps)
+        self.assertEqual(self.redis.mget.call_count, 2)
+
+    def test_flush_writes_markers_in_a_pipeline(self):
+        for app in self.apps[:2]:
+            self.store.mark_synced(app)
+
+        self.assertEqual(self.store.flush(), 2)
+
+        pipeline = self.redis.pipeline.return_value
+        pipeline.set.assert_has_calls(
+            [call(f"sync-app:{app.uuid}", "synced", 60) for app in self.apps[:2]]
+        )
+        pipeline.execute.assert_called_once()
+        self.redis.set.assert_not_called()
+
+        self.assertEqual(self.store.flush(), 0)
@@ -15,6 +15,9 @@ User = get_user_model()
 
 
 class FakeRequestsResponse(object):
+    status_code = 200
+    headers = {}
+
     def __init__(self, data: dict, error_message: str = None):
         self._data = data
         self.error_message = error_message
@@ -0,0 +1,285 @@
+import json
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from celery import shared_task
+from django.test import SimpleTestCase, override_settings
+from redis.exceptions import ConnectionError
+
+from marketplace.clients.facebook.rate_limiter import (
+    GraphRateLimiter,
+    GraphRateLimitExceeded,
+)
+from marketplace.clients.facebook.transport import (
+    GraphTransport,
+    graph_request,
+    with_task_context,
+)
+from marketplace.core.tests.base import FakeRequestsResponse
+
+
+def _business_usage(call_count: int, regain_minutes: int = 0) -> str:
+    usage = dict(
+        type="WHATSAPP_BUSINESS_MANAGEMENT",
+        call_count=call_count,
+        total_cputime=1,
+        total_time=1,
+        estimated_time_to_regain_access=regain_minutes,
+    )
+    return json.dumps({"123": [usage]})
+
+
+@shared_task(name="graph_request_from_a_worker_thread")
+def graph_request_from_a_worker_thread(wrap: bool):
+    def request():
+        return graph_request("GET", "url")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(with_task_context(request) if wrap else request).result()
+
+
+class GraphRateLimiterTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        GraphRateLimiter._unavailable_until = 0
+
+        self.redis = MagicMock()
+        self.limiter = GraphRateLimiter(
+            rate=10, burst=20, usage_threshold=75, max_wait=5
+        )
+        self.limiter._redis = self.redis
+        self.script = self.redis.register_script.return_value
+
+    def test_key_does_not_expose_the_access_token(self):
+        key = self.limiter.get_key("secret-token", "123")
+
+        self.assertNotIn("secret-token", key)
+        self.assertTrue(key.endswith(":123"))
+        self.assertEqual(key, self.limiter.get_key("secret-token", "123"))
+
+    def test_usage_is_read_from_both_headers(self):
+        headers = {
+            "X-App-Usage": json.dumps(dict(call_count=12, total_time=40)),
+            "X-Business-Use-Case-Usage": _business_usage(60, regain_minutes=2),
+        }
+
+        self.assertEqual(self.limiter.get_usage(headers), (60.0, 120))
+
+    def test_missing_or_invalid_headers_have_no_usage(self):
+        self.assertEqual(self.limiter.get_usage({}), (None, 0))
+        self.assertEqual(self.limiter.get_usage({"X-App-Usage": "{"}), (None, 0))
+
+    def test_rate_is_reduced_over_the_usage_threshold(self):
+        self.assertEqual(self.limiter.get_factor(50), 1.0)
+        self.assertEqual(self.limiter.get_factor(90), 0.4)
+        self.assertEqual(self.limiter.get_factor(100), GraphRateLimiter.MIN_FACTOR)
+
+    def test_update_blocks_the_bucket_while_meta_asks_to_wait(self):
+        headers = {"X-Business-Use-Case-Usage": _business_usage(100, 1)}
+
+        with patch.object(GraphRateLimiter, "_now", return_value=1000):
+            self.assertTrue(self.limiter.update("key", headers))
+
+        mapping = self.redis.hset.call_args.kwargs["mapping"]
+        self.assertEqual(mapping["blocked_until"], 61000)
+        self.assertEqual(mapping["factor"], GraphRateLimiter.MIN_FACTOR)
+
+    def test_update_only_scales_the_rate_under_full_usage(self):
+        headers = {"X-Business-Use-Case-Usage": _business_usage(80)}
+
+        self.assertFalse(self.limiter.update("key", headers))
+        self.assertNotIn("blocked_until", self.redis.hset.call_args.kwargs["mapping"])
+
+    @patch("marketplace.clients.facebook.rate_limiter.time.sleep")
+    def test_acquire_waits_for_the_bucket(self, sleep_mock):
+        self.script.side_effect = [500, 0]
+
+        self.assertEqual(self.limiter.acquire("key"), 0.5)
+        sleep_mock.assert_called_once_with(0.5)
+
+    def test_acquire_takes_the_tokens_of_the_request(self):
+        self.script.return_value = 0
+
+        self.limiter.acquire("key", tokens=50)
+
+        self.assertEqual(self.script.call_args.kwargs["args"][-1], 50)
+
+    @patch("marketplace.clients.facebook.rate_limiter.time.sleep")
+    def test_acquire_gives_up_after_the_max_wait(self, sleep_mock):
+        self.script.return_value = 6000
+
+        with self.assertRaises(GraphRateLimitExceeded):
+            self.limiter.acquire("key")
+
+        sleep_mock.assert_not_called()
+
+    def test_requests_are_not_limited_when_redis_is_unavailable(self):
+        self.script.side_effect = ConnectionError()
+
+        self.assertEqual(self.limiter.acquire("key"), 0)
+        self.assertEqual(self.limiter.acquire("key"), 0)
+        self.assertFalse(self.limiter.block("key"))
+        self.assertEqual(self.script.call_count, 1)
+
+        GraphRateLimiter._unavailable_until = 0
+
+
+@patch("marketplace.clients.facebook.transport.time.sleep")
+@patch("requests.get")
+class GraphTransportTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.limiter = MagicMock()
+        self.limiter.update.return_value = False
+        self.limiter.block.return_value = True
+        self.transport = GraphTransport(limiter=self.limiter, max_retries=2)
+
+    def _response(self, data: dict, status_code: int = 200) -> FakeRequestsResponse:
+        response = FakeRequestsResponse(data)
+        response.status_code = status_code
+        return response
+
+    def test_request_takes_a_token_and_reports_the_usage(self, get_mock, sleep_mock):
+        get_mock.return_value = self._response({"id": "1"})
+        headers = {"Authorization": "Bearer token"}
+
+        response = self.transport.request("GET", "url", waba_id="123", headers=headers)
+
+        self.assertEqual(response.json(), {"id": "1"})
+        self.limiter.get_key.assert_called_once_with("token", "123")
+        self.limiter.acquire.assert_called_once()
+        self.limiter.update.assert_called_once()
+
+    @patch("requests.post")
+    def test_batch_request_takes_its_tokens(self, post_mock, get_mock, sleep_mock):
+        post_mock.return_value = self._response([])
+
+        self.transport.request("POST", "url", tokens=50, data=dict(batch="[]"))
+
+        self.assertEqual(self.limiter.acquire.call_args.kwargs["tokens"], 50)
+        post_mock.assert_called_once_with("url", data=dict(batch="[]"))
+
+    def test_throttled_request_is_retried_after_the_block(self, get_mock, sleep_mock):
+        throttled = self._response({"error": {"code": 80008}}, status_code=400)
+        get_mock.side_effect = [throttled, self._response({"id": "1"})]
+
+        response = self.transport.request("GET", "url", params={"access_token": "t"})
+
+        self.assertEqual(response.json(), {"id": "1"})
+        self.assertEqual(self.limiter.acquire.call_count, 2)
+        self.limiter.block.assert_called_once()
+        sleep_mock.assert_not_called()
+
+    @patch.object(GraphTransport, "in_task", return_value=True)
+    def test_backs_off_locally_when_the_block_is_not_stored(
+        self, in_task_mock, get_mock, sleep_mock
+    ):
+        self.limiter.block.return_value = False
+        get_mock.side_effect = [
+            self._response({}, status_code=429),
+            self._response({}, status_code=429),
+            self._response({}, status_code=429),
+        ]
+
+        response = self.transport.request("GET", "url")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(get_mock.call_count, 3)
+        self.assertEqual(sleep_mock.call_count, 2)
+
+    def test_web_requests_do_not_back_off_locally(self, get_mock, sleep_mock):
+        self.limiter.block.return_value = False
+        get_mock.return_value = self._response({}, status_code=429)
+
+        response = self.transport.request("GET", "url")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(get_mock.call_count, 1)
+        sleep_mock.assert_not_called()
+
+    @override_settings(
+        GRAPH_RATE_LIMIT_MAX_WAIT=120, GRAPH_RATE_LIMIT_REQUEST_MAX_WAIT=5
+    )
+    def test_only_tasks_wait_for_the_long_max_wait(self, get_mock, sleep_mock):
+        get_mock.return_value = self._response({"id": "1"})
+
+        self.transport.request("GET", "url")
+        self.assertEqual(self.limiter.acquire.call_args.kwargs["max_wait"], 5)
+
+        with patch.object(GraphTransport, "in_task", return_value=True):
+            self.transport.request("GET", "url")
+        self.assertEqual(self.limiter.acquire.call_args.kwargs["max_wait"], 120)
+
+    @patch("requests.post")
+    def test_streamed_body_is_not_sent_again(self, post_mock, get_mock, sleep_mock):
+        post_mock.return_value = self._response({}, status_code=429)
+        stream = iter([b"chunk"])
+
+        response = self.transport.request("POST", "url", data=stream)
+
+        self.assertEqual(response.status_code, 429)
+        post_mock.assert_called_once_with("url", data=stream)
+        self.limiter.block.assert_not_called()
+
+    def test_other_errors_are_not_retried(self, get_mock, sleep_mock):
+        get_mock.return_value = self._response({"error": {"code": 100}}, 400)
+
+        response = self.transport.request("GET", "url")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(get_mock.call_count, 1)
+
+    def test_request_is_not_sent_past_the_max_wait(self, get_mock, sleep_mock):
+        self.limiter.acquire.side_effect = GraphRateLimitExceeded("limit")
+
+        response = self.transport.request("GET", "url")
+
+        self.assertEqual(response.status_code, 429)
+        get_mock.assert_not_called()
+
+    @override_settings(GRAPH_RATE_LIMIT_ENABLED=False)
+    def test_disabled_limiter_sends_the_request(self, get_mock, sleep_mock):
+        get_mock.return_value = self._response({"id": "1"})
+
+        self.transport.request("GET", "url", params={"fields": "id"})
+
+        get_mock.assert_called_once_with("url", params={"fields": "id"})
+        self.limiter.acquire.assert_not_called()
+
+
+@override_settings(GRAPH_RATE_LIMIT_MAX_WAIT=120, GRAPH_RATE_LIMIT_REQUEST_MAX_WAIT=5)
+@patch("requests.get")
+class GraphTransportTaskContextTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.limiter = MagicMock()
+        self.limiter.update.return_value = False
+
+        patcher = patch(
+            "marketplace.clients.facebook.transport._transport",
+            GraphTransport(limiter=self.limiter),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_worker_threads_of_a_task_wait_as_the_task(self, get_mock):
+        get_mock.return_value = FakeRequestsResponse({"id": "1"})
+
+        graph_request_from_a_worker_thread.apply(args=[True])
+
+        self.assertEqual(self.limiter.acquire.call_args.kwargs["max_wait"], 120)
+
+    def test_unwrapped_worker_threads_do_not_know_the_task(self, get_mock):
+        get_mock.return_value = FakeRequestsResponse({"id": "1"})
+
+        graph_request_from_a_worker_thread.apply(args=[False])
+
+        self.assertEqual(self.limiter.acquire.call_args.kwargs["max_wait"], 5)
+
+    def test_worker_threads_of_a_web_request_do_not_wait(self, get_mock):
+        get_mock.return_value = FakeRequestsResponse({"id": "1"})
+
+        graph_request_from_a_worker_thread(True)
+
+        self.assertEqual(self.limiter.acquire.call_args.kwargs["max_wait"], 5)
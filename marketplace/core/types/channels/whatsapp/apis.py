@@ -1,16 +1,26 @@
 import json
+import time
+
+from itertools import zip_longest
 
 import requests
 from requests.models import Response
 from django.conf import settings
 
+from marketplace.clients.facebook.transport import graph_request
 from ..whatsapp_base.exceptions import FacebookApiException, UnableProcessProfilePhoto
 
 WHATSAPP_VERSION = settings.WHATSAPP_VERSION
 
+BATCH_MAX_SIZE = 50
+BATCH_MAX_RETRIES = 2
+BATCH_RETRY_DELAY = 2
+# Graph error codes for transient failures and throttling
+BATCH_RETRYABLE_ERROR_CODES = (1, 2, 4, 17, 32, 613, 80007)
+
 
-def _request(url: str, method: str = "GET", *args, **kwargs):
-    return requests.request(method.upper(), url, *args, **kwargs)
+def _request(url: str, method: str = "GET", **kwargs):
+    return graph_request(method, url, **kwargs)
 
 
 class BaseOnPremiseAPI(object):
@@ -106,16 +116,86 @@ class BaseFacebookBaseApi(object):
         return {"Authorization": f"Bearer {self._access_token}"}
 
     def _validate_response(self, response: Response):
-        error = response.json().get("error", None)
+        content = response.json()
+        error = content.get("error", None) if isinstance(content, dict) else None
         if error is not None:
             raise FacebookApiException(error.get("message"))
 
-    def _request(self, url: str, method: str = "GET", *args, **kwargs) -> Response:
-        response = _request(url, method, *args, **kwargs)
+    def _request(self, url: str, method: str = "GET", **kwargs) -> Response:
+        response = _request(url, method, **kwargs)
         self._validate_response(response)
 
         return response
 
+    def _get_batch_item_result(self, item: dict):
+        """
+        Returns the parsed body of a batch item, or a FacebookApiException
+        and whether the item is worth retrying
+        """
+        if item is None:
+            return FacebookApiException("The batch request timed out"), True
+
+        try:
+            body = json.loads(item.get("body") or "{}")
+        except ValueError:
+            body = {}
+
+        error = body.get("error") if isinstance(body, dict) else None
+        code = item.get("code", 500)
+
+        if error is None and code < 400:
+            return body, False
+
+        error = error or {}
+        retry = code >= 500 or error.get("code") in BATCH_RETRYABLE_ERROR_CODES
+        return FacebookApiException(error.get("message", f"HTTP {code}")), retry
+
+    def get_batch(self, relative_urls: list) -> list:
+        """
+        Runs the GET of every relative url through Graph `batch` requests of up to
+        BATCH_MAX_SIZE items. Only the failed items are retried. Returns one result per
+        url, in the same order, where a FacebookApiException marks a failed item.
+        """
+        results = {}
+        pending = list(dict.fromkeys(relative_urls))
+
+        for attempt in range(BATCH_MAX_RETRIES + 1):
+            if attempt > 0:
+                time.sleep(BATCH_RETRY_DELAY * attempt)
+
+            retry = []
+
+            for start in range(0, len(pending), BATCH_MAX_SIZE):
+                end = start + BATCH_MAX_SIZE
+                chunk = pending[start:end]
+                batch = [dict(method="GET", relative_url=url) for url in chunk]
+
+                # Meta counts every call of the batch against the rate limits
+                response = self._request(
+                    f"{settings.WHATSAPP_API_URL}/",
+                    method="POST",
+                    headers=self._headers,
+                    data=dict(batch=json.dumps(batch), include_headers="false"),
+                    tokens=len(chunk),
+                )
+
+                items = response.json()
+                if not isinstance(items, list):
+                    items = []
+
+                # A partial response misses the last items, they are retried
+                # like the ones Graph returned as null
+                for url, item in zip_longest(chunk, items[: len(chunk)]):
+                    results[url], should_retry = self._get_batch_item_result(item)
+                    if should_retry:
+                        retry.append(url)
+
+            pending = retry
+            if not pending:
+                break
+
+        return [results[url] for url in relative_urls]
+
 
 class FacebookConversationAPI(object):  # TODO: Use BaseFacebookBaseApi
     def _validate_response(self, response: Response):
@@ -123,8 +203,8 @@ class FacebookConversationAPI(object):  # TODO: Use BaseFacebookBaseApi
         if error is not None:
             raise FacebookApiException(error.get("message"))
 
-    def _request(self, *args, **kwargs) -> Response:
-        response = requests.get(*args, **kwargs)
+    def _request(self, url: str, **kwargs) -> Response:
+        response = graph_request("GET", url, **kwargs)
         self._validate_response(response)
 
         return response
@@ -169,6 +249,9 @@ class FacebookWABAApi(BaseFacebookBaseApi):
 
         return response.json()
 
+    def get_wabas(self, waba_ids: list) -> list:
+        return self.get_batch(waba_ids)
+
 
 class FacebookPhoneNumbersAPI(BaseFacebookBaseApi):
     def _get_url(self, endpoint: str) -> str:
@@ -186,6 +269,9 @@ class FacebookPhoneNumbersAPI(BaseFacebookBaseApi):
 
         return response.json()
 
+    def get_phone_numbers_by_id(self, phone_number_ids: list) -> list:
+        return self.get_batch(phone_number_ids)
+
 
 class OnPremiseBusinessProfileAPI(BaseOnPremiseAPI):
     _endpoint = "/v1/settings/business/profile"
@@ -1,5 +1,7 @@
 import logging
 
+from typing import Optional
+
 import phonenumbers
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -10,8 +12,14 @@ from marketplace.celery import app as celery_app
 from marketplace.core.types import APPTYPES
 from marketplace.applications.models import App
 from marketplace.connect.client import ConnectProjectClient
+from marketplace.core.sync.engine import SyncEngine
+from marketplace.core.sync.reconciliation import AppReconciler, chunked
+from marketplace.core.sync.fingerprints import SyncFingerprints
+from marketplace.core.sync.locks import SyncLease
+from marketplace.core.sync.reports import UNCHANGED, SyncReport
+from marketplace.core.sync.sharding import SyncSharding
+from marketplace.core.sync.state import SyncStateStore
 from .apis import FacebookWABAApi, FacebookPhoneNumbersAPI
-from ..whatsapp_base.exceptions import FacebookApiException
 
 
 User = get_user_model()
@@ -25,19 +33,38 @@ SYNC_WHATSAPP_PHONE_NUMBER_LOCK_KEY = "sync-whatsapp-phone-number-lock-app:{app_
 
 @celery_app.task(name="sync_whatsapp_apps")
 def sync_whatsapp_apps():
-    apptype = APPTYPES.get("wpp")
-    client = ConnectProjectClient()
-    channels = client.list_channels(apptype.flows_type_code, exclude_wpp_demo=True)
-
     redis = get_redis_connection()
+    lease = SyncLease(redis, SYNC_WHATSAPP_LOCK_KEY)
 
-    if redis.get(SYNC_WHATSAPP_LOCK_KEY):
+    if not lease.acquire():
         logger.info("The apps are already syncing by another task!")
         return None
 
-    else:
-        with redis.lock(SYNC_WHATSAPP_LOCK_KEY):
-            for channel in channels:
+    with lease:
+        apptype = APPTYPES.get("wpp")
+        client = ConnectProjectClient()
+        channels = client.list_channels(apptype.flows_type_code, exclude_wpp_demo=True)
+        channels = lease.remaining(channels, lambda channel: channel.get("uuid"))
+
+        reconciler = AppReconciler(
+            apptype,
+            User.objects.get_admin_user(),
+            fingerprints=[
+                SyncFingerprints(
+                    redis, kind, settings.WHATSAPP_SYNC_FINGERPRINTS_TIMEOUT
+                )
+                for kind in ("waba", "phone_number")
+            ],
+        )
+        reconciler.load_apps(channel.get("uuid") for channel in channels)
+        result = dict(created=0, updated=0, deleted=0, failed=0)
+
+        for chunk in chunked(channels, reconciler.chunk_size):
+            if lease.lost:
+                logger.warning("Stopping the apps sync, its lease was taken over")
+                return result
+
+            for channel in chunk:
                 channel_config = channel.get("config")
 
                 if channel.get("uuid") is None:
@@ -46,11 +73,9 @@ def sync_whatsapp_apps():
 
                 if channel.get("is_active") is False:
                     flow_channel_uuid = channel.get("uuid")
-                    apps_to_delete = App.objects.filter(
-                        flow_object_uuid=flow_channel_uuid
-                    )
-                    if apps_to_delete:
-                        delete_inactive_apps(apps_to_delete, flow_channel_uuid)
+                    app = reconciler.get(flow_channel_uuid)
+                    if app is not None:
+                        reconciler.deactivate(app)
 
                     logger.info(f"Skipping channel {flow_channel_uuid} is inactive.")
                     continue
@@ -62,11 +87,9 @@ def sync_whatsapp_apps():
                 config = {"title": channel.get("address")}
                 config.update(channel_config)
 
-                apps = App.objects.filter(flow_object_uuid=channel.get("uuid"))
-
-                if apps.exists():
-                    app = apps.first()
+                app = reconciler.get(channel.get("uuid"))
 
+                if app is not None:
                     if app.code != apptype.code:
                         logger.error(
                             f"This app: {app.uuid} has been migrated from {app.code} to wpp "
@@ -81,296 +104,412 @@ def sync_whatsapp_apps():
                         "auth_token",
                         "fb_access_token",
                     ]
-                    has_changes = False
-
-                    for field in sync_fields:
-                        if app.config.get(field) != config.get(field):
-                            app.config[field] = config.get(field)
-                            has_changes = True
+                    patch = {
+                        field: config.get(field)
+                        for field in sync_fields
+                        if app.config.get(field) != config.get(field)
+                    }
 
-                    if has_changes:
-                        app.modified_by = User.objects.get_admin_user()
-                        app.save()
+                    if patch:
+                        reconciler.patch(app, patch)
 
                 else:
-                    try:
-                        app = apptype.create_app(
-                            project_uuid=channel.get("project_uuid"),
-                            flow_object_uuid=channel.get("uuid"),
-                            config=config,
-                            created_by=User.objects.get_admin_user(),
-                        )
+                    reconciler.create(
+                        project_uuid=channel.get("project_uuid"),
+                        flow_object_uuid=channel.get("uuid"),
+                        config=config,
+                    )
 
-                        logger.info(
-                            f"A new whatsapp app was created automatically. UUID: {app.uuid}"
-                        )
-                    except Exception as e:
-                        logger.error(f"An error occurred while creating the app: {e}")
-                        continue
+            for field, count in reconciler.commit().items():
+                result[field] += count
+
+            lease.save_checkpoint(chunk[-1].get("uuid"))
+
+        lease.clear_checkpoint()
+        return result
 
 
 @celery_app.task(name="sync_whatsapp_wabas")
-def sync_whatsapp_wabas():
+def sync_whatsapp_wabas(app_ids: list = None):
     apptype = APPTYPES.get("wpp")
+    apps, sharded = SyncSharding.from_settings("sync_whatsapp_wabas").shard(
+        apptype.apps, app_ids
+    )
+    if sharded is not None:
+        return sharded
+
     redis = get_redis_connection()
+    report = SyncReport(name="sync_whatsapp_wabas")
 
-    for app in apptype.apps:
-        key = SYNC_WHATSAPP_WABA_LOCK_KEY.format(app_uuid=str(app.uuid))
+    apps_to_sync = []
 
-        if redis.get(key) is None:
-            config = app.config
-            access_token = config.get("fb_access_token", None)
-            business_id = config.get("fb_business_id", None)
+    state = SyncStateStore(
+        redis,
+        SYNC_WHATSAPP_WABA_LOCK_KEY,
+        settings.WHATSAPP_TIME_BETWEEN_SYNC_WABA_IN_HOURS,
+    )
+    apps_due, apps_synced = state.split_due(apps)
 
-            if access_token is None:
-                logger.info(
-                    f"Skipping the app because it doesn't contain `fb_access_token`. UUID: {app.uuid}"
-                )
-                continue
+    for app in apps_synced:
+        logger.info(
+            f"Skipping the app because it was recently synced. UUID: {app.uuid}"
+        )
+        report.add_skipped()
 
-            if business_id is None:
-                logger.info(
-                    f"Skipping the app because it doesn't contain `fb_business_id`. UUID: {app.uuid}"
-                )
-                continue
+    for app in apps_due:
+        config = app.config
+        access_token = config.get("fb_access_token", None)
+        business_id = config.get("fb_business_id", None)
 
-            logger.info(f"Syncing app WABA. UUID: {app.uuid}")
+        if access_token is None:
+            logger.info(
+                f"Skipping the app because it doesn't contain `fb_access_token`. UUID: {app.uuid}"
+            )
+            report.add_skipped()
+            continue
+
+        if business_id is None:
+            logger.info(
+                f"Skipping the app because it doesn't contain `fb_business_id`. UUID: {app.uuid}"
+            )
+            report.add_skipped()
+            continue
 
-            api = FacebookWABAApi(access_token)
+        logger.info(f"Syncing app WABA. UUID: {app.uuid}")
+        apps_to_sync.append(app)
 
-            try:
-                waba = api.get_waba(business_id)
-                app.config["waba"] = waba
-                app.modified_by = User.objects.get_admin_user()
-                app.save()
+    fingerprints = _load_fingerprints(redis, "waba", apps_to_sync)
 
-                redis.set(
-                    key, "synced", settings.WHATSAPP_TIME_BETWEEN_SYNC_WABA_IN_HOURS
-                )
-            except FacebookApiException as error:
-                logger.error(
-                    f"An error occurred while trying to sync the app. UUID: {app.uuid}. Error: {error}"
-                )
-                continue
+    def fetch_wabas(apps: list) -> list:
+        api = FacebookWABAApi(apps[0].config.get("fb_access_token"))
+        return api.get_wabas([app.config.get("fb_business_id") for app in apps])
 
-        else:
-            logger.info(
-                f"Skipping the app because it was recently synced. {redis.ttl(key)} seconds left. UUID: {app.uuid}"
-            )
+    return _run_batched_sync(
+        report,
+        state,
+        fingerprints,
+        apps_to_sync,
+        fetch_batch=fetch_wabas,
+        apply=_get_waba_applier(state, fingerprints),
+        key=lambda app: app.config.get("fb_access_token"),
+    )
 
 
 @celery_app.task(name="sync_whatsapp_cloud_wabas")
-def sync_whatsapp_cloud_wabas():
+def sync_whatsapp_cloud_wabas(app_ids: list = None):
     apptype = APPTYPES.get("wpp-cloud")
+    apps, sharded = SyncSharding.from_settings("sync_whatsapp_cloud_wabas").shard(
+        apptype.apps, app_ids
+    )
+    if sharded is not None:
+        return sharded
+
     redis = get_redis_connection()
+    report = SyncReport(name="sync_whatsapp_cloud_wabas")
 
-    for app in apptype.apps:
-        key = SYNC_WHATSAPP_WABA_LOCK_KEY.format(app_uuid=str(app.uuid))
+    apps_to_sync = []
 
-        if redis.get(key) is None:
-            config = app.config
-            wa_waba_id = config.get("wa_waba_id", None)
+    state = SyncStateStore(
+        redis,
+        SYNC_WHATSAPP_WABA_LOCK_KEY,
+        settings.WHATSAPP_TIME_BETWEEN_SYNC_WABA_IN_HOURS,
+    )
+    apps_due, apps_synced = state.split_due(apps)
 
-            if wa_waba_id is None:
-                logger.info(
-                    f"Skipping the app because it doesn't contain `wa_waba_id`. UUID: {app.uuid}"
-                )
-                continue
+    for app in apps_synced:
+        logger.info(
+            f"Skipping the app because it was recently synced. UUID: {app.uuid}"
+        )
+        report.add_skipped()
+
+    for app in apps_due:
+        wa_waba_id = app.config.get("wa_waba_id", None)
 
-            logger.info(f"Syncing app WABA. UUID: {app.uuid}")
+        if wa_waba_id is None:
+            logger.info(
+                f"Skipping the app because it doesn't contain `wa_waba_id`. UUID: {app.uuid}"
+            )
+            report.add_skipped()
+            continue
 
-            api = FacebookWABAApi(settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN)
+        logger.info(f"Syncing app WABA. UUID: {app.uuid}")
+        apps_to_sync.append(app)
 
-            try:
-                waba = api.get_waba(wa_waba_id)
-                app.config["waba"] = waba
-                app.modified_by = User.objects.get_admin_user()
-                app.save()
+    fingerprints = _load_fingerprints(redis, "waba", apps_to_sync)
 
-                redis.set(
-                    key, "synced", settings.WHATSAPP_TIME_BETWEEN_SYNC_WABA_IN_HOURS
-                )
-            except FacebookApiException as error:
-                logger.error(
-                    f"An error occurred while trying to sync the app. UUID: {app.uuid}. Error: {error}"
-                )
-                continue
+    def fetch_wabas(apps: list) -> list:
+        api = FacebookWABAApi(settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN)
+        return api.get_wabas([app.config.get("wa_waba_id") for app in apps])
 
-        else:
-            logger.info(
-                f"Skipping the app because it was recently synced. {redis.ttl(key)} seconds left. UUID: {app.uuid}"
-            )
+    return _run_batched_sync(
+        report,
+        state,
+        fingerprints,
+        apps_to_sync,
+        fetch_batch=fetch_wabas,
+        apply=_get_waba_applier(state, fingerprints),
+        key=lambda app: settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN,
+    )
 
 
 @celery_app.task(name="sync_whatsapp_phone_numbers")
-def sync_whatsapp_phone_numbers():
+def sync_whatsapp_phone_numbers(app_ids: list = None):
     apptype = APPTYPES.get("wpp")
+    apps, sharded = SyncSharding.from_settings("sync_whatsapp_phone_numbers").shard(
+        apptype.apps, app_ids
+    )
+    if sharded is not None:
+        return sharded
+
     redis = get_redis_connection()
+    report = SyncReport(name="sync_whatsapp_phone_numbers")
 
-    def config_app_phone_number(app: App, phone_number: dict):
-        phone_number_id = phone_number.get("id", None)
-        display_phone_number = phone_number.get("display_phone_number", None)
-        verified_name = phone_number.get("verified_name", None)
-        consent_status = phone_number.get("cert_status", None)
-        certificate = phone_number.get("certificate", None)
-
-        app.config["phone_number"] = dict(
-            id=phone_number_id,
-            display_phone_number=display_phone_number,
-            display_name=verified_name,
-        )
+    apps_to_sync = []
+    app_phone_numbers = {}
 
-        if consent_status is not None:
-            app.config["phone_number"]["cert_status"] = consent_status
+    state = SyncStateStore(
+        redis,
+        SYNC_WHATSAPP_PHONE_NUMBER_LOCK_KEY,
+        settings.WHATSAPP_TIME_BETWEEN_SYNC_PHONE_NUMBERS_IN_HOURS,
+    )
+    apps_due, apps_synced = state.split_due(apps)
 
-        if certificate is not None:
-            app.config["phone_number"]["certificate"] = certificate
+    for app in apps_synced:
+        logger.info(
+            f"Skipping the app because it was recently synced. UUID: {app.uuid}"
+        )
+        report.add_skipped()
 
-        app.save()
+    for app in apps_due:
+        config = app.config
+        access_token = config.get("fb_access_token", None)
+        business_id = config.get("fb_business_id", None)
 
-    for app in apptype.apps:
-        key = SYNC_WHATSAPP_PHONE_NUMBER_LOCK_KEY.format(app_uuid=str(app.uuid))
+        if access_token is None:
+            logger.info(
+                f"Skipping the app because it doesn't contain `fb_access_token`. UUID: {app.uuid}"
+            )
+            report.add_skipped()
+            continue
 
-        if redis.get(key) is None:
-            config = app.config
-            access_token = config.get("fb_access_token", None)
-            business_id = config.get("fb_business_id", None)
+        if business_id is None:
+            logger.info(
+                f"Skipping the app because it doesn't contain `fb_business_id`. UUID: {app.uuid}"
+            )
+            report.add_skipped()
+            continue
 
-            if access_token is None:
-                logger.info(
-                    f"Skipping the app because it doesn't contain `fb_access_token`. UUID: {app.uuid}"
+        if config.get("phone_number", {}).get("id", None) is None:
+            try:
+                app_phone_numbers[app.uuid] = phonenumbers.parse(
+                    config.get("title", None)
                 )
-                continue
-
-            if business_id is None:
+            except NumberParseException:
                 logger.info(
-                    f"Skipping the app because it doesn't contain `fb_business_id`. UUID: {app.uuid}"
+                    f"Skipping the app because it doesn't contain `title`. UUID: {app.uuid}"
                 )
+                report.add_skipped()
                 continue
 
-            logger.info(f"Syncing app phone number. UUID: {app.uuid}")
+        logger.info(f"Syncing app phone number. UUID: {app.uuid}")
+        apps_to_sync.append(app)
 
-            api = FacebookPhoneNumbersAPI(access_token)
+    fingerprints = _load_fingerprints(redis, "phone_number", apps_to_sync)
 
-            phone_number_id = config.get("phone_number", {}).get("id", None)
+    def get_relative_url(app: App) -> str:
+        phone_number_id = app.config.get("phone_number", {}).get("id", None)
 
-            try:
-                if phone_number_id is not None:
-                    phone_number = api.get_phone_number(phone_number_id)
-                    config_app_phone_number(app, phone_number)
+        if phone_number_id is not None:
+            return phone_number_id
 
-                else:
-                    try:
-                        app_phone_number = phonenumbers.parse(config.get("title", None))
-                    except NumberParseException:
-                        logger.info(
-                            f"Skipping the app because it doesn't contain `title`. UUID: {app.uuid}"
-                        )
-                        continue
-
-                    phone_numbers = api.get_phone_numbers(business_id)
+        return f"{app.config.get('fb_business_id')}/phone_numbers"
 
-                    for phone_number in phone_numbers:
-                        display_phone_number = phone_number.get("display_phone_number")
+    def fetch_phone_numbers(apps: list) -> list:
+        api = FacebookPhoneNumbersAPI(apps[0].config.get("fb_access_token"))
+        return api.get_batch([get_relative_url(app) for app in apps])
 
-                        if phonenumbers.parse(display_phone_number) == app_phone_number:
-                            config_app_phone_number(app, phone_number)
+    def apply_phone_number(app: App, result: dict) -> Optional[str]:
+        if fingerprints.is_unchanged(app, result, app.config.get("phone_number")):
+            state.mark_synced(app)
+            return UNCHANGED
 
-                redis.set(
-                    key,
-                    "synced",
-                    settings.WHATSAPP_TIME_BETWEEN_SYNC_PHONE_NUMBERS_IN_HOURS,
-                )
-            except FacebookApiException as error:
-                logger.error(
-                    f"An error occurred while trying to sync the app phone number. UUID: {app.uuid}. Error: {error}"
-                )
+        if app.uuid not in app_phone_numbers:
+            config_app_phone_number(app, result)
 
         else:
-            logger.info(
-                f"Skipping the app because it was recently synced. {redis.ttl(key)} seconds left. UUID: {app.uuid}"
-            )
+            for phone_number in result.get("data", []):
+                display_phone_number = phone_number.get("display_phone_number")
+
+                if phonenumbers.parse(display_phone_number) == app_phone_numbers.get(
+                    app.uuid
+                ):
+                    config_app_phone_number(app, phone_number)
+
+        fingerprints.remember(app, result, app.config.get("phone_number"))
+        state.mark_synced(app)
+
+    def config_app_phone_number(app: App, phone_number: dict):
+        app.patch_config({"phone_number": get_phone_number_config(phone_number)})
+
+    return _run_batched_sync(
+        report,
+        state,
+        fingerprints,
+        apps_to_sync,
+        fetch_batch=fetch_phone_numbers,
+        apply=apply_phone_number,
+        key=lambda app: app.config.get("fb_access_token"),
+    )
 
 
 @celery_app.task(name="sync_whatsapp_cloud_phone_numbers")
-def sync_whatsapp_cloud_phone_numbers():
+def sync_whatsapp_cloud_phone_numbers(app_ids: list = None):
     apptype = APPTYPES.get("wpp-cloud")
+    apps, sharded = SyncSharding.from_settings(
+        "sync_whatsapp_cloud_phone_numbers"
+    ).shard(apptype.apps, app_ids)
+    if sharded is not None:
+        return sharded
+
     redis = get_redis_connection()
+    report = SyncReport(name="sync_whatsapp_cloud_phone_numbers")
 
-    exceptions = []
+    apps_to_sync = []
 
-    for app in apptype.apps:
-        key = SYNC_WHATSAPP_PHONE_NUMBER_LOCK_KEY.format(app_uuid=str(app.uuid))
+    state = SyncStateStore(
+        redis,
+        SYNC_WHATSAPP_PHONE_NUMBER_LOCK_KEY,
+        settings.WHATSAPP_TIME_BETWEEN_SYNC_PHONE_NUMBERS_IN_HOURS,
+    )
+    apps_due, apps_synced = state.split_due(apps)
 
-        if redis.get(key) is None:
-            phone_number_id = app.config.get("wa_phone_number_id", None)
+    for app in apps_synced:
+        logger.info(
+            f"Skipping the app because it was recently synced. UUID: {app.uuid}"
+        )
+        report.add_skipped()
 
-            if phone_number_id is None:
-                logger.info(
-                    f"Skipping the app because it doesn't contain `wa_phone_number_id`. UUID: {app.uuid}"
-                )
-                continue
+    for app in apps_due:
+        if app.config.get("wa_phone_number_id", None) is None:
+            logger.info(
+                f"Skipping the app because it doesn't contain `wa_phone_number_id`. UUID: {app.uuid}"
+            )
+            report.add_skipped()
+            continue
 
-            try:
-                api = FacebookPhoneNumbersAPI(
-                    settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN
-                )
-                phone_number = api.get_phone_number(phone_number_id)
-
-                phone_number_id = phone_number.get("id", None)
-                display_phone_number = phone_number.get("display_phone_number", None)
-                verified_name = phone_number.get("verified_name", None)
-                consent_status = phone_number.get("cert_status", None)
-                certificate = phone_number.get("certificate", None)
-
-                app.config["phone_number"] = dict(
-                    id=phone_number_id,
-                    display_phone_number=display_phone_number,
-                    display_name=verified_name,
-                )
+        apps_to_sync.append(app)
 
-                if consent_status is not None:
-                    app.config["phone_number"]["cert_status"] = consent_status
+    admin_user = User.objects.get_admin_user() if apps_to_sync else None
+    fingerprints = _load_fingerprints(redis, "phone_number", apps_to_sync)
 
-                if certificate is not None:
-                    app.config["phone_number"]["certificate"] = certificate
+    def fetch_phone_numbers(apps: list) -> list:
+        api = FacebookPhoneNumbersAPI(settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN)
+        return api.get_phone_numbers_by_id(
+            [app.config.get("wa_phone_number_id") for app in apps]
+        )
 
-                app.modified_by = User.objects.get_admin_user()
+    def apply_phone_number(app: App, phone_number: dict) -> Optional[str]:
+        if fingerprints.is_unchanged(app, phone_number, app.config.get("phone_number")):
+            state.mark_synced(app)
+            return UNCHANGED
 
-                app.save()
-                redis.set(
-                    key,
-                    "synced",
-                    settings.WHATSAPP_TIME_BETWEEN_SYNC_PHONE_NUMBERS_IN_HOURS,
-                )
+        app.patch_config(
+            {"phone_number": get_phone_number_config(phone_number)}, user=admin_user
+        )
 
-            except Exception as e:
-                logger.exception(e)
-                exceptions.append(e)
-                continue
+        fingerprints.remember(app, phone_number, app.config.get("phone_number"))
+        state.mark_synced(app)
 
-        else:
-            logger.info(
-                f"Skipping the app because it was recently synced. {redis.ttl(key)} seconds left. UUID: {app.uuid}"
-            )
+    result = _run_batched_sync(
+        report,
+        state,
+        fingerprints,
+        apps_to_sync,
+        fetch_batch=fetch_phone_numbers,
+        apply=apply_phone_number,
+        key=lambda app: settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN,
+    )
 
-    if len(exceptions) > 0:
+    if report.failed > 0:
         logger.error(
-            f"Sync phone numbers task failed with {len(exceptions)} exception(s): {exceptions}"
+            f"Sync phone numbers task failed with {report.failed} exception(s): {report.errors}"
         )
 
+    return result
 
-def delete_inactive_apps(apps, flow_object_uuid):
-    for app in apps:
-        try:
-            # Ensures that it will only delete the app linked to the uuid of the flow
-            if str(app.flow_object_uuid) == flow_object_uuid:
-                templates = app.template.all()
-                if templates:
-                    app.template.all().delete()
 
-                app.delete()
-                logger.info(f"Inactive app: [{app.uuid}] deleted successfully")
-        except Exception as e:
-            logger.error(f"An error occurred while delete the app {app.uuid}: {e}")
-            continue
+def _get_waba_applier(state: SyncStateStore, fingerprints: SyncFingerprints):
+    admin_user = None
+
+    def apply_waba(app: App, waba: dict) -> Optional[str]:
+        nonlocal admin_user
+
+        if fingerprints.is_unchanged(app, waba, app.config.get("waba")):
+            state.mark_synced(app)
+            return UNCHANGED
+
+        if admin_user is None:
+            admin_user = User.objects.get_admin_user()
+
+        app.patch_config({"waba": waba}, user=admin_user)
+
+        fingerprints.remember(app, waba, app.config.get("waba"))
+        state.mark_synced(app)
+
+    return apply_waba
+
+
+def _load_fingerprints(redis, kind: str, apps: list) -> SyncFingerprints:
+    fingerprints = SyncFingerprints(
+        redis, kind, settings.WHATSAPP_SYNC_FINGERPRINTS_TIMEOUT
+    )
+    fingerprints.load(apps)
+    return fingerprints
+
+
+def _run_batched_sync(
+    report: SyncReport,
+    state: SyncStateStore,
+    fingerprints: SyncFingerprints,
+    apps: list,
+    fetch_batch,
+    apply,
+    key,
+) -> dict:
+    """
+    Fans the Graph lookups of the apps out in `batch` requests grouped by access token
+    and writes the sync markers and fingerprints of the applied apps back in pipelines
+    """
+    SyncEngine.from_settings().run_batched(
+        apps,
+        fetch_batch=fetch_batch,
+        apply=apply,
+        key=key,
+        batch_size=settings.WHATSAPP_SYNC_BATCH_SIZE,
+        report=report,
+        identifier=lambda app: str(app.uuid),
+    )
+    state.flush()
+    fingerprints.flush()
+
+    logger.info(str(report))
+    return report.as_dict()
+
+
+def get_phone_number_config(phone_number: dict) -> dict:
+    phone_number_config = dict(
+        id=phone_number.get("id", None),
+        display_phone_number=phone_number.get("display_phone_number", None),
+        display_name=phone_number.get("verified_name", None),
+    )
+
+    consent_status = phone_number.get("cert_status", None)
+    certificate = phone_number.get("certificate", None)
+
+    if consent_status is not None:
+        phone_number_config["cert_status"] = consent_status
+
+    if certificate is not None:
+        phone_number_config["certificate"] = certificate
+
+    return phone_number_config
@@ -1,13 +1,18 @@
+import json
 from typing import TYPE_CHECKING
 from unittest.mock import patch
 
 if TYPE_CHECKING:
     from unittest.mock import MagicMock
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from marketplace.core.tests import FakeRequestsResponse
-from ..apis import FacebookConversationAPI
+from ..apis import (
+    FacebookConversationAPI,
+    FacebookPhoneNumbersAPI,
+    FacebookWABAApi,
+)
 from marketplace.core.types.channels.whatsapp_base.exceptions import (
     FacebookApiException,
 )
@@ -25,7 +30,7 @@ class FacebookConversationAPITestCase(TestCase):
     @patch("requests.get")
     def test_requests_ok(self, mock: "MagicMock"):
         mock.return_value = FakeRequestsResponse({"conversation_analytics": {}})
-        response = self.api._request()
+        response = self.api._request("https://graph.facebook.com/123")
         self.assertIn("conversation_analytics", response.json())
 
     @patch("requests.get")
@@ -34,9 +39,115 @@ class FacebookConversationAPITestCase(TestCase):
         mock.return_value = FakeRequestsResponse({"error": {"message": error_message}})
 
         with self.assertRaisesMessage(FacebookApiException, error_message):
-            self.api._request()
+            self.api._request("https://graph.facebook.com/123")
 
     def test_get_fields_method(self):
         fields = self.api._get_fields("123", "321")
         self.assertIn("start(123)", fields)
         self.assertIn("end(321)", fields)
+
+
+# The batches would drain the shared redis bucket of the fake access token
+@override_settings(GRAPH_RATE_LIMIT_ENABLED=False)
+class FacebookBatchRequestTestCase(TestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.api = FacebookPhoneNumbersAPI("fake-access-token")
+
+    def _item(self, body: dict, code: int = 200) -> dict:
+        return {"code": code, "body": json.dumps(body)}
+
+    def _sent_urls(self, call) -> list:
+        return [
+            item["relative_url"] for item in json.loads(call.kwargs["data"]["batch"])
+        ]
+
+    @patch("marketplace.core.types.channels.whatsapp.apis.time.sleep")
+    @patch("requests.post")
+    def test_only_failed_items_are_retried(self, mock: "MagicMock", sleep_mock):
+        mock.side_effect = [
+            FakeRequestsResponse([self._item({"id": "1"}), self._item({}, code=500)]),
+            FakeRequestsResponse([self._item({"id": "2"})]),
+        ]
+
+        results = self.api.get_phone_numbers_by_id(["1", "2"])
+
+        self.assertEqual(results, [{"id": "1"}, {"id": "2"}])
+        self.assertEqual(mock.call_count, 2)
+        self.assertEqual(self._sent_urls(mock.call_args_list[1]), ["2"])
+
+    @patch("marketplace.core.types.channels.whatsapp.apis.time.sleep")
+    @patch("requests.post")
+    def test_timed_out_items_are_retried(self, mock: "MagicMock", sleep_mock):
+        mock.side_effect = [
+            FakeRequestsResponse([None]),
+            FakeRequestsResponse([self._item({"id": "1"})]),
+        ]
+
+        self.assertEqual(self.api.get_batch(["1"]), [{"id": "1"}])
+
+    @patch("marketplace.core.types.channels.whatsapp.apis.time.sleep")
+    @patch("requests.post")
+    def test_missing_items_are_retried(self, mock: "MagicMock", sleep_mock):
+        mock.side_effect = [
+            FakeRequestsResponse([self._item({"id": "1"})]),
+            FakeRequestsResponse([self._item({"id": "2"})]),
+        ]
+
+        self.assertEqual(self.api.get_batch(["1", "2"]), [{"id": "1"}, {"id": "2"}])
+        self.assertEqual(self._sent_urls(mock.call_args_list[1]), ["2"])
+
+    @patch("marketplace.core.types.channels.whatsapp.apis.time.sleep")
+    @patch("requests.post")
+    def test_items_never_returned_are_failed(self, mock: "MagicMock", sleep_mock):
+        mock.return_value = FakeRequestsResponse([])
+
+        results = self.api.get_batch(["1"])
+
+        self.assertIsInstance(results[0], FacebookApiException)
+
+    @patch("requests.post")
+    def test_item_errors_are_returned_without_retry(self, mock: "MagicMock"):
+        error = {"error": {"message": "Unsupported get request", "code": 100}}
+        mock.return_value = FakeRequestsResponse(
+            [self._item({"id": "1"}), self._item(error, code=400)]
+        )
+
+        results = self.api.get_batch(["1", "2"])
+
+        self.assertEqual(results[0], {"id": "1"})
+        self.assertIsInstance(results[1], FacebookApiException)
+        self.assertEqual(str(results[1]), "Unsupported get request")
+        self.assertEqual(mock.call_count, 1)
+
+    @patch("requests.post")
+    def test_lookups_are_split_in_batches_of_50(self, mock: "MagicMock"):
+        mock.side_effect = lambda url, **kwargs: FakeRequestsResponse(
+            [
+                self._item({"id": item["relative_url"]})
+                for item in json.loads(kwargs["data"]["batch"])
+            ]
+        )
+        waba_ids = [str(index) for index in range(120)] + ["0"]
+
+        results = FacebookWABAApi("fake-access-token").get_wabas(waba_ids)
+
+        self.assertEqual(mock.call_count, 3)
+        self.assertEqual([result["id"] for result in results], waba_ids)
+
+    @patch("marketplace.core.types.channels.whatsapp.apis.graph_request")
+    def test_batch_takes_a_token_per_call(self, mock: "MagicMock"):
+        mock.return_value = FakeRequestsResponse([self._item({"id": "1"})] * 3)
+
+        self.api.get_batch(["1", "2", "3"])
+
+        self.assertEqual(mock.call_args.kwargs["tokens"], 3)
+
+    @patch("requests.post")
+    def test_batch_request_error(self, mock: "MagicMock"):
+        mock.return_value = FakeRequestsResponse(
+            {"error": {"message": "Invalid token"}}
+        )
+
+        with self.assertRaisesMessage(FacebookApiException, "Invalid token"):
+            self.api.get_batch(["1"])
@@ -1,4 +1,5 @@
 import logging
+import time
 
 from datetime import timedelta
 from uuid import uuid4
@@ -13,16 +14,18 @@ from marketplace.core.types.channels.whatsapp.tasks import sync_whatsapp_cloud_w
 from marketplace.core.types.channels.whatsapp.tasks import sync_whatsapp_wabas
 from marketplace.core.types.channels.whatsapp.tasks import sync_whatsapp_phone_numbers
 from marketplace.core.types.channels.whatsapp.tasks import (
+    get_phone_number_config,
     sync_whatsapp_cloud_phone_numbers,
 )
 
 from marketplace.applications.models import App
+from marketplace.core.sync.fingerprints import get_fingerprint
 
 from marketplace.core.types.channels.whatsapp_base.exceptions import (
     FacebookApiException,
 )
 
-from unittest.mock import MagicMock
+from unittest.mock import ANY, MagicMock
 
 from marketplace.wpp_templates.models import TemplateMessage
 
@@ -129,8 +132,35 @@ class SyncWhatsAppAppsTaskTestCase(TestCase):
         list_channel_mock.return_value = self._get_mock_value(
             self.wpp_cloud_app.project_uuid, self.wpp_cloud_app.flow_object_uuid
         )
-        mock_redis.get.return_value = "sync-whatsapp-lock"
-        sync_whatsapp_apps()
+        self.redis_mock.set.return_value = None
+        mock_redis.return_value = self.redis_mock
+
+        self.assertIsNone(sync_whatsapp_apps())
+        list_channel_mock.assert_not_called()
+
+    @patch("marketplace.core.types.channels.whatsapp.tasks.get_redis_connection")
+    @patch("marketplace.connect.client.ConnectProjectClient.list_channels")
+    def test_interrupted_sync_resumes_after_the_checkpoint(
+        self, list_channel_mock: "MagicMock", mock_redis
+    ) -> None:
+        project_uuid = str(uuid4())
+        first_uuid, second_uuid = sorted([str(uuid4()), str(uuid4())])
+
+        list_channel_mock.return_value = self._get_mock_value(
+            project_uuid, second_uuid
+        ) + self._get_mock_value(project_uuid, first_uuid)
+        self.redis_mock.get.return_value = first_uuid.encode()
+        mock_redis.return_value = self.redis_mock
+
+        result = sync_whatsapp_apps()
+
+        self.assertEqual(result["created"], 1)
+        self.assertFalse(App.objects.filter(flow_object_uuid=first_uuid).exists())
+        self.assertTrue(App.objects.filter(flow_object_uuid=second_uuid).exists())
+        self.redis_mock.set.assert_any_call(
+            "sync-whatsapp-lock:checkpoint", second_uuid, ex=ANY
+        )
+        self.redis_mock.delete.assert_called_with("sync-whatsapp-lock:checkpoint")
 
     @patch("marketplace.core.types.channels.whatsapp.tasks.get_redis_connection")
     @patch("marketplace.connect.client.ConnectProjectClient.list_channels")
@@ -197,13 +227,17 @@ class SyncWhatsAppAppsTaskTestCase(TestCase):
         )
 
         self.assertFalse(App.objects.filter(flow_object_uuid=flow_object_uuid).exists())
+        for kind in ("waba", "phone_number"):
+            self.redis_mock.hdel.assert_any_call(
+                f"sync-fingerprints:{kind}", str(self.wpp_app.uuid)
+            )
 
     @patch("marketplace.core.types.channels.whatsapp.tasks.get_redis_connection")
     @patch("marketplace.connect.client.ConnectProjectClient.list_channels")
-    @patch("marketplace.core.types.channels.whatsapp.tasks.logger")
-    @patch("marketplace.core.types.channels.whatsapp.tasks.APPTYPES.get")
+    @patch("marketplace.core.sync.reconciliation.logger")
+    @patch("marketplace.core.sync.reconciliation.App.objects.bulk_create")
     def test_app_creation_error(
-        self, apptype_mock, logger_mock, list_channel_mock: "MagicMock", mock_redis
+        self, bulk_create_mock, logger_mock, list_channel_mock: "MagicMock", mock_redis
     ) -> None:
         project_uuid = str(uuid4())
         flow_object_uuid = str(uuid4())
@@ -213,7 +247,7 @@ class SyncWhatsAppAppsTaskTestCase(TestCase):
 
         list_channel_mock.return_value = channel_value
 
-        apptype_mock.return_value.create_app.side_effect = Exception()
+        bulk_create_mock.side_effect = Exception()
         mock_redis.return_value = self.redis_mock
 
         sync_whatsapp_apps()
@@ -257,10 +291,13 @@ class SyncWhatsAppAppsTaskTestCase(TestCase):
 
     @patch("marketplace.core.types.channels.whatsapp.tasks.get_redis_connection")
     @patch("marketplace.connect.client.ConnectProjectClient.list_channels")
-    @patch("marketplace.core.types.channels.whatsapp.tasks.logger")
-    @patch("django.db.models.query.QuerySet.delete", Exception)
+    @patch("marketplace.core.sync.reconciliation.logger")
+    @patch(
+        "django.db.models.query.QuerySet.delete",
+        side_effect=Exception("Cannot delete some instances of model 'App'"),
+    )
     def test_skip_inactive_channel_and_delete_exception(
-        self, logger_mock, list_channel_mock: "MagicMock", mock_redis
+        self, delete_mock, logger_mock, list_channel_mock: "MagicMock", mock_redis
     ) -> None:
         project_uuid = str(uuid4())
         flow_object_uuid = str(uuid4())
@@ -298,6 +335,7 @@ class SyncWhatsappCloudWabaViewTestCase(TestCase):
     def setUp(self) -> None:
         self.redis_mock = MagicMock()
         self.redis_mock.get.return_value = None
+        self.redis_mock.mget.side_effect = lambda keys: [None] * len(keys)
 
         lock_mock = MagicMock()
         lock_mock.__enter__.return_value = None
@@ -345,7 +383,9 @@ class SyncWhatsappCloudWabaViewTestCase(TestCase):
 
         apptypes_mock.get.return_value = MagicMock(apps=[app])
 
-        facebook_waba_api_mock.return_value = MagicMock(get_waba=lambda x: "0123456789")
+        facebook_waba_api_mock.return_value = MagicMock(
+            get_wabas=lambda waba_ids: ["0123456789" for _ in waba_ids]
+        )
         sync_whatsapp_cloud_wabas()
         self.assertNotEqual(before_config, app.config)
 
@@ -369,8 +409,8 @@ class SyncWhatsappCloudWabaViewTestCase(TestCase):
         before_config = app.config.copy()
 
         apptypes_mock.get.return_value = MagicMock(apps=[app])
-        facebook_waba_api_mock.return_value.get_waba.side_effect = FacebookApiException(
-            "Something wrong"
+        facebook_waba_api_mock.return_value.get_wabas.side_effect = (
+            FacebookApiException("Something wrong")
         )
 
         sync_whatsapp_cloud_wabas()
@@ -384,7 +424,7 @@ class SyncWhatsappCloudWabaViewTestCase(TestCase):
         self, facebook_waba_api_mock, apptypes_mock, redis_mock
     ):
         redis = redis_mock.return_value
-        redis.ttl.return_value = timedelta(hours=1).seconds
+        redis.mget.return_value = ["synced"]
 
         data = {"wa_waba_id": "0123456789", "waba": "0123456789"}
         wpp_cloud_type = self.type
@@ -399,7 +439,9 @@ class SyncWhatsappCloudWabaViewTestCase(TestCase):
         redis.set(key, "synced", timedelta(minutes=30).seconds)
 
         apptypes_mock.get.return_value = MagicMock(apps=[app])
-        facebook_waba_api_mock.return_value = MagicMock(get_waba=lambda x: "0123456789")
+        facebook_waba_api_mock.return_value = MagicMock(
+            get_wabas=lambda waba_ids: ["0123456789" for _ in waba_ids]
+        )
 
         sync_whatsapp_cloud_wabas()
         # Simulates situation where the application has already been synchronized
@@ -410,6 +452,7 @@ class SyncWhatsappWabaViewTestCase(TestCase):
     def setUp(self) -> None:
         self.redis_mock = MagicMock()
         self.redis_mock.get.return_value = None
+        self.redis_mock.mget.side_effect = lambda keys: [None] * len(keys)
 
         lock_mock = MagicMock()
         lock_mock.__enter__.return_value = None
@@ -476,7 +519,9 @@ class SyncWhatsappWabaViewTestCase(TestCase):
             created_by=User.objects.get_admin_user(),
         )
         before_config = app.config.copy()
-        facebook_waba_api_mock.return_value = MagicMock(get_waba=lambda x: "0123456789")
+        facebook_waba_api_mock.return_value = MagicMock(
+            get_wabas=lambda waba_ids: ["0123456789" for _ in waba_ids]
+        )
         apptypes_mock.get.return_value = MagicMock(apps=[app])
         sync_whatsapp_wabas()
         # Assert the app has modifiedy after runing sync task
@@ -506,8 +551,8 @@ class SyncWhatsappWabaViewTestCase(TestCase):
         before_config = app.config.copy()
 
         apptypes_mock.get.return_value = MagicMock(apps=[app])
-        facebook_waba_api_mock.return_value.get_waba.side_effect = FacebookApiException(
-            "Something wrong"
+        facebook_waba_api_mock.return_value.get_wabas.side_effect = (
+            FacebookApiException("Something wrong")
         )
 
         sync_whatsapp_wabas()
@@ -521,7 +566,7 @@ class SyncWhatsappWabaViewTestCase(TestCase):
         self, facebook_waba_api_mock, apptypes_mock, redis_mock
     ):
         redis = redis_mock.return_value
-        redis.ttl.return_value = timedelta(hours=1).seconds
+        redis.mget.return_value = ["synced"]
 
         data = {
             "wa_waba_id": "0123456789",
@@ -540,7 +585,9 @@ class SyncWhatsappWabaViewTestCase(TestCase):
         redis.set(key, "synced", timedelta(minutes=30).seconds)
 
         apptypes_mock.get.return_value = MagicMock(apps=[app])
-        facebook_waba_api_mock.return_value = MagicMock(get_waba=lambda x: "0123456789")
+        facebook_waba_api_mock.return_value = MagicMock(
+            get_wabas=lambda waba_ids: ["0123456789" for _ in waba_ids]
+        )
 
         sync_whatsapp_wabas()
         # Simulates situation where the application has already been synchronized
@@ -551,6 +598,7 @@ class SyncWhatsappPhoneNumberViewTestCase(TestCase):
     def setUp(self) -> None:
         self.redis_mock = MagicMock()
         self.redis_mock.get.return_value = None
+        self.redis_mock.mget.side_effect = lambda keys: [None] * len(keys)
 
         lock_mock = MagicMock()
         lock_mock.__enter__.return_value = None
@@ -592,7 +640,7 @@ class SyncWhatsappPhoneNumberViewTestCase(TestCase):
         )
         before_config = app.config.copy()
         facebook_get_phone_number_api_mock.return_value = MagicMock(
-            get_phone_number=lambda x: phone_number_data
+            get_batch=lambda urls: [phone_number_data for _ in urls]
         )
         apptypes_mock.get.return_value = MagicMock(apps=[app])
         sync_whatsapp_phone_numbers()
@@ -682,7 +730,7 @@ class SyncWhatsappPhoneNumberViewTestCase(TestCase):
         )
         before_config = app.config.copy()
         facebook_get_phone_number_api_mock.return_value = MagicMock(
-            get_phone_numbers=lambda x: [phone_number_data]
+            get_batch=lambda urls: [{"data": [phone_number_data]} for _ in urls]
         )
         apptypes_mock.get.return_value = MagicMock(apps=[app])
         sync_whatsapp_phone_numbers()
@@ -712,7 +760,7 @@ class SyncWhatsappPhoneNumberViewTestCase(TestCase):
         )
         before_config = app.config.copy()
         apptypes_mock.get.return_value = MagicMock(apps=[app])
-        facebook_get_phone_number_api_mock.return_value.get_phone_number.side_effect = (
+        facebook_get_phone_number_api_mock.return_value.get_batch.side_effect = (
             FacebookApiException("Something wrong")
         )
 
@@ -755,7 +803,7 @@ class SyncWhatsappPhoneNumberViewTestCase(TestCase):
         self, facebook_get_phone_number_api_mock, apptypes_mock, mock_redis
     ):
         redis = mock_redis.return_value
-        redis.ttl.return_value = timedelta(hours=1).seconds
+        redis.mget.return_value = ["synced"]
 
         data = {
             "fb_access_token": "0123456789",
@@ -780,7 +828,7 @@ class SyncWhatsappPhoneNumberViewTestCase(TestCase):
         )
         before_config = app.config.copy()
         facebook_get_phone_number_api_mock.return_value = MagicMock(
-            get_phone_number=lambda x: phone_number_data
+            get_batch=lambda urls: [phone_number_data for _ in urls]
         )
         apptypes_mock.get.return_value = MagicMock(apps=[app])
 
@@ -797,6 +845,7 @@ class SyncWhatsappCloudPhoneNumberViewTestCase(TestCase):
     def setUp(self) -> None:
         self.redis_mock = MagicMock()
         self.redis_mock.get.return_value = None
+        self.redis_mock.mget.side_effect = lambda keys: [None] * len(keys)
 
         lock_mock = MagicMock()
         lock_mock.__enter__.return_value = None
@@ -835,7 +884,7 @@ class SyncWhatsappCloudPhoneNumberViewTestCase(TestCase):
         )
         before_config = app.config.copy()
         facebook_get_phone_number_api_mock.return_value = MagicMock(
-            get_phone_number=lambda x: phone_number_data
+            get_phone_numbers_by_id=lambda ids: [phone_number_data for _ in ids]
         )
         apptypes_mock.get.return_value = MagicMock(apps=[app])
         sync_whatsapp_cloud_phone_numbers()
@@ -886,8 +935,8 @@ class SyncWhatsappCloudPhoneNumberViewTestCase(TestCase):
         )
         before_config = app.config.copy()
         apptypes_mock.get.return_value = MagicMock(apps=[app])
-        facebook_get_phone_number_api_mock.return_value.get_phone_number.side_effect = (
-            FacebookApiException("Something wrong")
+        facebook_get_phone_number_api_mock.return_value.get_phone_numbers_by_id.side_effect = FacebookApiException(
+            "Something wrong"
         )
 
         sync_whatsapp_cloud_phone_numbers()
@@ -901,7 +950,7 @@ class SyncWhatsappCloudPhoneNumberViewTestCase(TestCase):
         self, facebook_get_phone_number_api_mock, apptypes_mock, mock_redis
     ):
         redis = mock_redis.return_value
-        redis.ttl.return_value = timedelta(hours=1).seconds
+        redis.mget.return_value = ["synced"]
 
         data = {
             "wa_phone_number_id": "0123456789",
@@ -924,7 +973,7 @@ class SyncWhatsappCloudPhoneNumberViewTestCase(TestCase):
         )
         before_config = app.config.copy()
         facebook_get_phone_number_api_mock.return_value = MagicMock(
-            get_phone_number=lambda x: phone_number_data
+            get_phone_numbers_by_id=lambda ids: [phone_number_data for _ in ids]
         )
         apptypes_mock.get.return_value = MagicMock(apps=[app])
 
@@ -935,3 +984,125 @@ class SyncWhatsappCloudPhoneNumberViewTestCase(TestCase):
 
         # Assert the app has not modifiedy after runing sync task
         self.assertEqual(before_config, app.config)
+
+    @patch("marketplace.core.types.channels.whatsapp.tasks.FacebookPhoneNumbersAPI")
+    @patch("marketplace.core.types.channels.whatsapp.tasks.APPTYPES")
+    @patch("marketplace.core.types.channels.whatsapp.tasks.get_redis_connection")
+    def test_sync_wpp_cloud_phone_numbers_report(
+        self, mock_redis, apptypes_mock, facebook_get_phone_number_api_mock
+    ):
+        mock_redis.return_value = self.redis_mock
+
+        apps = [
+            self.type.create_app(
+                config=config,
+                project_uuid=uuid4(),
+                flow_object_uuid=uuid4(),
+                created_by=User.objects.get_admin_user(),
+            )
+            for config in (
+                {"wa_phone_number_id": "0123456789"},
+                {"wa_phone_number_id": "9876543210"},
+                {},
+            )
+        ]
+
+        def get_phone_numbers_by_id(phone_number_ids):
+            return [
+                FacebookApiException("Something wrong")
+                if phone_number_id == "9876543210"
+                else {"id": phone_number_id, "display_phone_number": "+5584999999999"}
+                for phone_number_id in phone_number_ids
+            ]
+
+        facebook_get_phone_number_api_mock.return_value = MagicMock(
+            get_phone_numbers_by_id=get_phone_numbers_by_id
+        )
+        apptypes_mock.get.return_value = MagicMock(apps=apps)
+
+        report = sync_whatsapp_cloud_phone_numbers()
+
+        self.assertEqual(report["synced"], 1)
+        self.assertEqual(report["failed"], 1)
+        self.assertEqual(report["skipped"], 1)
+        self.assertEqual(apps[0].config["phone_number"]["id"], "0123456789")
+        self.assertNotIn("phone_number", apps[1].config)
+
+    def _stored_phone_number_fingerprint(self, phone_number: dict) -> str:
+        fingerprint = get_fingerprint(
+            phone_number, get_phone_number_config(phone_number)
+        )
+        return f"{fingerprint}:{int(time.time())}"
+
+    @patch("marketplace.core.types.channels.whatsapp.tasks.FacebookPhoneNumbersAPI")
+    @patch("marketplace.core.types.channels.whatsapp.tasks.APPTYPES")
+    @patch("marketplace.core.types.channels.whatsapp.tasks.get_redis_connection")
+    def test_sync_wpp_cloud_phone_numbers_skips_unchanged_payloads(
+        self, mock_redis, apptypes_mock, facebook_get_phone_number_api_mock
+    ):
+        mock_redis.return_value = self.redis_mock
+
+        phone_number = {"id": "0123456789", "display_phone_number": "+5584999999999"}
+        self.redis_mock.hmget.side_effect = lambda key, uuids: [
+            self._stored_phone_number_fingerprint(phone_number) for _ in uuids
+        ]
+
+        app = self.type.create_app(
+            config={
+                "wa_phone_number_id": "0123456789",
+                "phone_number": get_phone_number_config(phone_number),
+            },
+            project_uuid=uuid4(),
+            flow_object_uuid=uuid4(),
+            created_by=User.objects.get_admin_user(),
+        )
+        modified_on = app.modified_on
+
+        facebook_get_phone_number_api_mock.return_value = MagicMock(
+            get_phone_numbers_by_id=lambda ids: [phone_number for _ in ids]
+        )
+        apptypes_mock.get.return_value = MagicMock(apps=[app])
+
+        report = sync_whatsapp_cloud_phone_numbers()
+
+        self.assertEqual(report["unchanged"], 1)
+        self.assertEqual(report["synced"], 0)
+
+        app.refresh_from_db()
+        self.assertEqual(app.modified_on, modified_on)
+
+    @patch("marketplace.core.types.channels.whatsapp.tasks.FacebookPhoneNumbersAPI")
+    @patch("marketplace.core.types.channels.whatsapp.tasks.APPTYPES")
+    @patch("marketplace.core.types.channels.whatsapp.tasks.get_redis_connection")
+    def test_sync_wpp_cloud_phone_numbers_repairs_a_drifted_config(
+        self, mock_redis, apptypes_mock, facebook_get_phone_number_api_mock
+    ):
+        mock_redis.return_value = self.redis_mock
+
+        phone_number = {"id": "0123456789", "display_phone_number": "+5584999999999"}
+        self.redis_mock.hmget.side_effect = lambda key, uuids: [
+            self._stored_phone_number_fingerprint(phone_number) for _ in uuids
+        ]
+
+        # The payload did not change but the config lost its phone number
+        app = self.type.create_app(
+            config={"wa_phone_number_id": "0123456789"},
+            project_uuid=uuid4(),
+            flow_object_uuid=uuid4(),
+            created_by=User.objects.get_admin_user(),
+        )
+
+        facebook_get_phone_number_api_mock.return_value = MagicMock(
+            get_phone_numbers_by_id=lambda ids: [phone_number for _ in ids]
+        )
+        apptypes_mock.get.return_value = MagicMock(apps=[app])
+
+        report = sync_whatsapp_cloud_phone_numbers()
+
+        self.assertEqual(report["unchanged"], 0)
+        self.assertEqual(report["synced"], 1)
+
+        app.refresh_from_db()
+        self.assertEqual(
+            app.config["phone_number"], get_phone_number_config(phone_number)
+        )
@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 import requests
 from django.conf import settings
@@ -61,6 +61,14 @@ class WhatsAppViewSet(
 
         return access_token
 
+    def get_conversation_waba(self, app) -> Optional[tuple]:
+        waba_id = app.config.get("fb_business_id", None)
+        access_token = app.config.get("fb_access_token", None)
+        if waba_id is None or access_token is None:
+            return None
+
+        return (waba_id, access_token)
+
     @property
     def profile_config_credentials(self) -> dict:
         config = self.get_object().config
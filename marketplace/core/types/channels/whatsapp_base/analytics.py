@@ -0,0 +1,178 @@
+"""
+Daily conversation analytics of the WABAs.
+
+The conversations of every day are stored under `(waba_id, day)` already summed
+by direction, type and category. Meta still updates the last closed days, so the
+current day and the days closed for less than
+WHATSAPP_CONVERSATION_ANALYTICS_SETTLED_DAYS expire after a short TTL, the
+settled ones are kept for WHATSAPP_CONVERSATION_ANALYTICS_TTL. A request only
+asks Meta for the days not stored yet and sums the stored ones locally, for one
+WABA or all those of a project.
+
+Meta aligns the days to the timezone of the WABA, which is not known here. Each
+of its days is stored under the UTC day of the nearest midnight, so the local
+days are counted whole under their own date but a range covers the WABA hours
+of its UTC days only approximately.
+"""
+
+import json
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from marketplace.clients.facebook.transport import with_task_context
+from marketplace.wpp_templates.analytics.cache import DAY, get_days, get_today
+
+
+logger = logging.getLogger(__name__)
+
+
+CONVERSATION_ANALYTICS_KEY = "wpp-conversation-analytics:{waba_id}:{day}"
+
+DIMENSIONS = ("conversation_direction", "conversation_type", "conversation_category")
+
+
+def aggregate_data_points(data_points: Iterable[dict]) -> list:
+    """
+    Sums the conversations of the data points sharing the same dimensions
+    """
+    counts = {}
+    for point in data_points:
+        dimensions = tuple(point.get(dimension) for dimension in DIMENSIONS)
+        counts[dimensions] = counts.get(dimensions, 0) + point.get("conversation", 0)
+
+    return [
+        dict(zip(DIMENSIONS, dimensions), conversation=conversation)
+        for dimensions, conversation in counts.items()
+    ]
+
+
+class ConversationAnalyticsStore(object):
+    def __init__(self, redis=None) -> None:
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    def _key(self, waba_id: str, day: int) -> str:
+        return CONVERSATION_ANALYTICS_KEY.format(waba_id=waba_id, day=day)
+
+    def get_many(self, waba_id: str, days: list) -> dict:
+        """
+        Returns the stored data points by day, an empty list for the days
+        without conversations
+        """
+        if not days:
+            return {}
+
+        try:
+            values = self.redis.mget([self._key(waba_id, day) for day in days])
+        except RedisError as error:
+            logger.warning(f"Could not read the conversation analytics: {error}")
+            return {}
+
+        return {
+            day: json.loads(value)
+            for day, value in zip(days, values)
+            if value is not None
+        }
+
+    def set_many(self, waba_id: str, data_points: dict) -> None:
+        """
+        Stores the data points by day, each expiring after the TTL of its day
+        """
+        today = get_today()
+
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            for day, points in data_points.items():
+                pipeline.set(
+                    self._key(waba_id, day),
+                    json.dumps(points),
+                    ex=self.get_ttl(day, today),
+                )
+
+            pipeline.execute()
+        except RedisError as error:
+            logger.warning(f"Could not write the conversation analytics: {error}")
+
+    @staticmethod
+    def get_ttl(day: int, today: int) -> int:
+        if day >= today:
+            return settings.WHATSAPP_CONVERSATION_ANALYTICS_TODAY_TTL
+
+        if day >= today - settings.WHATSAPP_CONVERSATION_ANALYTICS_SETTLED_DAYS * DAY:
+            return settings.WHATSAPP_CONVERSATION_ANALYTICS_RECENT_TTL
+
+        return settings.WHATSAPP_CONVERSATION_ANALYTICS_TTL
+
+
+class ConversationAnalytics(object):
+    """
+    Serves the conversation analytics from the store, `fetch` requests the
+    data points of a WABA between two timestamps to Meta
+    """
+
+    def __init__(self, fetch, store: ConversationAnalyticsStore = None) -> None:
+        self.fetch = fetch
+        self.store = store or ConversationAnalyticsStore()
+
+    def get_data_points(self, waba_id: str, access_token: str, start: int, end: int):
+        days = get_days(start, end)
+        stored = self.store.get_many(waba_id, days)
+
+        missing = [day for day in days if day not in stored]
+        if missing:
+            fetched = self.fetch_days(waba_id, access_token, missing)
+            self.store.set_many(waba_id, fetched)
+            stored.update(fetched)
+
+        return [point for day in days for point in stored[day]]
+
+    def get_many_data_points(self, wabas: list, start: int, end: int) -> list:
+        """
+        Returns the data points of every `(waba_id, access_token)`, the WABAs
+        missing days are requested concurrently
+        """
+        if not wabas:
+            return []
+
+        max_workers = min(
+            settings.WHATSAPP_CONVERSATION_ANALYTICS_CONCURRENCY, len(wabas)
+        )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                with_task_context(lambda waba: self.get_data_points(*waba, start, end)),
+                wabas,
+            )
+            return aggregate_data_points(
+                point for data_points in results for point in data_points
+            )
+
+    def fetch_days(self, waba_id: str, access_token: str, days: list) -> dict:
+        """
+        Requests the missing days to Meta in a single call and sums their data
+        points, the days without conversations come back empty
+        """
+        data_points = self.fetch(waba_id, access_token, days[0], days[-1] + DAY - 1)
+
+        buckets = {day: [] for day in days}
+        for point in data_points:
+            start = point.get("start", days[0])
+            # The local midnight of the WABA is at most half a day away from the
+            # UTC one of the same date, points out of the range go to its edges
+            day = start + DAY // 2
+            day = min(max(day - day % DAY, days[0]), days[-1])
+
+            if day in buckets:
+                buckets[day].append(point)
+
+        return {day: aggregate_data_points(points) for day, points in buckets.items()}
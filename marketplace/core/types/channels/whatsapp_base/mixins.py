@@ -1,6 +1,6 @@
 import abc
 import calendar
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 from datetime import datetime
 
 from rest_framework.decorators import action
@@ -60,6 +60,13 @@ class WhatsAppConversationsMixin(object, metaclass=abc.ABCMeta):
     def get_access_token(self) -> dict:
         pass  # pragma: no cover
 
+    @abc.abstractmethod
+    def get_conversation_waba(self, app) -> Optional[tuple]:
+        """
+        Returns the `(waba_id, access_token)` of an app, None when it has no WABA
+        """
+        pass  # pragma: no cover
+
     @action(detail=True, methods=["GET"], permission_classes=[ProjectViewPermission])
     def conversations(self, request: "Request", **kwargs) -> Response:
         date_params = QueryParamsParser(request.query_params)
@@ -76,6 +83,32 @@ class WhatsAppConversationsMixin(object, metaclass=abc.ABCMeta):
 
         return Response(conversations.__dict__())
 
+    @action(detail=False, methods=["GET"], permission_classes=[ProjectViewPermission])
+    def project_conversations(self, request: "Request", **kwargs) -> Response:
+        project_uuid = request.query_params.get("project_uuid", None)
+        if project_uuid is None:
+            raise ValidationError("project_uuid is a required parameter")
+
+        date_params = QueryParamsParser(request.query_params)
+
+        apps = list(self.get_queryset().filter(project_uuid=project_uuid))
+        if apps:
+            # Every app of the project is under the same authorization
+            self.check_object_permissions(request, apps[0])
+
+        wabas = [self.get_conversation_waba(app) for app in apps]
+
+        try:
+            conversations = FacebookConversationAPI().project_conversations(
+                wabas=[waba for waba in wabas if waba is not None],
+                start=date_params.start,
+                end=date_params.end,
+            )
+        except FacebookApiException as error:
+            raise ValidationError(error)
+
+        return Response(conversations.__dict__())
+
 
 class WhatsAppContactMixin(object, metaclass=abc.ABCMeta):
     @abc.abstractproperty
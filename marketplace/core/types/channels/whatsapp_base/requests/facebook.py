@@ -1,6 +1,7 @@
-import requests
 from requests.models import Response
 
+from marketplace.clients.facebook.transport import graph_request
+from ..analytics import ConversationAnalytics, ConversationAnalyticsStore
 from ..exceptions import FacebookApiException
 
 from django.conf import settings
@@ -62,13 +63,16 @@ class Conversations(object):
 
 
 class FacebookConversationAPI(object):  # TODO: Use BaseFacebookBaseApi
+    def __init__(self, store: ConversationAnalyticsStore = None) -> None:
+        self.analytics = ConversationAnalytics(self._get_data_points, store)
+
     def _validate_response(self, response: Response):
         error = response.json().get("error", None)
         if error is not None:
             raise FacebookApiException(error.get("message"))
 
-    def _request(self, *args, **kwargs) -> Response:
-        response = requests.get(*args, **kwargs)
+    def _request(self, url: str, **kwargs) -> Response:
+        response = graph_request("GET", url, **kwargs)
         self._validate_response(response)
 
         return response
@@ -84,14 +88,36 @@ class FacebookConversationAPI(object):  # TODO: Use BaseFacebookBaseApi
 
         return fields
 
-    def conversations(
-        self, waba_id: str, access_token: str, start: str, end: str
-    ) -> Conversations:
+    def _get_data_points(
+        self, waba_id: str, access_token: str, start: int, end: int
+    ) -> list:
         fields = self._get_fields(start, end)
         params = dict(fields=fields, access_token=access_token)
         response = self._request(
             f"https://graph.facebook.com/{WHATSAPP_VERSION}/{waba_id}", params=params
         )
-        conversation_analytics = response.json().get("conversation_analytics")
+        conversation_analytics = response.json().get("conversation_analytics") or {}
+
+        return next(
+            (
+                data_content.get("data_points")
+                for data_content in conversation_analytics.get("data", [])
+                if "data_points" in data_content
+            ),
+            [],
+        )
+
+    def conversations(
+        self, waba_id: str, access_token: str, start: int, end: int
+    ) -> Conversations:
+        data_points = self.analytics.get_data_points(waba_id, access_token, start, end)
+
+        return Conversations({"data": [{"data_points": data_points}]})
+
+    def project_conversations(self, wabas: list, start: int, end: int) -> Conversations:
+        """
+        Sums the conversations of every `(waba_id, access_token)` of a project
+        """
+        data_points = self.analytics.get_many_data_points(wabas, start, end)
 
-        return Conversations(conversation_analytics)
+        return Conversations({"data": [{"data_points": data_points}]})
@@ -0,0 +1,189 @@
+import json
+
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+from redis.exceptions import ConnectionError
+
+from marketplace.core.types.channels.whatsapp_base.analytics import (
+    ConversationAnalytics,
+    ConversationAnalyticsStore,
+    aggregate_data_points,
+)
+
+
+DAY = 24 * 60 * 60
+TODAY = 1696032000
+
+
+def data_point(start, direction="USER_INITIATED", category="UNKNOWN", count=1):
+    return dict(
+        start=start,
+        end=start + DAY,
+        conversation=count,
+        conversation_type="REGULAR",
+        conversation_direction=direction,
+        conversation_category=category,
+        cost=1.5,
+    )
+
+
+class InMemoryConversationStore:
+    def __init__(self):
+        self.days = {}
+
+    def get_many(self, waba_id, days):
+        return {
+            day: self.days[(waba_id, day)]
+            for day in days
+            if (waba_id, day) in self.days
+        }
+
+    def set_many(self, waba_id, data_points):
+        for day, points in data_points.items():
+            self.days[(waba_id, day)] = points
+
+
+class AggregateDataPointsTestCase(SimpleTestCase):
+    def test_points_sharing_dimensions_are_summed(self):
+        points = aggregate_data_points(
+            [
+                data_point(TODAY, count=2),
+                data_point(TODAY, count=3),
+                data_point(TODAY, direction="BUSINESS_INITIATED"),
+            ]
+        )
+
+        self.assertEqual(
+            [
+                (point["conversation_direction"], point["conversation"])
+                for point in points
+            ],
+            [("USER_INITIATED", 5), ("BUSINESS_INITIATED", 1)],
+        )
+        self.assertNotIn("cost", points[0])
+
+
+@override_settings(
+    WHATSAPP_CONVERSATION_ANALYTICS_TODAY_TTL=300,
+    WHATSAPP_CONVERSATION_ANALYTICS_SETTLED_DAYS=3,
+    WHATSAPP_CONVERSATION_ANALYTICS_RECENT_TTL=3600,
+    WHATSAPP_CONVERSATION_ANALYTICS_TTL=90 * DAY,
+)
+@patch(
+    "marketplace.core.types.channels.whatsapp_base.analytics.get_today",
+    return_value=TODAY,
+)
+class ConversationAnalyticsStoreTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.store = ConversationAnalyticsStore(self.redis)
+
+    def test_stored_days_are_returned(self, today_mock):
+        self.redis.mget.return_value = [json.dumps([data_point(TODAY)]), None]
+
+        days = self.store.get_many("waba", [TODAY, TODAY + DAY])
+
+        self.assertEqual(days, {TODAY: [data_point(TODAY)]})
+
+    def test_recently_closed_days_expire_before_the_settled_ones(self, today_mock):
+        pipeline = self.redis.pipeline.return_value
+
+        self.store.set_many("waba", {TODAY - 4 * DAY: [], TODAY - DAY: [], TODAY: []})
+
+        pipeline.set.assert_any_call(
+            "wpp-conversation-analytics:waba:1695686400", "[]", ex=90 * DAY
+        )
+        pipeline.set.assert_any_call(
+            "wpp-conversation-analytics:waba:1695945600", "[]", ex=3600
+        )
+        pipeline.set.assert_any_call(
+            "wpp-conversation-analytics:waba:1696032000", "[]", ex=300
+        )
+        pipeline.execute.assert_called_once()
+
+    def test_redis_errors_are_not_raised(self, today_mock):
+        self.redis.mget.side_effect = ConnectionError()
+        self.redis.pipeline.side_effect = ConnectionError()
+
+        self.assertEqual(self.store.get_many("waba", [TODAY]), {})
+        self.store.set_many("waba", {TODAY: []})
+
+
+@override_settings(WHATSAPP_CONVERSATION_ANALYTICS_CONCURRENCY=2)
+class ConversationAnalyticsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.fetch = MagicMock(
+            side_effect=lambda waba_id, access_token, start, end: [
+                data_point(day + 3 * 60 * 60) for day in range(start, end, DAY)
+            ]
+        )
+        self.analytics = ConversationAnalytics(self.fetch, InMemoryConversationStore())
+
+    def test_only_the_missing_days_are_requested(self):
+        self.analytics.get_data_points("waba", "token", TODAY - DAY, TODAY - 1)
+
+        data_points = self.analytics.get_data_points(
+            "waba", "token", TODAY - 2 * DAY, TODAY - 1
+        )
+
+        self.assertEqual(sum(point["conversation"] for point in data_points), 2)
+        self.fetch.assert_called_with("waba", "token", TODAY - 2 * DAY, TODAY - DAY - 1)
+
+    def test_days_without_conversations_are_stored_empty(self):
+        self.fetch.side_effect = None
+        self.fetch.return_value = []
+
+        self.analytics.get_data_points("waba", "token", TODAY - DAY, TODAY - 1)
+        data_points = self.analytics.get_data_points(
+            "waba", "token", TODAY - DAY, TODAY - 1
+        )
+
+        self.assertEqual(data_points, [])
+        self.fetch.assert_called_once()
+
+    def test_points_are_kept_in_the_requested_days(self):
+        # A WABA ahead of UTC starts its days before the UTC midnight
+        self.fetch.side_effect = None
+        self.fetch.return_value = [data_point(TODAY - DAY - 3 * 60 * 60)]
+
+        data_points = self.analytics.get_data_points(
+            "waba", "token", TODAY - DAY, TODAY - 1
+        )
+
+        self.assertEqual(len(data_points), 1)
+
+    def test_local_days_are_stored_under_their_own_date(self):
+        # The days of a WABA in UTC+5:30 start at 18:30 UTC of the previous date,
+        # those of a WABA in UTC-3 at 03:00 UTC, both land on their own date
+        self.fetch.side_effect = None
+        self.fetch.return_value = [
+            data_point(TODAY - DAY - 5 * 60 * 60 - 30 * 60, count=2),
+            data_point(TODAY - DAY + 3 * 60 * 60, count=3),
+        ]
+
+        self.analytics.get_data_points("waba", "token", TODAY - 2 * DAY, TODAY - 1)
+
+        store = self.analytics.store
+        self.assertEqual(store.get_many("waba", [TODAY - 2 * DAY])[TODAY - 2 * DAY], [])
+        self.assertEqual(
+            store.get_many("waba", [TODAY - DAY])[TODAY - DAY][0]["conversation"], 5
+        )
+
+    def test_many_wabas_are_summed(self):
+        data_points = self.analytics.get_many_data_points(
+            [("waba", "token"), ("other", "token")], TODAY - 3 * DAY, TODAY - 1
+        )
+
+        self.assertEqual(
+            data_points,
+            [
+                dict(
+                    conversation_direction="USER_INITIATED",
+                    conversation_type="REGULAR",
+                    conversation_category="UNKNOWN",
+                    conversation=6,
+                )
+            ],
+        )
+        self.assertEqual(self.fetch.call_count, 2)
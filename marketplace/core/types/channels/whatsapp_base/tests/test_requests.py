@@ -8,9 +8,12 @@ from marketplace.core.types.channels.whatsapp_base.exceptions import (
 
 
 class TestFacebookConversationAPI(TestCase):
-    @mock.patch(
-        "marketplace.core.types.channels.whatsapp_base.requests.facebook.requests.get"
-    )
+    def setUp(self):
+        # Nothing stored yet, every day is requested to Meta
+        self.store = mock.Mock()
+        self.store.get_many.return_value = {}
+
+    @mock.patch("requests.get")
     def test_request_conversations(self, mock_get):
         data = {
             "data": [
@@ -77,29 +80,48 @@ class TestFacebookConversationAPI(TestCase):
 
         mock_get.return_value = mock_response
 
-        facebook_api = FacebookConversationAPI()
+        facebook_api = FacebookConversationAPI(store=self.store)
         conversations = facebook_api.conversations(
             access_token="test",
-            end="test",
-            start="test",
+            end=1685923199,
+            start=1685836800,
             waba_id="test",
         )
         self.assertEqual(conversations.__dict__(), expected_data)
 
-    @mock.patch(
-        "marketplace.core.types.channels.whatsapp_base.requests.facebook.requests.get"
-    )
+    @mock.patch("requests.get")
     def test_invalid_request_conversations(self, mock_get):
         mock_response = mock.Mock()
         mock_response.json.return_value = {"error": {"message": "Testing Error"}}
 
         mock_get.return_value = mock_response
 
-        facebook_api = FacebookConversationAPI()
+        facebook_api = FacebookConversationAPI(store=self.store)
         with self.assertRaises(FacebookApiException):
             facebook_api.conversations(
                 access_token="test",
-                end="test",
-                start="test",
+                end=1685923199,
+                start=1685836800,
                 waba_id="test",
             )
+        self.store.set_many.assert_not_called()
+
+    @mock.patch("requests.get")
+    def test_stored_days_are_not_requested(self, mock_get):
+        self.store.get_many.return_value = {
+            1685836800: [
+                {
+                    "conversation_direction": "USER_INITIATED",
+                    "conversation_type": "REGULAR",
+                    "conversation_category": "UNKNOWN",
+                    "conversation": 4,
+                }
+            ]
+        }
+
+        conversations = FacebookConversationAPI(store=self.store).conversations(
+            access_token="test", end=1685923199, start=1685836800, waba_id="test"
+        )
+
+        mock_get.assert_not_called()
+        self.assertEqual(conversations.__dict__()["user_initiated"], 4)
@@ -1,5 +1,6 @@
 import uuid
 
+from urllib.parse import parse_qs, urlparse
 from unittest.mock import patch, PropertyMock
 from rest_framework import status
 
@@ -90,6 +91,31 @@ class CatalogListTestCase(MockServiceTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json()["results"]), 0)
 
+    def test_list_catalogs_with_cursor_pagination(self):
+        for index in range(4):
+            Catalog.objects.create(
+                app=self.app,
+                facebook_catalog_id=f"catalog-{index}",
+                name="a catalog",
+                category="commerce",
+            )
+        url = reverse("catalog-list", kwargs={"app_uuid": self.app.uuid})
+        params = dict(pagination="cursor", page_size=2)
+        pages = []
+
+        while params is not None:
+            response = self.request.get(url, params, app_uuid=self.app.uuid)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.json)
+            pages.append([catalog["uuid"] for catalog in response.json["results"]])
+
+            next_url = response.json["next"]
+            params = next_url and parse_qs(urlparse(next_url).query)
+
+        expected = Catalog.objects.order_by("name", "id").values_list("uuid", flat=True)
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(sum(pages, []), [str(uuid) for uuid in expected])
+
 
 class CatalogRetrieveTestCase(MockServiceTestCase):
     current_view_mapping = {"get": "retrieve"}
@@ -2,7 +2,6 @@ from django.shortcuts import get_object_or_404
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from rest_framework import status
 
 from marketplace.core.types.channels.whatsapp_cloud.services.facebook import (
@@ -13,6 +12,7 @@ from marketplace.core.types.channels.whatsapp_cloud.services.flows import (
 )
 from marketplace.wpp_products.models import Catalog
 from marketplace.applications.models import App
+from marketplace.core.pagination import OptionalCursorPagination
 
 from marketplace.clients.facebook.client import FacebookClient
 from marketplace.clients.flows.client import FlowsClient
@@ -40,10 +40,11 @@ class BaseViewSet(viewsets.ModelViewSet):
         return self._fb_service
 
 
-class Pagination(PageNumberPagination):
+class Pagination(OptionalCursorPagination):
     page_size = 15
     page_size_query_param = "page_size"
     max_page_size = 500
+    cursor_ordering = ("name", "id")
 
 
 class CatalogViewSet(BaseViewSet):
@@ -1,9 +1,7 @@
-import time
-
-import requests
 from rest_framework import status
 
 from django.conf import settings
+from marketplace.clients.facebook.transport import graph_request
 from ..whatsapp_base.interfaces import ProfileHandlerInterface
 from ..whatsapp_base.exceptions import FacebookApiException
 
@@ -31,7 +29,9 @@ class CloudProfileRequest(ProfileHandlerInterface):
         }
 
     def get_profile(self):
-        response = requests.get(self._url, params=self._fields, headers=self._headers)
+        response = graph_request(
+            "GET", self._url, params=self._fields, headers=self._headers
+        )
         content = response.json().get("data", [{}])[0]
 
         return dict(
@@ -50,7 +50,7 @@ class CloudProfileRequest(ProfileHandlerInterface):
         data = dict(messaging_product="whatsapp")
         data.update(kwargs)
 
-        response = requests.post(self._url, headers=self._headers, json=data)
+        response = graph_request("POST", self._url, headers=self._headers, json=data)
         if response.status_code != status.HTTP_200_OK:
             raise FacebookApiException(response.json())
 
@@ -71,12 +71,7 @@ class PhoneNumbersRequest(object):
 
     def get_phone_numbers(self, waba_id: str) -> list:
         url = self._get_url(f"{waba_id}/phone_numbers")
-        response = requests.get(url, headers=self._headers)
-
-        for i in range(2):
-            if response.status_code != status.HTTP_200_OK:
-                time.sleep(10)
-                response = requests.get(url, headers=self._headers)
+        response = graph_request("GET", url, waba_id=waba_id, headers=self._headers)
 
         if response.status_code != status.HTTP_200_OK:
             raise FacebookApiException(response.json())
@@ -85,7 +80,7 @@ class PhoneNumbersRequest(object):
 
     def get_phone_number(self, phone_number_id: str):
         url = self._get_url(phone_number_id)
-        response = requests.get(url, headers=self._headers)
+        response = graph_request("GET", url, headers=self._headers)
 
         if response.status_code != status.HTTP_200_OK:
             raise FacebookApiException(response.json())
@@ -111,7 +106,7 @@ class PhotoAPIRequest(object):
         url = self._get_url(
             f"app/uploads?access_token={self._access_token}&file_length={file_length}&file_type={file_type}"
         )
-        response = requests.post(url, headers=self._headers)
+        response = graph_request("POST", url, headers=self._headers)
 
         if response.status_code != status.HTTP_200_OK:
             raise FacebookApiException(response.json())
@@ -131,7 +126,9 @@ class PhotoAPIRequest(object):
         if not is_uploading:
             headers["file_offset"] = "0"
 
-        response = requests.post(url, headers=headers, data=photo.file.getvalue())
+        response = graph_request(
+            "POST", url, headers=headers, data=photo.file.getvalue()
+        )
 
         if response.status_code != status.HTTP_200_OK:
             raise FacebookApiException(response.json())
@@ -152,7 +149,7 @@ class PhotoAPIRequest(object):
             "profile_picture_handle": upload_handle,
         }
 
-        response = requests.post(url, headers=self._headers, json=payload)
+        response = graph_request("POST", url, headers=self._headers, json=payload)
 
         if response.status_code != status.HTTP_200_OK:
             raise FacebookApiException(response.json())
@@ -1,5 +1,6 @@
 import logging
 
+from django.conf import settings
 from django_redis import get_redis_connection
 from django.contrib.auth import get_user_model
 
@@ -7,6 +8,11 @@ from marketplace.core.types import APPTYPES
 from marketplace.celery import app as celery_app
 from marketplace.connect.client import ConnectProjectClient
 from marketplace.applications.models import App
+from marketplace.core.sync.fingerprints import SyncFingerprints
+from marketplace.core.sync.locks import SyncLease
+from marketplace.core.sync.reconciliation import AppReconciler, chunked
+from marketplace.core.sync.reports import SyncReport
+from marketplace.core.sync.sharding import SyncSharding
 from marketplace.accounts.models import ProjectAuthorization
 
 
@@ -20,65 +26,113 @@ SYNC_WHATSAPP_CLOUD_LOCK_KEY = "sync-whatsapp-cloud-lock"
 
 @celery_app.task(name="sync_whatsapp_cloud_apps")
 def sync_whatsapp_cloud_apps():
-    apptype = APPTYPES.get("wpp-cloud")
-    client = ConnectProjectClient()
-    channels = client.list_channels(apptype.flows_type_code)
-
     redis = get_redis_connection()
+    lease = SyncLease(redis, SYNC_WHATSAPP_CLOUD_LOCK_KEY)
 
-    if redis.get(SYNC_WHATSAPP_CLOUD_LOCK_KEY):
+    if not lease.acquire():
         logger.info("The apps are already syncing by another task!")
         return None
 
-    for channel in channels:
-        project_uuid = channel.get("project_uuid")
+    with lease:
+        apptype = APPTYPES.get("wpp-cloud")
+        client = ConnectProjectClient()
+        channels = client.list_channels(apptype.flows_type_code)
+        channels = lease.remaining(channels, lambda channel: channel.get("uuid"))
+
+        fingerprints = SyncFingerprints(
+            redis, "flows_channel", settings.WHATSAPP_SYNC_FINGERPRINTS_TIMEOUT
+        )
+        reconciler = AppReconciler(
+            apptype, User.objects.get_admin_user(), fingerprints=[fingerprints]
+        )
+        apps = reconciler.load_apps(channel.get("uuid") for channel in channels)
+        fingerprints.load(apps.values())
+        result = dict(created=0, updated=0, deleted=0, failed=0, unchanged=0)
+
+        for chunk in chunked(channels, reconciler.chunk_size):
+            if lease.lost:
+                logger.warning("Stopping the apps sync, its lease was taken over")
+                return result
+
+            for channel in chunk:
+                project_uuid = channel.get("project_uuid")
+
+                uuid = channel.get("uuid")
+                address = channel.get("address")
+
+                config = channel.get("config")
+                config["title"] = config.get("wa_number")
+                config["wa_phone_number_id"] = address
+                payload = dict(config)
+
+                app = reconciler.get(uuid)
+
+                if app is not None:
+                    if app.code == apptype.code and fingerprints.is_unchanged(
+                        app, payload, get_stored_config(app, payload)
+                    ):
+                        result["unchanged"] += 1
+                        continue
+
+                    if app.code != apptype.code:
+                        logger.info(
+                            f"Migrating an {app.code} to WhatsApp Cloud Type. App: {app.uuid}"
+                        )
+                        app.code = apptype.code
+                        config["config_before_migration"] = app.config
+                        app.config = config
+                        reconciler.update(app)
+                    else:
+                        reconciler.patch(app, config)
+
+                else:
+                    logger.info(
+                        f"Creating a new WhatsApp Cloud app for the flow_object_uuid: {uuid}"
+                    )
+                    app = reconciler.create(
+                        project_uuid=project_uuid,
+                        flow_object_uuid=uuid,
+                        config=config,
+                    )
 
-        uuid = channel.get("uuid")
-        address = channel.get("address")
-        user = User.objects.get_admin_user()
+                fingerprints.remember(app, payload, get_stored_config(app, payload))
 
-        config = channel.get("config")
-        config["title"] = config.get("wa_number")
-        config["wa_phone_number_id"] = address
+            chunk_result = reconciler.commit()
+            for field, count in chunk_result.items():
+                result[field] += count
 
-        apps = App.objects.filter(flow_object_uuid=uuid)
+            # A failed chunk leaves unknown apps unwritten, their fingerprints are
+            # dropped so the next run writes them again
+            if chunk_result["failed"] == 0:
+                fingerprints.flush()
+            else:
+                fingerprints.discard()
 
-        if apps.exists():
-            app = apps.first()
+            lease.save_checkpoint(chunk[-1].get("uuid"))
 
-            if app.code != apptype.code:
-                logger.info(
-                    f"Migrating an {app.code} to WhatsApp Cloud Type. App: {app.uuid}"
-                )
-                app.code = apptype.code
-                config["config_before_migration"] = app.config
-                app.config = config
-            else:
-                app.config.update(config)
+        lease.clear_checkpoint()
+        return result
 
-            app.modified_by = user
-            app.save()
 
-        else:
-            logger.info(
-                f"Creating a new WhatsApp Cloud app for the flow_object_uuid: {uuid}"
-            )
-            apptype.create_app(
-                created_by=user,
-                project_uuid=project_uuid,
-                flow_object_uuid=uuid,
-                config=config,
-            )
+def get_stored_config(app: App, payload: dict) -> dict:
+    return {key: app.config.get(key) for key in payload}
 
 
 @celery_app.task(name="check_apps_uncreated_on_flow")
-def check_apps_uncreated_on_flow():
+def check_apps_uncreated_on_flow(app_ids: list = None):
     """Search all wpp-cloud channels that have the flow_object_uuid field empty,
     to create the object in flows"""
-    apps = App.objects.filter(code="wpp-cloud", flow_object_uuid__isnull=True)
+    apps, sharded = SyncSharding.from_settings("check_apps_uncreated_on_flow").shard(
+        App.objects.filter(code="wpp-cloud", flow_object_uuid__isnull=True), app_ids
+    )
+    if sharded is not None:
+        return sharded
+
+    report = SyncReport(name="check_apps_uncreated_on_flow")
 
     for app in apps:
         if not app.config.get("wa_phone_number_id"):
+            report.add_skipped()
             continue
 
         user_creation = app.created_by
@@ -97,13 +151,16 @@ def check_apps_uncreated_on_flow():
                     logger.error(
                         f"The flow application was not created for app: {app.uuid} flows error return: {(channel)}"
                     )
+                    report.add_failed(str(app.uuid), channel)
                     continue
 
                 app.flow_object_uuid = channel["uuid"]
                 app.save()
+                report.add_synced()
 
             except Exception as e:
                 logger.error(f"Error creating channel for app {app.uuid}: {str(e)}")
+                report.add_failed(str(app.uuid), e)
                 continue
 
         else:
@@ -111,8 +168,11 @@ def check_apps_uncreated_on_flow():
                 f"""ProjectAuthorization was not found for user: {str(user_creation)}
                     and project:{str(project_uuid)} on app: {str(app.uuid)}"""
             )
+            report.add_skipped()
             continue
 
+    return report.finish().as_dict()
+
 
 def has_project_access(user, project_uuid) -> bool:
     """Returns True if the creating user has access to the project"""
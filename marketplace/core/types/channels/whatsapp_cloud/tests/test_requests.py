@@ -1,6 +1,7 @@
 from django.test import TestCase
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+from marketplace.clients.facebook.transport import GraphTransport
 from marketplace.core.tests.base import FakeRequestsResponse
 
 from ..requests import PhoneNumbersRequest
@@ -13,16 +14,26 @@ class MockObjectTest(TestCase):
         super().setUpClass()
         cls.patch_get = patch("requests.get")
         cls.patch_sleep = patch(
-            "marketplace.core.types.channels.whatsapp_cloud.requests.time",
+            "marketplace.clients.facebook.transport.time",
             return_value=None,
         )
+        # The shared redis bucket would block the throttled fakes for real
+        limiter = MagicMock()
+        limiter.update.return_value = False
+        limiter.block.return_value = True
+        cls.patch_transport = patch(
+            "marketplace.clients.facebook.transport._transport",
+            GraphTransport(limiter=limiter, max_retries=2),
+        )
         cls.mock_get = cls.patch_get.start()
         cls.mock_sleep = cls.patch_sleep.start()
+        cls.patch_transport.start()
 
     @classmethod
     def tearDownClass(cls):
-        cls.mock_get.stop()
-        cls.mock_sleep.stop()
+        cls.patch_get.stop()
+        cls.patch_sleep.stop()
+        cls.patch_transport.stop()
         super().tearDownClass()
 
     def setUp(self):
@@ -36,16 +47,21 @@ class PhoneNumbersRequestTestCase(MockObjectTest):
         # Fail response
         self.fail_fake_response = FakeRequestsResponse(data={})
         self.fail_fake_response.status_code = 400
+        # Throttled response
+        self.throttled_fake_response = FakeRequestsResponse(
+            data={"error": {"message": "Application request limit reached", "code": 4}}
+        )
+        self.throttled_fake_response.status_code = 400
         # Success response
         self.success_fake_response = FakeRequestsResponse(data=dict(data=[1, 2]))
         self.success_fake_response.status_code = 200
 
     def test_get_phone_numbers(self):
         # There are 3 items in the list because they are simulations of 3 requests
-        # 2 failures and 1 success
+        # 2 throttled and 1 success
         self.mock_get.side_effect = [
-            self.fail_fake_response,
-            self.fail_fake_response,
+            self.throttled_fake_response,
+            self.throttled_fake_response,
             self.success_fake_response,
         ]
         response = self.phone_numbers_request.get_phone_numbers("431332")
@@ -54,9 +70,18 @@ class PhoneNumbersRequestTestCase(MockObjectTest):
     def test_get_phone_numbers_error(self):
         # There are 3 items in the list because they are simulations of 3 failures requests
         self.mock_get.side_effect = [
-            self.fail_fake_response,
-            self.fail_fake_response,
-            self.fail_fake_response,
+            self.throttled_fake_response,
+            self.throttled_fake_response,
+            self.throttled_fake_response,
         ]
         with self.assertRaises(FacebookApiException):
             self.phone_numbers_request.get_phone_numbers("431332")
+
+    def test_get_phone_numbers_error_is_not_retried(self):
+        self.mock_get.reset_mock()
+        self.mock_get.side_effect = [self.fail_fake_response]
+
+        with self.assertRaises(FacebookApiException):
+            self.phone_numbers_request.get_phone_numbers("431332")
+
+        self.assertEqual(self.mock_get.call_count, 1)
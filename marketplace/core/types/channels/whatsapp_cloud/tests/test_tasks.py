@@ -1,3 +1,5 @@
+import time
+
 from uuid import uuid4
 
 from unittest.mock import patch
@@ -9,6 +11,7 @@ from django.contrib.auth import get_user_model
 from marketplace.core.types import APPTYPES
 from ..tasks import sync_whatsapp_cloud_apps, check_apps_uncreated_on_flow
 from marketplace.applications.models import App
+from marketplace.core.sync.fingerprints import get_fingerprint
 from marketplace.accounts.models import ProjectAuthorization
 
 
@@ -74,6 +77,59 @@ class SyncWhatsAppCloudAppsTaskTestCase(TestCase):
         self.assertIn("config_before_migration", app.config)
         self.assertIn("have_to_stay", app.config.get("config_before_migration"))
 
+    @patch("marketplace.core.types.channels.whatsapp_cloud.tasks.get_redis_connection")
+    @patch("marketplace.connect.client.ConnectProjectClient.list_channels")
+    def test_unchanged_channel_is_not_written(
+        self, list_channel_mock: "MagicMock", mock_redis
+    ) -> None:
+        channels = self._get_mock_value(
+            str(self.wpp_cloud_app.project_uuid),
+            str(self.wpp_cloud_app.flow_object_uuid),
+        )
+        list_channel_mock.return_value = channels
+
+        payload = {"title": None, "wa_phone_number_id": "f234234"}
+        self.wpp_cloud_app.config.update(payload)
+        self.wpp_cloud_app.save()
+
+        self.redis_mock.hmget.return_value = [
+            f"{get_fingerprint(payload, payload)}:{int(time.time())}"
+        ]
+        mock_redis.return_value = self.redis_mock
+
+        result = sync_whatsapp_cloud_apps()
+
+        self.assertEqual(result["unchanged"], 1)
+        self.assertEqual(result["updated"], 0)
+
+        app = App.objects.get(id=self.wpp_cloud_app.id)
+        self.assertEqual(app.modified_on, self.wpp_cloud_app.modified_on)
+
+    @patch("marketplace.core.types.channels.whatsapp_cloud.tasks.get_redis_connection")
+    @patch("marketplace.connect.client.ConnectProjectClient.list_channels")
+    def test_drifted_channel_config_is_written(
+        self, list_channel_mock: "MagicMock", mock_redis
+    ) -> None:
+        list_channel_mock.return_value = self._get_mock_value(
+            str(self.wpp_cloud_app.project_uuid),
+            str(self.wpp_cloud_app.flow_object_uuid),
+        )
+
+        # The fingerprint matches the payload but not the stored config
+        payload = {"title": None, "wa_phone_number_id": "f234234"}
+        self.redis_mock.hmget.return_value = [
+            f"{get_fingerprint(payload, payload)}:{int(time.time())}"
+        ]
+        mock_redis.return_value = self.redis_mock
+
+        result = sync_whatsapp_cloud_apps()
+
+        self.assertEqual(result["unchanged"], 0)
+        self.assertEqual(result["updated"], 1)
+
+        app = App.objects.get(id=self.wpp_cloud_app.id)
+        self.assertEqual(app.config["wa_phone_number_id"], "f234234")
+
     @patch("marketplace.core.types.channels.whatsapp_cloud.tasks.get_redis_connection")
     @patch("marketplace.connect.client.ConnectProjectClient.list_channels")
     def test_sync_for_non_migrated_channels(
@@ -114,13 +170,13 @@ class SyncWhatsAppCloudAppsTaskTestCase(TestCase):
     @patch("marketplace.core.types.channels.whatsapp_cloud.tasks.get_redis_connection")
     @patch("marketplace.connect.client.ConnectProjectClient.list_channels")
     def test_sync_already_in_progress(self, list_channel_mock, mock_redis):
-        self.redis_mock.get.return_value = True
+        self.redis_mock.set.return_value = None
         mock_redis.return_value = self.redis_mock
 
         result = sync_whatsapp_cloud_apps()
 
         self.assertIsNone(result)
-        list_channel_mock.assert_called_once()
+        list_channel_mock.assert_not_called()
 
 
 class CheckAppsUncreatedOnFlowTaskTestCase(TestCase):
@@ -740,3 +740,67 @@ class WhatsAppCloudPhoneNumbersTestCase(APIBaseTestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.json, ["Some error message"])
+
+
+class WhatsAppCloudProjectConversationsTestCase(APIBaseTestCase):
+    view_class = WhatsAppCloudViewSet
+
+    def setUp(self):
+        super().setUp()
+
+        self.project_uuid = str(uuid.uuid4())
+        for config in [{"wa_waba_id": "0123456789"}, {"wa_waba_id": "9876543210"}, {}]:
+            App.objects.create(
+                code="wpp-cloud",
+                config=config,
+                created_by=self.user,
+                project_uuid=self.project_uuid,
+                platform=App.PLATFORM_WENI_FLOWS,
+            )
+        self.user_authorization = self.user.authorizations.create(
+            project_uuid=self.project_uuid
+        )
+        self.user_authorization.set_role(ProjectAuthorization.ROLE_VIEWER)
+        self.url = reverse("wpp-cloud-app-project-conversations")
+        self.params = {
+            "project_uuid": self.project_uuid,
+            "start": "6-1-2023",
+            "end": "6-30-2023",
+        }
+
+    @property
+    def view(self):
+        return self.view_class.as_view({"get": "project_conversations"})
+
+    @patch(
+        "marketplace.core.types.channels.whatsapp_cloud.views.settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN",
+        "token",
+    )
+    @patch(
+        "marketplace.core.types.channels.whatsapp_base.requests.facebook.FacebookConversationAPI.project_conversations"
+    )
+    def test_get_project_conversations(self, mock_conversations):
+        mock_conversations.return_value = MockConversation()
+
+        response = self.request.get(self.url, params=self.params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        wabas = mock_conversations.call_args.kwargs["wabas"]
+        self.assertEqual(
+            sorted(wabas), [("0123456789", "token"), ("9876543210", "token")]
+        )
+
+    def test_project_uuid_is_required(self):
+        params = dict(self.params)
+        params.pop("project_uuid")
+
+        response = self.request.get(self.url, params=params)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_projects_are_forbidden(self):
+        self.user_authorization.delete()
+
+        response = self.request.get(self.url, params=self.params)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,7 +1,7 @@
 import string
 import requests
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
@@ -74,6 +74,13 @@ class WhatsAppCloudViewSet(
 
         return access_token
 
+    def get_conversation_waba(self, app) -> Optional[tuple]:
+        waba_id = app.config.get("wa_waba_id", None)
+        if waba_id is None:
+            return None
+
+        return (waba_id, settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN)
+
     def get_queryset(self):
         return super().get_queryset().filter(code=self.type_class.code)
 
@@ -16,6 +16,7 @@ from datetime import timedelta
 import urllib
 
 import environ
+from celery.schedules import crontab
 import sentry_sdk
 from sentry_sdk.integrations.django import DjangoIntegration
 from corsheaders.defaults import default_headers
@@ -56,6 +57,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # marketplace apps
     "marketplace.accounts",
     "marketplace.core",
@@ -251,6 +253,113 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 
+# Sharding of the periodic syncs, SYNC_SHARDING overrides the defaults per task, e.g.
+# {"sync_whatsapp_wabas": {"shard_size": 100, "max_parallel_shards": 8}}
+SYNC_SHARD_SIZE = env.int("SYNC_SHARD_SIZE", default=200)
+SYNC_MAX_PARALLEL_SHARDS = env.int("SYNC_MAX_PARALLEL_SHARDS", default=4)
+SYNC_SHARDING = env.json("SYNC_SHARDING", default={})
+
+# Lease held by the channel syncs, renewed by a heartbeat while the sync runs
+SYNC_LEASE_TIMEOUT = env.int("SYNC_LEASE_TIMEOUT", default=300)
+# How long an interrupted sync can resume from its last checkpoint
+SYNC_CHECKPOINT_TIMEOUT = env.int("SYNC_CHECKPOINT_TIMEOUT", default=6 * 60 * 60)
+
+# The template refresh runs one shard per app, so a slow WABA only holds its lane
+WHATSAPP_TEMPLATES_REFRESH_CONCURRENCY = env.int(
+    "WHATSAPP_TEMPLATES_REFRESH_CONCURRENCY", default=8
+)
+WHATSAPP_TEMPLATES_REFRESH_APP_TIMEOUT = env.int(
+    "WHATSAPP_TEMPLATES_REFRESH_APP_TIMEOUT", default=120
+)
+# Templates requested per page when listing the templates of a WABA
+WHATSAPP_TEMPLATES_PAGE_SIZE = env.int("WHATSAPP_TEMPLATES_PAGE_SIZE", default=250)
+
+# Meta webhook of the template status and quality updates, the app secret signs
+# the payloads and the verify token answers the subscription handshake
+WHATSAPP_TEMPLATES_WEBHOOK_APP_SECRET = env.str(
+    "WHATSAPP_TEMPLATES_WEBHOOK_APP_SECRET", default=""
+)
+WHATSAPP_TEMPLATES_WEBHOOK_VERIFY_TOKEN = env.str(
+    "WHATSAPP_TEMPLATES_WEBHOOK_VERIFY_TOKEN", default=""
+)
+# Events are buffered and applied in batches at most this many seconds later
+WHATSAPP_TEMPLATES_WEBHOOK_BATCH_DELAY = env.int(
+    "WHATSAPP_TEMPLATES_WEBHOOK_BATCH_DELAY", default=5
+)
+WHATSAPP_TEMPLATES_WEBHOOK_BATCH_SIZE = env.int(
+    "WHATSAPP_TEMPLATES_WEBHOOK_BATCH_SIZE", default=500
+)
+# Decoded header examples above this size are spooled to disk while uploading
+WHATSAPP_TEMPLATES_MEDIA_SPOOL_SIZE = env.int(
+    "WHATSAPP_TEMPLATES_MEDIA_SPOOL_SIZE", default=5 * 1024 * 1024
+)
+# Attempts to send a header example, each one resumes the previous transfer
+WHATSAPP_TEMPLATES_MEDIA_UPLOAD_ATTEMPTS = env.int(
+    "WHATSAPP_TEMPLATES_MEDIA_UPLOAD_ATTEMPTS", default=3
+)
+# Translations submitted to Meta at the same time by the bulk creation
+WHATSAPP_TEMPLATES_BULK_CONCURRENCY = env.int(
+    "WHATSAPP_TEMPLATES_BULK_CONCURRENCY", default=5
+)
+WHATSAPP_TEMPLATES_BULK_MAX_TRANSLATIONS = env.int(
+    "WHATSAPP_TEMPLATES_BULK_MAX_TRANSLATIONS", default=500
+)
+# Seconds the template analytics of the current day are cached for
+WHATSAPP_TEMPLATES_ANALYTICS_TODAY_TTL = env.int(
+    "WHATSAPP_TEMPLATES_ANALYTICS_TODAY_TTL", default=300
+)
+# Meta keeps updating the last closed days, they are cached for a short while
+WHATSAPP_TEMPLATES_ANALYTICS_SETTLED_DAYS = env.int(
+    "WHATSAPP_TEMPLATES_ANALYTICS_SETTLED_DAYS", default=3
+)
+WHATSAPP_TEMPLATES_ANALYTICS_RECENT_TTL = env.int(
+    "WHATSAPP_TEMPLATES_ANALYTICS_RECENT_TTL", default=3600
+)
+# Settled days are cached for 90 days
+WHATSAPP_TEMPLATES_ANALYTICS_TTL = env.int(
+    "WHATSAPP_TEMPLATES_ANALYTICS_TTL", default=90 * 24 * 60 * 60
+)
+# Template analytics requests are split within the limits of a Graph call
+WHATSAPP_TEMPLATES_ANALYTICS_IDS_PER_REQUEST = env.int(
+    "WHATSAPP_TEMPLATES_ANALYTICS_IDS_PER_REQUEST", default=10
+)
+WHATSAPP_TEMPLATES_ANALYTICS_DAYS_PER_REQUEST = env.int(
+    "WHATSAPP_TEMPLATES_ANALYTICS_DAYS_PER_REQUEST", default=90
+)
+WHATSAPP_TEMPLATES_ANALYTICS_CONCURRENCY = env.int(
+    "WHATSAPP_TEMPLATES_ANALYTICS_CONCURRENCY", default=4
+)
+# Days looked back by the nightly rollup of the template analytics
+WHATSAPP_TEMPLATES_ANALYTICS_ROLLUP_DAYS = env.int(
+    "WHATSAPP_TEMPLATES_ANALYTICS_ROLLUP_DAYS", default=7
+)
+WHATSAPP_TEMPLATES_ANALYTICS_ROLLUP_HOUR = env.int(
+    "WHATSAPP_TEMPLATES_ANALYTICS_ROLLUP_HOUR", default=3
+)
+# Stored conversation analytics of the current day are requested again after it
+WHATSAPP_CONVERSATION_ANALYTICS_TODAY_TTL = env.int(
+    "WHATSAPP_CONVERSATION_ANALYTICS_TODAY_TTL", default=300
+)
+# Meta keeps updating the last closed days, they are stored for a short while
+WHATSAPP_CONVERSATION_ANALYTICS_SETTLED_DAYS = env.int(
+    "WHATSAPP_CONVERSATION_ANALYTICS_SETTLED_DAYS", default=3
+)
+WHATSAPP_CONVERSATION_ANALYTICS_RECENT_TTL = env.int(
+    "WHATSAPP_CONVERSATION_ANALYTICS_RECENT_TTL", default=3600
+)
+# Settled days are stored for 90 days
+WHATSAPP_CONVERSATION_ANALYTICS_TTL = env.int(
+    "WHATSAPP_CONVERSATION_ANALYTICS_TTL", default=90 * 24 * 60 * 60
+)
+WHATSAPP_CONVERSATION_ANALYTICS_CONCURRENCY = env.int(
+    "WHATSAPP_CONVERSATION_ANALYTICS_CONCURRENCY", default=4
+)
+# With the webhook subscribed the full refresh is only a consistency sweep
+WHATSAPP_TEMPLATES_REFRESH_INTERVAL = env.int(
+    "WHATSAPP_TEMPLATES_REFRESH_INTERVAL_IN_SECONDS",
+    default=6 * 60 * 60 if WHATSAPP_TEMPLATES_WEBHOOK_APP_SECRET else 1800,
+)
+
 
 # Cache
 
@@ -300,6 +409,22 @@ WHATSAPP_API_URL = urllib.parse.urljoin(
     env.str("WHATSAPP_API_URL", default="https://graph.facebook.com/"), WHATSAPP_VERSION
 )
 
+# Token bucket shared by every Graph API call, one bucket per access token and WABA
+GRAPH_RATE_LIMIT_ENABLED = env.bool("GRAPH_RATE_LIMIT_ENABLED", default=True)
+GRAPH_RATE_LIMIT_PER_SECOND = env.float("GRAPH_RATE_LIMIT_PER_SECOND", default=20)
+GRAPH_RATE_LIMIT_BURST = env.int("GRAPH_RATE_LIMIT_BURST", default=40)
+# Usage percentage reported by Meta from which the bucket rate starts to slow down
+GRAPH_RATE_LIMIT_USAGE_THRESHOLD = env.int(
+    "GRAPH_RATE_LIMIT_USAGE_THRESHOLD", default=75
+)
+# Seconds a Celery task may wait for the bucket, web requests fail fast after
+# GRAPH_RATE_LIMIT_REQUEST_MAX_WAIT instead of holding the worker
+GRAPH_RATE_LIMIT_MAX_WAIT = env.int("GRAPH_RATE_LIMIT_MAX_WAIT", default=120)
+GRAPH_RATE_LIMIT_REQUEST_MAX_WAIT = env.int(
+    "GRAPH_RATE_LIMIT_REQUEST_MAX_WAIT", default=5
+)
+GRAPH_RATE_LIMIT_MAX_RETRIES = env.int("GRAPH_RATE_LIMIT_MAX_RETRIES", default=2)
+
 if APPTYPE_WHATSAPP_PATH in APPTYPES_CLASSES:
     WHATSAPP_TIME_BETWEEN_SYNC_WABA_IN_HOURS = (
         env.int("WHATSAPP_TIME_BETWEEN_SYNC_WABA_IN_HOURS", default=10) * 60 * 60
@@ -310,6 +435,21 @@ if APPTYPE_WHATSAPP_PATH in APPTYPES_CLASSES:
         * 60
     )
 
+    # Bounded fan-out used by the sync tasks to call the Graph API
+    WHATSAPP_SYNC_MAX_WORKERS = env.int("WHATSAPP_SYNC_MAX_WORKERS", default=10)
+    WHATSAPP_SYNC_MAX_REQUESTS_PER_TOKEN = env.int(
+        "WHATSAPP_SYNC_MAX_REQUESTS_PER_TOKEN", default=5
+    )
+    WHATSAPP_SYNC_BACKEND = env.str("WHATSAPP_SYNC_BACKEND", default="threads")
+    # Lookups packed in each Graph `batch` request, Meta accepts up to 50
+    WHATSAPP_SYNC_BATCH_SIZE = env.int("WHATSAPP_SYNC_BATCH_SIZE", default=50)
+    # Rows written per transaction when reconciling the apps with the Flows channels
+    WHATSAPP_SYNC_DB_CHUNK_SIZE = env.int("WHATSAPP_SYNC_DB_CHUNK_SIZE", default=500)
+    # Lifetime of the payload fingerprints used to skip writes of unchanged syncs
+    WHATSAPP_SYNC_FINGERPRINTS_TIMEOUT = (
+        env.int("WHATSAPP_SYNC_FINGERPRINTS_TIMEOUT_IN_DAYS", default=7) * 24 * 60 * 60
+    )
+
 
 if APPTYPE_WHATSAPP_CLOUD_PATH in APPTYPES_CLASSES:
     WHATSAPP_CLOUD_SYSTEM_USER_ID = env.str("WHATSAPP_CLOUD_SYSTEM_USER_ID")
@@ -360,7 +500,11 @@ CELERY_BEAT_SCHEDULE = {
     },
     "refresh-whatsapp-templates-from-facebook": {
         "task": "refresh_whatsapp_templates_from_facebook",
-        "schedule": timedelta(seconds=1800),
+        "schedule": timedelta(seconds=WHATSAPP_TEMPLATES_REFRESH_INTERVAL),
+    },
+    "rollup-template-analytics": {
+        "task": "rollup_template_analytics",
+        "schedule": crontab(hour=WHATSAPP_TEMPLATES_ANALYTICS_ROLLUP_HOUR, minute=0),
     },
     "check-apps-uncreated-on-flow": {
         "task": "check_apps_uncreated_on_flow",
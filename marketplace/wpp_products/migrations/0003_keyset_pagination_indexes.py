@@ -0,0 +1,18 @@
+# Generated by Django 3.2.4 on 2026-10-18 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wpp_products", "0002_auto_20231023_1051"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="catalog",
+            index=models.Index(
+                fields=["app", "name", "id"], name="catalog_app_name_idx"
+            ),
+        ),
+    ]
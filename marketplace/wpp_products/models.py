@@ -52,3 +52,7 @@ class Catalog(BaseModel):
                 name="unique_facebook_catalog_id_per_app",
             )
         ]
+        indexes = [
+            # Keyset pagination key of the catalog listing
+            models.Index(fields=["app", "name", "id"], name="catalog_app_name_idx"),
+        ]
@@ -1,65 +1,108 @@
 import logging
 
 from celery import shared_task
+from django.db import transaction
 
 from marketplace.clients.facebook.client import FacebookClient
-from marketplace.wpp_products.models import Catalog
+from marketplace.wpp_products.models import Catalog, VerticalChoices
 from marketplace.applications.models import App
+from marketplace.core.sync.reports import SyncReport
+from marketplace.core.sync.sharding import SyncSharding
 
 logger = logging.getLogger(__name__)
 
 
+def sync_app_catalogs(app: App, fba_catalogs: dict) -> dict:
+    """
+    Creates the catalogs listed by Meta missing from the app and removes the
+    ones Meta no longer lists, with one insert and one delete statement
+    """
+    local_catalog_ids = set(app.catalogs.values_list("facebook_catalog_id", flat=True))
+
+    id_length, name_length, category_length = (
+        Catalog._meta.get_field(field).max_length
+        for field in ("facebook_catalog_id", "name", "category")
+    )
+
+    to_create = []
+    for catalog_id, catalog in fba_catalogs.items():
+        if catalog_id in local_catalog_ids:
+            continue
+
+        category = catalog.get("vertical") or VerticalChoices.ECOMMERCE
+        if len(catalog_id) > id_length or len(category) > category_length:
+            # A single row out of its columns would fail the whole insert
+            logger.warning(
+                f"Skipping the catalog {catalog_id} of app {app.uuid}, "
+                f"its id or vertical {category} does not fit"
+            )
+            continue
+
+        name = catalog.get("name") or ""
+        to_create.append(
+            Catalog(
+                app=app,
+                facebook_catalog_id=catalog_id,
+                name=name[:name_length],
+                category=category,
+            )
+        )
+    to_delete = local_catalog_ids - set(fba_catalogs)
+
+    with transaction.atomic():
+        # A catalog created meanwhile by the user is kept as it is
+        Catalog.objects.bulk_create(to_create, ignore_conflicts=True)
+        # Rows skipped as conflicts are not counted
+        created = Catalog.objects.filter(
+            uuid__in=[catalog.uuid for catalog in to_create]
+        ).count()
+
+        deleted = {}
+        if to_delete:
+            _, deleted = app.catalogs.filter(facebook_catalog_id__in=to_delete).delete()
+
+    # The totals of `delete` also count the cascaded products and feeds
+    return dict(created=created, deleted=deleted.get(Catalog._meta.label, 0))
+
+
 @shared_task(name="sync_facebook_catalogs")
-def sync_facebook_catalogs():
-    apps = App.objects.filter(code="wpp-cloud")
+def sync_facebook_catalogs(app_ids: list = None):
+    apps, sharded = SyncSharding.from_settings("sync_facebook_catalogs").shard(
+        App.objects.filter(code="wpp-cloud"), app_ids
+    )
+    if sharded is not None:
+        return sharded
+
     client = FacebookClient()
+    report = SyncReport(name="sync_facebook_catalogs")
 
     for app in apps:
         wa_business_id = app.config.get("wa_business_id")
         wa_waba_id = app.config.get("wa_waba_id")
 
-        if wa_business_id and wa_waba_id:
-            local_catalog_ids = set(
-                app.catalogs.values_list("facebook_catalog_id", flat=True)
-            )
+        if not (wa_business_id and wa_waba_id):
+            report.add_skipped()
+            continue
+
+        try:
+            fba_catalogs = {
+                catalog["id"]: catalog
+                for catalog in client.iter_catalogs(wa_business_id=wa_business_id)
+            }
+        except Exception as e:
+            logger.error(f"Error listing all catalogs for app {app.uuid}: {str(e)}")
+            report.add_failed(str(app.uuid), e)
+            continue
+
+        try:
+            synced = sync_app_catalogs(app, fba_catalogs)
+        except Exception as e:
+            logger.error(f"Error syncing catalogs for app {app.uuid}: {str(e)}")
+            report.add_failed(str(app.uuid), e)
+            continue
+
+        report.add_deleted(synced["deleted"])
+        report.add_synced()
 
-            try:
-                response = client.list_all_catalogs(wa_business_id=wa_business_id)
-            except Exception as e:
-                logger.error(f"Error listing all catalogs for app {app.uuid}: {str(e)}")
-                continue
-
-            fba_catalogs_ids = set(response)
-
-            to_create = fba_catalogs_ids - local_catalog_ids
-            to_delete = local_catalog_ids - fba_catalogs_ids
-
-            for catalog_id in to_create:
-                try:
-                    details = client.get_catalog_details(catalog_id)
-                except Exception as e:
-                    logger.error(
-                        f"Error getting catalog details for app {app.uuid}, catalog {catalog_id}: {str(e)}"
-                    )
-                    continue
-                try:
-                    Catalog.objects.create(
-                        app=app,
-                        facebook_catalog_id=details["id"],
-                        name=details["name"],
-                        category=details["vertical"],
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Error creating catalog for app {app.uuid}: {str(e)} , object: {details}"
-                    )
-                    continue
-
-            if to_delete:
-                try:
-                    app.catalogs.filter(facebook_catalog_id__in=to_delete).delete()
-                except Exception as e:
-                    logger.error(
-                        f"Error deleting catalogs for app {app.uuid}: {str(e)}"
-                    )
-                    continue
+    logger.info(str(report.finish()))
+    return report.as_dict()
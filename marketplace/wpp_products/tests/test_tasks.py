@@ -0,0 +1,126 @@
+import uuid
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from marketplace.applications.models import App
+from marketplace.wpp_products.models import Catalog
+from marketplace.wpp_products.tasks import sync_app_catalogs, sync_facebook_catalogs
+
+
+User = get_user_model()
+
+
+class SyncCatalogsTestCase(TestCase):
+    def setUp(self):
+        self.app = App.objects.create(
+            config=dict(wa_business_id="101010", wa_waba_id="202020"),
+            project_uuid=uuid.uuid4(),
+            platform=App.PLATFORM_WENI_FLOWS,
+            code="wpp-cloud",
+            created_by=User.objects.get_admin_user(),
+        )
+        for facebook_catalog_id in ["1", "2"]:
+            Catalog.objects.create(
+                app=self.app,
+                facebook_catalog_id=facebook_catalog_id,
+                name=f"catalog {facebook_catalog_id}",
+            )
+
+        self.fba_catalogs = {
+            "2": dict(id="2", name="catalog 2", vertical="commerce"),
+            "3": dict(id="3", name="hotels", vertical="hotels"),
+            "4": dict(id="4", name="flights", vertical="flights"),
+        }
+
+
+class SyncAppCatalogsTestCase(SyncCatalogsTestCase):
+    def test_catalogs_are_created_and_removed(self):
+        synced = sync_app_catalogs(self.app, self.fba_catalogs)
+
+        self.assertEqual(synced, dict(created=2, deleted=1))
+        self.assertEqual(
+            list(
+                self.app.catalogs.order_by("facebook_catalog_id").values_list(
+                    "facebook_catalog_id", "name", "category"
+                )
+            ),
+            [
+                ("2", "catalog 2", "commerce"),
+                ("3", "hotels", "hotels"),
+                ("4", "flights", "flights"),
+            ],
+        )
+
+    def test_queries_do_not_grow_with_the_catalogs(self):
+        catalogs = dict(
+            self.fba_catalogs,
+            **{
+                str(catalog_id): dict(id=str(catalog_id), name="new", vertical="hotels")
+                for catalog_id in range(10, 110)
+            },
+        )
+
+        # Listing, savepoint, insert, created count, delete and savepoint release
+        with self.assertNumQueries(6):
+            sync_app_catalogs(self.app, catalogs)
+
+        self.assertEqual(self.app.catalogs.count(), 103)
+
+    def test_catalogs_out_of_the_columns_do_not_fail_the_insert(self):
+        catalogs = dict(
+            self.fba_catalogs,
+            **{
+                "5": dict(id="5", name="n" * 150, vertical="commerce"),
+                "6": dict(id="6", name="unknown", vertical="v" * 30),
+            },
+        )
+
+        synced = sync_app_catalogs(self.app, catalogs)
+
+        self.assertEqual(synced, dict(created=3, deleted=1))
+        self.assertEqual(self.app.catalogs.get(facebook_catalog_id="5").name, "n" * 100)
+        self.assertFalse(self.app.catalogs.filter(facebook_catalog_id="6").exists())
+
+    def test_catalogs_created_meanwhile_are_not_counted(self):
+        bulk_create = Catalog.objects.bulk_create
+
+        def create_meanwhile_and_bulk_create(*args, **kwargs):
+            Catalog.objects.create(app=self.app, facebook_catalog_id="3", name="mine")
+            return bulk_create(*args, **kwargs)
+
+        with patch.object(
+            Catalog.objects,
+            "bulk_create",
+            side_effect=create_meanwhile_and_bulk_create,
+        ):
+            synced = sync_app_catalogs(self.app, self.fba_catalogs)
+
+        self.assertEqual(synced, dict(created=1, deleted=1))
+        self.assertEqual(self.app.catalogs.get(facebook_catalog_id="3").name, "mine")
+
+
+@patch("marketplace.wpp_products.tasks.FacebookClient")
+class SyncFacebookCatalogsTaskTestCase(SyncCatalogsTestCase):
+    def test_catalogs_are_listed_once_with_their_fields(self, client_mock):
+        client_mock.return_value.iter_catalogs.return_value = iter(
+            self.fba_catalogs.values()
+        )
+
+        report = sync_facebook_catalogs(app_ids=[self.app.pk])
+
+        self.assertEqual((report["synced"], report["deleted"]), (1, 1))
+        client_mock.return_value.iter_catalogs.assert_called_once_with(
+            wa_business_id="101010"
+        )
+        client_mock.return_value.get_catalog_details.assert_not_called()
+
+    def test_listing_errors_are_reported(self, client_mock):
+        client_mock.return_value.iter_catalogs.side_effect = Exception("Graph error")
+
+        report = sync_facebook_catalogs(app_ids=[self.app.pk])
+
+        self.assertEqual(report["failed"], 1)
+        self.assertEqual(self.app.catalogs.count(), 2)
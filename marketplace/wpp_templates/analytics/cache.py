@@ -0,0 +1,108 @@
+"""
+Day buckets of the template analytics fetched from Meta.
+
+Every data point is stored under its `(waba_id, template_id, day)`. Meta still
+updates the last closed days, so the current day and the days closed for less
+than WHATSAPP_TEMPLATES_ANALYTICS_SETTLED_DAYS expire after a short TTL, the
+settled ones are kept for WHATSAPP_TEMPLATES_ANALYTICS_TTL. A day without data
+is stored as an empty bucket, so it is not asked to Meta again either.
+"""
+
+import json
+import logging
+import time
+
+from typing import Iterable
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+
+logger = logging.getLogger(__name__)
+
+
+DAY = 24 * 60 * 60
+
+TEMPLATE_ANALYTICS_KEY = "wpp-template-analytics:{waba_id}:{template_id}:{day}"
+
+
+def get_days(start: int, end: int) -> list:
+    """
+    Returns the start of every UTC day between the unix timestamps
+    """
+    return list(range(start - start % DAY, end + 1, DAY))
+
+
+def get_today() -> int:
+    now = int(time.time())
+    return now - now % DAY
+
+
+class TemplateAnalyticsCache(object):
+    def __init__(self, redis=None) -> None:
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_connection()
+        return self._redis
+
+    def _key(self, waba_id: str, template_id: str, day: int) -> str:
+        return TEMPLATE_ANALYTICS_KEY.format(
+            waba_id=waba_id, template_id=template_id, day=day
+        )
+
+    def get_many(self, waba_id: str, template_ids: Iterable, days: list) -> dict:
+        """
+        Returns the cached buckets by `(template_id, day)`, the data point of the
+        day or an empty dict when Meta had no data for it
+        """
+        buckets = [(template_id, day) for template_id in template_ids for day in days]
+        if not buckets:
+            return {}
+
+        try:
+            values = self.redis.mget(
+                [self._key(waba_id, template_id, day) for template_id, day in buckets]
+            )
+        except RedisError as error:
+            logger.warning(f"Could not read the template analytics cache: {error}")
+            return {}
+
+        return {
+            bucket: json.loads(value)
+            for bucket, value in zip(buckets, values)
+            if value is not None
+        }
+
+    def set_many(self, waba_id: str, points: dict) -> None:
+        """
+        Stores the buckets by `(template_id, day)`, each expiring after the TTL
+        of its day
+        """
+        today = get_today()
+
+        try:
+            pipeline = self.redis.pipeline(transaction=False)
+            for (template_id, day), point in points.items():
+                pipeline.set(
+                    self._key(waba_id, template_id, day),
+                    json.dumps(point),
+                    ex=self.get_ttl(day, today),
+                )
+
+            pipeline.execute()
+        except RedisError as error:
+            logger.warning(f"Could not write the template analytics cache: {error}")
+
+    @staticmethod
+    def get_ttl(day: int, today: int) -> int:
+        if day >= today:
+            return settings.WHATSAPP_TEMPLATES_ANALYTICS_TODAY_TTL
+
+        if day >= today - settings.WHATSAPP_TEMPLATES_ANALYTICS_SETTLED_DAYS * DAY:
+            return settings.WHATSAPP_TEMPLATES_ANALYTICS_RECENT_TTL
+
+        return settings.WHATSAPP_TEMPLATES_ANALYTICS_TTL
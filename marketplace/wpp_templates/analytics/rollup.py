@@ -0,0 +1,167 @@
+"""
+Daily rollup of the template analytics.
+
+Every `(app, message_template_id, day)` of a closed day is stored, a day without
+messages as zeros so that the next run knows it was already asked. Meta still
+reports late data for the last closed days, those closed for less than
+WHATSAPP_TEMPLATES_ANALYTICS_SETTLED_DAYS are fetched again by every run and
+replace the stored rows. The reports aggregate the stored rows in SQL and do
+not call Graph at all.
+"""
+
+from datetime import date, datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+
+from marketplace.applications.models import App
+from marketplace.wpp_templates.analytics.cache import DAY, get_days, get_today
+from marketplace.wpp_templates.models import TemplateDailyMetric, TemplateTranslation
+from marketplace.wpp_templates.services.facebook import (
+    ANALYTICS_METRICS,
+    FacebookService,
+)
+
+
+GROUP_BY_TEMPLATE = "template"
+GROUP_BY_CATEGORY = "category"
+GROUP_BY_LANGUAGE = "language"
+
+# Column grouped by and the key it is returned under
+GROUP_BY_FIELDS = {
+    GROUP_BY_TEMPLATE: ("message_template_id", "template_id"),
+    GROUP_BY_CATEGORY: ("category", "category"),
+    GROUP_BY_LANGUAGE: ("language", "language"),
+}
+
+
+def to_date(timestamp: int) -> date:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).date()
+
+
+class TemplateMetricsRollup(object):
+    def __init__(self, service: FacebookService) -> None:
+        self.service = service
+
+    def roll_up(self, app: App, start: int, end: int) -> int:
+        """
+        Stores the closed days between the timestamps missing for the templates
+        of the app, refreshes the days not settled yet and returns how many rows
+        were created
+        """
+        today = get_today()
+        days = [day for day in get_days(start, end) if day < today]
+        settled_until = today - settings.WHATSAPP_TEMPLATES_ANALYTICS_SETTLED_DAYS * DAY
+
+        # Only the translations already created on Meta have analytics
+        rows = (
+            TemplateTranslation.objects.filter(template__app=app)
+            .exclude(message_template_id__isnull=True)
+            .exclude(message_template_id="")
+            .values_list("message_template_id", "template__category", "language")
+        )
+        translations = {
+            message_template_id: (category, language)
+            for message_template_id, category, language in rows
+        }
+        if not days or not translations:
+            return 0
+
+        stored = set(
+            TemplateDailyMetric.objects.filter(
+                app=app, day__range=(to_date(days[0]), to_date(days[-1]))
+            ).values_list("message_template_id", "day")
+        )
+        missing = [
+            (message_template_id, day)
+            for message_template_id in translations
+            for day in days
+            if day >= settled_until or (message_template_id, to_date(day)) not in stored
+        ]
+        if not missing:
+            return 0
+
+        waba_id = self.service.get_waba(app=app).get("wa_waba_id")
+        fetched = self.service.fetch_analytics_buckets(waba_id, missing)
+
+        metrics = []
+        for (message_template_id, day), point in fetched.items():
+            category, language = translations[message_template_id]
+            metrics.append(
+                TemplateDailyMetric(
+                    app=app,
+                    message_template_id=message_template_id,
+                    day=to_date(day),
+                    category=category,
+                    language=language,
+                    **{metric: point.get(metric, 0) for metric in ANALYTICS_METRICS},
+                )
+            )
+
+        refreshed = [day for day in days if day >= settled_until]
+        range_metrics = TemplateDailyMetric.objects.filter(
+            app=app, day__range=(to_date(days[0]), to_date(days[-1]))
+        )
+
+        with transaction.atomic():
+            count = range_metrics.count()
+            if refreshed:
+                range_metrics.filter(
+                    message_template_id__in=translations,
+                    day__in=[to_date(day) for day in refreshed],
+                ).delete()
+
+            # A concurrent run may have stored some of the days already
+            TemplateDailyMetric.objects.bulk_create(
+                metrics, batch_size=1000, ignore_conflicts=True
+            )
+            return range_metrics.count() - count
+
+
+def query_template_metrics(
+    app: App,
+    start: int,
+    end: int,
+    group_by: str = GROUP_BY_TEMPLATE,
+    template_ids: list = None,
+) -> dict:
+    """
+    Sums the stored days between the timestamps per template, category or
+    language, in the shape of the template analytics
+    """
+    metrics = TemplateDailyMetric.objects.filter(
+        app=app, day__range=(to_date(start), to_date(end))
+    )
+    if template_ids:
+        metrics = metrics.filter(
+            message_template_id__in=[str(template_id) for template_id in template_ids]
+        )
+
+    field, key = GROUP_BY_FIELDS[group_by]
+    groups = (
+        metrics.values(field)
+        .annotate(**{f"total_{metric}": Sum(metric) for metric in ANALYTICS_METRICS})
+        .order_by(field)
+    )
+
+    totals = dict.fromkeys(ANALYTICS_METRICS, 0)
+    data = []
+    for group in groups:
+        row = {key: group[field]}
+        for metric in ANALYTICS_METRICS:
+            row[metric] = group[f"total_{metric}"]
+            totals[metric] += row[metric]
+
+        data.append(row)
+
+    if group_by == GROUP_BY_TEMPLATE:
+        template_names = dict(
+            TemplateTranslation.objects.filter(
+                message_template_id__in=[row[key] for row in data]
+            ).values_list("message_template_id", "template__name")
+        )
+        for row in data:
+            row["template"] = template_names.get(row[key])
+
+    return {"data": data, "totals": totals}
@@ -1,6 +1,10 @@
 from rest_framework import serializers
 
 from marketplace.core.types.channels.whatsapp_base.mixins import QueryParamsParser
+from marketplace.wpp_templates.analytics.rollup import (
+    GROUP_BY_FIELDS,
+    GROUP_BY_TEMPLATE,
+)
 
 
 class AnalyticsSerializer(serializers.Serializer):
@@ -20,3 +24,10 @@ class AnalyticsSerializer(serializers.Serializer):
             )
 
         return data
+
+
+class TemplateMetricsSerializer(AnalyticsSerializer):
+    fba_template_ids = serializers.ListField(required=False)
+    group_by = serializers.ChoiceField(
+        choices=list(GROUP_BY_FIELDS), default=GROUP_BY_TEMPLATE
+    )
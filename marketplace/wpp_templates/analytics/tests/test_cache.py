@@ -0,0 +1,77 @@
+import json
+
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+from redis.exceptions import ConnectionError
+
+from marketplace.wpp_templates.analytics.cache import (
+    DAY,
+    TemplateAnalyticsCache,
+    get_days,
+)
+
+
+TODAY = 1696032000
+
+
+class GetDaysTestCase(SimpleTestCase):
+    def test_every_day_of_the_range(self):
+        self.assertEqual(
+            get_days(1695772800, 1695945599), [1695772800, 1695772800 + DAY]
+        )
+
+    def test_range_starting_mid_day(self):
+        self.assertEqual(get_days(1695772800 + 3600, 1695772800 + 7200), [1695772800])
+
+
+@override_settings(
+    WHATSAPP_TEMPLATES_ANALYTICS_TODAY_TTL=300,
+    WHATSAPP_TEMPLATES_ANALYTICS_SETTLED_DAYS=3,
+    WHATSAPP_TEMPLATES_ANALYTICS_RECENT_TTL=3600,
+    WHATSAPP_TEMPLATES_ANALYTICS_TTL=90 * DAY,
+)
+@patch("marketplace.wpp_templates.analytics.cache.get_today", return_value=TODAY)
+class TemplateAnalyticsCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.cache = TemplateAnalyticsCache(self.redis)
+
+    def test_cached_buckets_are_returned_by_template_and_day(self, today_mock):
+        self.redis.mget.return_value = [json.dumps(dict(sent=1)), None, "{}"]
+
+        buckets = self.cache.get_many("waba", ["1", "2", "3"], [TODAY])
+
+        self.redis.mget.assert_called_once_with(
+            [
+                f"wpp-template-analytics:waba:{template_id}:{TODAY}"
+                for template_id in ["1", "2", "3"]
+            ]
+        )
+        self.assertEqual(buckets, {("1", TODAY): dict(sent=1), ("3", TODAY): {}})
+
+    def test_recently_closed_days_expire_before_the_settled_ones(self, today_mock):
+        pipeline = self.redis.pipeline.return_value
+
+        self.cache.set_many(
+            "waba",
+            {
+                ("1", TODAY - 4 * DAY): {},
+                ("1", TODAY - 3 * DAY): {},
+                ("1", TODAY - DAY): {},
+                ("1", TODAY): {},
+            },
+        )
+
+        self.assertEqual(
+            [call.kwargs for call in pipeline.set.call_args_list],
+            [dict(ex=90 * DAY), dict(ex=3600), dict(ex=3600), dict(ex=300)],
+        )
+        pipeline.execute.assert_called_once()
+
+    def test_redis_errors_are_cache_misses(self, today_mock):
+        self.redis.mget.side_effect = ConnectionError()
+        self.redis.pipeline.return_value.execute.side_effect = ConnectionError()
+
+        self.assertEqual(self.cache.get_many("waba", ["1"], [TODAY]), {})
+        self.cache.set_many("waba", {("1", TODAY): {}})
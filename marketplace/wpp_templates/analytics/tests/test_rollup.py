@@ -0,0 +1,229 @@
+import uuid
+
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from marketplace.applications.models import App
+from marketplace.wpp_templates.analytics.cache import DAY
+from marketplace.wpp_templates.analytics.rollup import (
+    GROUP_BY_CATEGORY,
+    GROUP_BY_LANGUAGE,
+    TemplateMetricsRollup,
+    query_template_metrics,
+)
+from marketplace.wpp_templates.models import (
+    TemplateDailyMetric,
+    TemplateMessage,
+    TemplateTranslation,
+)
+from marketplace.wpp_templates.services.facebook import FacebookService
+from marketplace.wpp_templates.tasks import rollup_template_analytics
+
+
+User = get_user_model()
+
+
+# 2023-09-30, the rollups below cover the three days before it
+TODAY = 1696032000
+START = TODAY - 3 * DAY
+
+
+class TemplateAnalyticsClient:
+    """Only the first template has messages, one sent per day"""
+
+    def get_template_analytics(self, waba_id, fields):
+        data_points = [
+            dict(template_id="1", start=start, sent=1, delivered=1, read=0)
+            for start in range(fields["start"], fields["end"], DAY)
+            if "1" in fields["template_ids"]
+        ]
+        return {"data": [{"data_points": data_points}]}
+
+
+class RollupTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.get_admin_user()
+        self.app = App.objects.create(
+            config=dict(wa_waba_id="432321321"),
+            project_uuid=uuid.uuid4(),
+            platform=App.PLATFORM_WENI_FLOWS,
+            code="wpp-cloud",
+            created_by=user,
+        )
+        self.welcome = TemplateMessage.objects.create(
+            app=self.app, name="welcome", category="MARKETING"
+        )
+        self.receipt = TemplateMessage.objects.create(
+            app=self.app, name="receipt", category="UTILITY"
+        )
+        for template, language, message_template_id in [
+            (self.welcome, "pt_BR", "1"),
+            (self.welcome, "en_US", "2"),
+            (self.receipt, "pt_BR", "3"),
+        ]:
+            TemplateTranslation.objects.create(
+                template=template,
+                language=language,
+                message_template_id=message_template_id,
+            )
+
+        self.client = MagicMock(wraps=TemplateAnalyticsClient())
+        self.rollup = TemplateMetricsRollup(FacebookService(self.client))
+
+
+@override_settings(WHATSAPP_TEMPLATES_ANALYTICS_SETTLED_DAYS=0)
+@patch("marketplace.wpp_templates.analytics.rollup.get_today", return_value=TODAY)
+class TemplateMetricsRollupTestCase(RollupTestCase):
+    def test_closed_days_are_stored_once(self, today_mock):
+        created = self.rollup.roll_up(self.app, START, TODAY + DAY - 1)
+
+        # The current day is left for the next run
+        self.assertEqual(created, 9)
+        self.assertEqual(
+            TemplateDailyMetric.objects.filter(message_template_id="1", sent=1).count(),
+            3,
+        )
+        self.assertFalse(
+            TemplateDailyMetric.objects.filter(day=date(2023, 9, 30)).exists()
+        )
+
+        self.client.reset_mock()
+        self.assertEqual(self.rollup.roll_up(self.app, START, TODAY - 1), 0)
+        self.client.get_template_analytics.assert_not_called()
+
+    def test_only_the_gaps_are_requested(self, today_mock):
+        self.rollup.roll_up(self.app, START + DAY, TODAY - 1)
+        self.client.reset_mock()
+
+        created = self.rollup.roll_up(self.app, START, TODAY - 1)
+
+        self.assertEqual(created, 3)
+        fields = self.client.get_template_analytics.call_args.kwargs["fields"]
+        self.assertEqual((fields["start"], fields["end"]), (START, START + DAY - 1))
+
+    def test_category_and_language_are_copied(self, today_mock):
+        self.rollup.roll_up(self.app, START, TODAY - 1)
+
+        metric = TemplateDailyMetric.objects.filter(message_template_id="3").first()
+        self.assertEqual((metric.category, metric.language), ("UTILITY", "pt_BR"))
+
+    def test_rows_stored_by_a_concurrent_run_are_not_counted(self, today_mock):
+        fetch_analytics_buckets = self.rollup.service.fetch_analytics_buckets
+
+        def fetch_and_store_concurrently(waba_id, missing):
+            TemplateDailyMetric.objects.create(
+                app=self.app, message_template_id="2", day=date(2023, 9, 27)
+            )
+            return fetch_analytics_buckets(waba_id, missing)
+
+        with patch.object(
+            self.rollup.service,
+            "fetch_analytics_buckets",
+            side_effect=fetch_and_store_concurrently,
+        ):
+            created = self.rollup.roll_up(self.app, START, TODAY - 1)
+
+        self.assertEqual(created, 8)
+        self.assertEqual(TemplateDailyMetric.objects.count(), 9)
+
+    @override_settings(WHATSAPP_TEMPLATES_ANALYTICS_SETTLED_DAYS=1)
+    def test_days_not_settled_are_refreshed(self, today_mock):
+        self.rollup.roll_up(self.app, START, TODAY - 1)
+        # Meta reports the last day late
+        TemplateDailyMetric.objects.update(sent=0)
+        self.client.reset_mock()
+
+        created = self.rollup.roll_up(self.app, START, TODAY - 1)
+
+        self.assertEqual(created, 0)
+        fields = self.client.get_template_analytics.call_args.kwargs["fields"]
+        self.assertEqual((fields["start"], fields["end"]), (TODAY - DAY, TODAY - 1))
+        self.assertEqual(
+            list(
+                TemplateDailyMetric.objects.filter(message_template_id="1")
+                .order_by("day")
+                .values_list("sent", flat=True)
+            ),
+            [0, 0, 1],
+        )
+
+
+@override_settings(WHATSAPP_TEMPLATES_ANALYTICS_SETTLED_DAYS=0)
+class QueryTemplateMetricsTestCase(RollupTestCase):
+    def setUp(self):
+        super().setUp()
+        with patch(
+            "marketplace.wpp_templates.analytics.rollup.get_today",
+            return_value=TODAY,
+        ):
+            self.rollup.roll_up(self.app, START, TODAY - 1)
+
+        TemplateDailyMetric.objects.filter(message_template_id="3").update(sent=2)
+
+    def test_metrics_per_template(self):
+        response = query_template_metrics(self.app, START, TODAY - 1)
+
+        self.assertEqual(
+            [(row["template"], row["sent"]) for row in response["data"]],
+            [("welcome", 3), ("welcome", 0), ("receipt", 6)],
+        )
+        self.assertEqual(response["totals"], dict(sent=9, delivered=3, read=0))
+
+    def test_metrics_per_category_and_language(self):
+        categories = query_template_metrics(
+            self.app, START, TODAY - 1, group_by=GROUP_BY_CATEGORY
+        )
+        languages = query_template_metrics(
+            self.app, START + DAY, TODAY - 1, group_by=GROUP_BY_LANGUAGE
+        )
+
+        self.assertEqual(
+            [(row["category"], row["sent"]) for row in categories["data"]],
+            [("MARKETING", 3), ("UTILITY", 6)],
+        )
+        self.assertEqual(
+            [(row["language"], row["sent"]) for row in languages["data"]],
+            [("en_US", 0), ("pt_BR", 6)],
+        )
+
+    def test_metrics_of_some_templates(self):
+        response = query_template_metrics(
+            self.app, START, TODAY - 1, template_ids=[1, 2]
+        )
+
+        self.assertEqual(response["totals"]["sent"], 3)
+
+    def test_metrics_are_aggregated_in_sql(self):
+        with self.assertNumQueries(2):
+            query_template_metrics(self.app, START, TODAY - 1)
+
+
+@patch("marketplace.wpp_templates.tasks.TemplateMetricsRollup")
+@patch("marketplace.wpp_templates.tasks.get_today", return_value=TODAY)
+class RollupTemplateAnalyticsTaskTestCase(RollupTestCase):
+    def test_apps_are_rolled_up_over_the_days(self, today_mock, rollup_mock):
+        App.objects.create(
+            config={},
+            project_uuid=uuid.uuid4(),
+            platform=App.PLATFORM_WENI_FLOWS,
+            code="wpp-cloud",
+            created_by=User.objects.get_admin_user(),
+        )
+        rollup_mock.return_value.roll_up.return_value = 9
+
+        report = rollup_template_analytics(days=90)
+
+        rollup_mock.return_value.roll_up.assert_called_once_with(
+            self.app, TODAY - 90 * DAY, TODAY - 1
+        )
+        self.assertEqual((report["synced"], report["skipped"]), (1, 1))
+
+    def test_failed_apps_are_reported(self, today_mock, rollup_mock):
+        rollup_mock.return_value.roll_up.side_effect = Exception("Graph error")
+
+        report = rollup_template_analytics(app_ids=[self.app.pk])
+
+        self.assertEqual(report["failed"], 1)
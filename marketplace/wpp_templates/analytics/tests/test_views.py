@@ -83,3 +83,30 @@ class TemplateAnalyticsViewSetTestCase(SetUpTestBase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.json["data"]), 2)
+
+
+class TemplateMetricsViewTestCase(SetUpTestBase):
+    @property
+    def view(self):
+        return self.view_class.as_view({"get": "template_metrics"})
+
+    @patch("marketplace.wpp_templates.analytics.views.views.query_template_metrics")
+    def test_get_template_metrics(self, query_mock):
+        query_mock.return_value = {"data": [], "totals": {}}
+        url = reverse("template-metrics", kwargs={"app_uuid": self.app.uuid})
+        params = {"start": "9-27-2023", "end": "9-28-2023", "group_by": "category"}
+
+        response = self.request.get(url, app_uuid=self.app.uuid, params=params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        query_mock.assert_called_once_with(
+            self.app, 1695772800, 1695945599, group_by="category", template_ids=None
+        )
+
+    def test_invalid_group_by(self):
+        url = reverse("template-metrics", kwargs={"app_uuid": self.app.uuid})
+        params = {"start": "9-27-2023", "end": "9-28-2023", "group_by": "status"}
+
+        response = self.request.get(url, app_uuid=self.app.uuid, params=params)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
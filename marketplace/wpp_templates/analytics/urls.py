@@ -8,7 +8,12 @@ template_analytics = [
         "<uuid:app_uuid>/template-analytics/",
         TemplateAnalyticsViewSet.as_view({"get": "template_analytics"}),
         name="template-analytics",
-    )
+    ),
+    path(
+        "<uuid:app_uuid>/template-metrics/",
+        TemplateAnalyticsViewSet.as_view({"get": "template_metrics"}),
+        name="template-metrics",
+    ),
 ]
 
 urlpatterns = template_analytics
@@ -6,7 +6,11 @@ from rest_framework.generics import get_object_or_404
 from marketplace.clients.facebook.client import FacebookClient
 from marketplace.wpp_templates.services.facebook import FacebookService
 from marketplace.applications.models import App
-from marketplace.wpp_templates.analytics.serializers import AnalyticsSerializer
+from marketplace.wpp_templates.analytics.rollup import query_template_metrics
+from marketplace.wpp_templates.analytics.serializers import (
+    AnalyticsSerializer,
+    TemplateMetricsSerializer,
+)
 
 
 class TemplateAnalyticsViewSet(viewsets.ViewSet):
@@ -34,3 +38,20 @@ class TemplateAnalyticsViewSet(viewsets.ViewSet):
 
         response = self.fb_service.template_analytics(app, validated_data)
         return Response(response)
+
+    @action(detail=True, methods=["GET"])
+    def template_metrics(self, request, app_uuid=None, **kwargs):
+        app = get_object_or_404(App, uuid=app_uuid, code__in=["wpp-cloud", "wpp"])
+
+        serializer = TemplateMetricsSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        validated_data = serializer.validated_data
+
+        response = query_template_metrics(
+            app,
+            validated_data["start"],
+            validated_data["end"],
+            group_by=validated_data["group_by"],
+            template_ids=validated_data.get("fba_template_ids"),
+        )
+        return Response(response)
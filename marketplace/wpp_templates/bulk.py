@@ -0,0 +1,204 @@
+"""
+Creation of many templates and translations of an app in one request.
+
+Every translation is submitted to Meta by a bounded pool of threads, the ones
+accepted are then written with one bulk insert per model. A translation that
+fails does not stop the others, its error is returned in its own result. When
+the bulk insert fails the translations are written one by one, the ones that
+still fail keep their Meta id in a `not_stored` result.
+"""
+
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from sentry_sdk import capture_exception
+
+from marketplace.applications.models import App
+from marketplace.clients.facebook.transport import with_task_context
+from marketplace.core.types.channels.whatsapp_base.exceptions import (
+    FacebookApiException,
+)
+from .models import TemplateButton, TemplateHeader, TemplateMessage, TemplateTranslation
+from .requests import TemplateMessageRequest
+from .serializers import TemplateTranslationSerializer, get_access_token, get_waba_id
+from .upsert import assign_pks
+
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+STATUS_CREATED = "created"
+STATUS_FAILED = "failed"
+STATUS_NOT_STORED = "not_stored"
+
+
+class BulkTemplateCreator(object):
+    def __init__(self, app: App, max_workers: int = None) -> None:
+        self.app = app
+        self.max_workers = max_workers or settings.WHATSAPP_TEMPLATES_BULK_CONCURRENCY
+
+        self.access_token = get_access_token(app)
+        self.waba_id = get_waba_id(app)
+        self._serializer = TemplateTranslationSerializer()
+
+    def create(self, templates: list) -> list:
+        """
+        Creates the validated templates and returns the status of each of their
+        translations in the order they were sent
+        """
+        items = [
+            (template, translation)
+            for template in templates
+            for translation in template["translations"]
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            outcomes = list(executor.map(with_task_context(self._submit), items))
+
+        not_stored = self._save(
+            [
+                (template, translation, outcome)
+                for (template, translation), outcome in zip(items, outcomes)
+                if not isinstance(outcome, Exception)
+            ]
+        )
+
+        return [
+            self._result(template, translation, outcome, not_stored)
+            for (template, translation), outcome in zip(items, outcomes)
+        ]
+
+    def _submit(self, item: tuple):
+        """
+        Submits a translation to Meta, returns the id of the created template or
+        the error that prevented it
+        """
+        template, translation = item
+
+        try:
+            components = self._serializer.build_components(
+                self.app, translation, self.access_token
+            )
+            new_template = TemplateMessageRequest(
+                access_token=self.access_token
+            ).create_template_message(
+                waba_id=self.waba_id,
+                name=template["name"],
+                category=template["category"],
+                components=components,
+                language=translation.get("language"),
+            )
+        except FacebookApiException as error:
+            return error
+        except Exception as error:
+            capture_exception(error)
+            return error
+
+        return new_template["id"]
+
+    def _save(self, created: list) -> set:
+        """
+        Writes the translations created on Meta, returns the ids of the ones that
+        could not be stored
+        """
+        try:
+            self._write(created)
+        except DatabaseError as error:
+            logger.warning(
+                f"Could not write the templates of the app {self.app.uuid} at once, "
+                f"writing them one by one: {error}"
+            )
+            return self._save_one_by_one(created)
+
+        return set()
+
+    def _save_one_by_one(self, created: list) -> set:
+        """
+        Writes each translation in its own transaction, the ones that fail are
+        reported to sentry
+        """
+        not_stored = set()
+
+        for item in created:
+            try:
+                self._write([item])
+            except DatabaseError as error:
+                capture_exception(error)
+                not_stored.add(item[2])
+
+        return not_stored
+
+    def _write(self, created: list) -> None:
+        if not created:
+            return
+
+        names = {template["name"] for template, _, _ in created}
+
+        with transaction.atomic():
+            templates = {
+                template.name: template
+                for template in TemplateMessage.objects.filter(
+                    app=self.app, name__in=names
+                )
+            }
+
+            admin = User.objects.get_admin_user()
+            new_templates = []
+            for template, _, _ in created:
+                if template["name"] in templates:
+                    continue
+
+                templates[template["name"]] = TemplateMessage(
+                    name=template["name"],
+                    app=self.app,
+                    category=template["category"],
+                    template_type="TEXT",
+                    created_by_id=admin.id,
+                )
+                new_templates.append(templates[template["name"]])
+
+            TemplateMessage.objects.bulk_create(new_templates)
+            assign_pks(TemplateMessage, new_templates)
+
+            rows = [
+                self._serializer.build_translation(
+                    templates[template["name"]], translation, message_template_id
+                )
+                for template, translation, message_template_id in created
+            ]
+
+            translations = [translation for translation, _, _ in rows]
+            TemplateTranslation.objects.bulk_create(translations)
+            assign_pks(TemplateTranslation, translations)
+
+            TemplateHeader.objects.bulk_create(
+                [header for _, header, _ in rows if header is not None]
+            )
+            TemplateButton.objects.bulk_create(
+                [button for _, _, buttons in rows for button in buttons]
+            )
+
+    def _result(
+        self, template: dict, translation: dict, outcome, not_stored: set
+    ) -> dict:
+        result = dict(name=template["name"], language=translation.get("language"))
+
+        if isinstance(outcome, FacebookApiException) and outcome.args:
+            result["status"] = STATUS_FAILED
+            result["error"] = outcome.args[0]
+        elif isinstance(outcome, Exception):
+            result["status"] = STATUS_FAILED
+            result["error"] = str(outcome)
+        elif outcome in not_stored:
+            result["status"] = STATUS_NOT_STORED
+            result["message_template_id"] = outcome
+        else:
+            result["status"] = STATUS_CREATED
+            result["message_template_id"] = outcome
+
+        return result
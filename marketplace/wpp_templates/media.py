@@ -0,0 +1,171 @@
+"""
+Upload of the media examples of template headers.
+
+The example arrives as a base64 data URI, it is decoded slice by slice into a
+spooled temporary file, which only touches the disk past the spool size, and
+streamed to the Graph resumable upload session from there. A failed transfer
+asks the session for the offset Meta acknowledged and resumes from it instead
+of sending the whole file again.
+"""
+
+import base64
+import logging
+import os
+
+from tempfile import SpooledTemporaryFile
+from typing import IO, Tuple
+
+import requests
+
+from django.conf import settings
+
+from marketplace.clients.facebook.transport import graph_request
+from marketplace.core.types.channels.whatsapp_base.exceptions import (
+    FacebookApiException,
+)
+from marketplace.core.types.channels.whatsapp_cloud.requests import PhotoAPIRequest
+
+
+logger = logging.getLogger(__name__)
+
+
+# Base64 characters decoded at a time, a multiple of 4 so that every slice
+# decodes to whole bytes
+DECODE_CHUNK_SIZE = 64 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def parse_data_uri(data_uri: str) -> Tuple[str, str]:
+    """
+    Splits a `data:<type>;base64,<payload>` URI into its type and payload
+    """
+    prefix, separator, payload = data_uri.partition(";base64,")
+    scheme, _, file_type = prefix.partition("data:")
+    if not separator or scheme or not file_type:
+        raise ValueError("The header example must be a base64 data URI")
+
+    return file_type, payload
+
+
+def decode_base64(payload: str, spool_size: int = None) -> IO[bytes]:
+    """
+    Decodes the payload into a temporary file without holding the whole decoded
+    file in memory, the returned file is positioned at its end
+    """
+    spool_size = spool_size or settings.WHATSAPP_TEMPLATES_MEDIA_SPOOL_SIZE
+    media = SpooledTemporaryFile(max_size=spool_size)
+
+    for start in range(0, len(payload), DECODE_CHUNK_SIZE):
+        end = start + DECODE_CHUNK_SIZE
+        media.write(base64.b64decode(payload[start:end]))
+
+    return media
+
+
+class MediaStream(object):
+    """
+    Streams a file from an offset in chunks, `requests` sends it with its
+    Content-Length without reading it whole
+    """
+
+    def __init__(self, media: IO[bytes], offset: int, length: int) -> None:
+        media.seek(offset)
+        self._media = media
+        self._remaining = length - offset
+
+    def __len__(self) -> int:
+        return self._remaining
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+
+        chunk = self._media.read(size)
+        self._remaining -= len(chunk)
+        return chunk
+
+
+class HeaderMediaUploader(object):
+    def __init__(self, waba_id: str, access_token: str, max_attempts: int = None):
+        self.waba_id = waba_id
+        self.access_token = access_token
+        self.max_attempts = (
+            max_attempts or settings.WHATSAPP_TEMPLATES_MEDIA_UPLOAD_ATTEMPTS
+        )
+
+    @property
+    def _headers(self) -> dict:
+        return {"Authorization": f"OAuth {self.access_token}"}
+
+    def upload(self, data_uri: str) -> str:
+        """
+        Uploads a header example and returns the handle Meta expects in the
+        `header_handle` of the template component
+        """
+        file_type, payload = parse_data_uri(data_uri)
+
+        with decode_base64(payload) as media:
+            length = media.seek(0, os.SEEK_END)
+            upload_session_id = PhotoAPIRequest(self.waba_id).create_upload_session(
+                self.access_token, length, file_type=file_type
+            )
+            url = (
+                f"https://graph.facebook.com/{settings.WHATSAPP_VERSION}/"
+                f"{upload_session_id}"
+            )
+
+            return self._send(url, media, length, file_type)
+
+    def _send(self, url: str, media: IO[bytes], length: int, file_type: str) -> str:
+        offset = 0
+
+        for attempt in range(1, self.max_attempts + 1):
+            headers = dict(self._headers)
+            headers["Content-Type"] = file_type
+            headers["file_offset"] = str(offset)
+
+            try:
+                response = graph_request(
+                    "POST",
+                    url,
+                    waba_id=self.waba_id,
+                    headers=headers,
+                    data=MediaStream(media, offset, length),
+                )
+            except requests.RequestException as error:
+                if attempt == self.max_attempts:
+                    raise
+                logger.warning(f"Header upload interrupted at {offset}: {error}")
+            else:
+                if response.status_code == 200:
+                    return response.json().get("h", "")
+
+                # Only the failures of Meta's side are worth resuming
+                if response.status_code < 500 or attempt == self.max_attempts:
+                    raise FacebookApiException(response.json())
+
+            offset = self._get_offset(url)
+
+    def _get_offset(self, url: str) -> int:
+        """
+        Returns the offset the upload session acknowledged, from the start when
+        the session can not tell
+        """
+        try:
+            response = graph_request(
+                "GET", url, waba_id=self.waba_id, headers=self._headers
+            )
+        except requests.RequestException:
+            return 0
+
+        if response.status_code != 200:
+            return 0
+
+        return int(response.json().get("file_offset", 0))
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.4 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wpp_templates", "0006_templatetranslation_message_template_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="templatetranslation",
+            name="quality_score",
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.4 on 2026-10-18 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wpp_templates", "0007_templatetranslation_quality_score"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="templatemessage",
+            index=models.Index(
+                fields=["app", "-created_on", "-id"], name="template_app_created_on_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="templatemessage",
+            index=models.Index(
+                fields=["app", "name", "id"], name="template_app_name_idx"
+            ),
+        ),
+    ]
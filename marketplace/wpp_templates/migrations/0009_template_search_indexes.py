@@ -0,0 +1,67 @@
+# Generated by Django 3.2.4 on 2026-10-18 02:31
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+
+from django.db import migrations, models
+
+
+class AddPostgreSQLIndex(migrations.AddIndex):
+    """
+    Trigram indexes only exist on PostgreSQL, other backends keep them in the
+    state alone
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wpp_templates", "0008_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="templatemessage",
+            index=models.Index(
+                fields=["app", "category"], name="template_app_category_idx"
+            ),
+        ),
+        django.contrib.postgres.operations.TrigramExtension(),
+        AddPostgreSQLIndex(
+            model_name="templatemessage",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper(
+                        django.db.models.functions.comparison.Cast(
+                            "name", models.TextField()
+                        )
+                    ),
+                    name="gin_trgm_ops",
+                ),
+                name="template_name_trgm_idx",
+            ),
+        ),
+        AddPostgreSQLIndex(
+            model_name="templatetranslation",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper(
+                        django.db.models.functions.comparison.Cast(
+                            "body", models.TextField()
+                        )
+                    ),
+                    name="gin_trgm_ops",
+                ),
+                name="translation_body_trgm_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.4 on 2026-10-18 04:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("applications", "0016_app_configured"),
+        ("wpp_templates", "0009_template_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TemplateDailyMetric",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("message_template_id", models.CharField(max_length=20)),
+                ("day", models.DateField()),
+                ("category", models.CharField(max_length=200, null=True)),
+                ("language", models.CharField(max_length=60, null=True)),
+                ("sent", models.PositiveIntegerField(default=0)),
+                ("delivered", models.PositiveIntegerField(default=0)),
+                ("read", models.PositiveIntegerField(default=0)),
+                (
+                    "app",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="template_metrics",
+                        to="applications.app",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="templatedailymetric",
+            index=models.Index(
+                fields=["app", "day"], name="template_metric_app_day_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="templatedailymetric",
+            constraint=models.UniqueConstraint(
+                fields=("app", "message_template_id", "day"),
+                name="template_daily_metric_unique",
+            ),
+        ),
+    ]
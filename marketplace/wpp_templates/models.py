@@ -5,6 +5,8 @@ import textwrap
 from django.core.exceptions import ValidationError
 
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Cast, Upper
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.db import models
@@ -77,6 +79,22 @@ class TemplateMessage(models.Model):
             error_message = textwrap.dedent(str(message))
             raise ValidationError({"name": error_message})
 
+    class Meta:
+        indexes = [
+            # Keyset pagination keys of the template listing
+            models.Index(
+                fields=["app", "-created_on", "-id"],
+                name="template_app_created_on_idx",
+            ),
+            models.Index(fields=["app", "name", "id"], name="template_app_name_idx"),
+            models.Index(fields=["app", "category"], name="template_app_category_idx"),
+            # Serves the `icontains` and `istartswith` searches on PostgreSQL
+            GinIndex(
+                OpClass(Upper(Cast("name", models.TextField())), name="gin_trgm_ops"),
+                name="template_name_trgm_idx",
+            ),
+        ]
+
 
 class TemplateTranslation(models.Model):
     STATUS_CHOICES = (
@@ -111,6 +129,16 @@ class TemplateTranslation(models.Model):
     message_template_id = models.CharField(
         max_length=20, unique=True, null=True, blank=True
     )
+    quality_score = models.CharField(max_length=20, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Serves the `icontains` and `istartswith` searches on PostgreSQL
+            GinIndex(
+                OpClass(Upper(Cast("body", models.TextField())), name="gin_trgm_ops"),
+                name="translation_body_trgm_idx",
+            ),
+        ]
 
 
 class TemplateButton(models.Model):
@@ -151,3 +179,34 @@ class TemplateHeader(models.Model):
 
     def to_dict(self):
         return dict(header_type=self.header_type, text=self.text)
+
+
+class TemplateDailyMetric(models.Model):
+    """
+    Messages of a template translation in a closed UTC day, rolled up from the
+    Meta analytics. The category and language are copied from the translation
+    so the reports can group by them without joins
+    """
+
+    app = models.ForeignKey(
+        App, on_delete=models.CASCADE, related_name="template_metrics"
+    )
+    message_template_id = models.CharField(max_length=20)
+    day = models.DateField()
+    category = models.CharField(max_length=200, null=True)
+    language = models.CharField(max_length=60, null=True)
+
+    sent = models.PositiveIntegerField(default=0)
+    delivered = models.PositiveIntegerField(default=0)
+    read = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["app", "message_template_id", "day"],
+                name="template_daily_metric_unique",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["app", "day"], name="template_metric_app_day_idx"),
+        ]
@@ -1,5 +1,7 @@
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 
+from marketplace.clients.facebook.transport import graph_request, with_task_context
 from marketplace.core.types.channels.whatsapp_base.exceptions import (
     FacebookApiException,
 )
@@ -8,6 +10,9 @@ from django.conf import settings
 
 WHATSAPP_VERSION = settings.WHATSAPP_VERSION
 
+# Fields of a template stored by the marketplace
+TEMPLATE_FIELDS = "id,name,category,language,status,components"
+
 
 class TemplateMessageRequest(object):
     def __init__(self, access_token: str) -> None:
@@ -18,23 +23,77 @@ class TemplateMessageRequest(object):
         return {"Authorization": f"Bearer {self._access_token}"}
 
     def list_template_messages(self, waba_id: str) -> dict:
+        try:
+            return dict(data=list(self.iter_template_messages(waba_id)))
+        except FacebookApiException as error:
+            return error.args[0]
+
+    def iter_template_messages(
+        self,
+        waba_id: str,
+        fields: str = TEMPLATE_FIELDS,
+        limit: int = None,
+        prefetch: bool = False,
+    ) -> Iterator[dict]:
+        """
+        Yields the templates of the WABA page by page following the Graph cursors.
+        With `prefetch` the next page is requested while the current one is
+        consumed, raises FacebookApiException when a page fails.
+        """
         params = dict(
-            limit=999,
+            fields=fields,
+            limit=limit or settings.WHATSAPP_TEMPLATES_PAGE_SIZE,
             access_token=self._access_token,
         )
-        response = requests.get(
-            url=f"https://graph.facebook.com/{WHATSAPP_VERSION}/{waba_id}/message_templates",
-            params=params,
-        )
-        return response.json()
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+        try:
+            page = self._get_templates_page(
+                f"https://graph.facebook.com/{WHATSAPP_VERSION}/{waba_id}/message_templates",
+                waba_id,
+                params,
+            )
+
+            while True:
+                next_url = page.get("paging", {}).get("next")
+                next_page = None
+                if executor is not None and next_url:
+                    next_page = executor.submit(
+                        with_task_context(self._get_templates_page), next_url, waba_id
+                    )
+
+                yield from page.get("data", [])
+
+                if not next_url:
+                    return
+
+                if next_page is not None:
+                    page = next_page.result()
+                else:
+                    page = self._get_templates_page(next_url, waba_id)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def _get_templates_page(self, url: str, waba_id: str, params: dict = None):
+        # The `next` url of a page already carries the fields, limit and cursor
+        response = graph_request("GET", url, waba_id=waba_id, params=params)
+        content = response.json()
+
+        if response.status_code != 200 or content.get("error"):
+            raise FacebookApiException(content)
+
+        return content
 
     def get_template_namespace(self, waba_id: str) -> dict:
         params = dict(
             fields="message_template_namespace",
             access_token=self._access_token,
         )
-        response = requests.get(
-            url=f"https://graph.facebook.com/{WHATSAPP_VERSION}/{waba_id}",
+        response = graph_request(
+            "GET",
+            f"https://graph.facebook.com/{WHATSAPP_VERSION}/{waba_id}",
+            waba_id=waba_id,
             params=params,
         )
         return response.json().get("message_template_namespace")
@@ -49,8 +108,10 @@ class TemplateMessageRequest(object):
             language=language,
             access_token=self._access_token,
         )
-        response = requests.post(
-            url=f"https://graph.facebook.com/{WHATSAPP_VERSION}/{waba_id}/message_templates",
+        response = graph_request(
+            "POST",
+            f"https://graph.facebook.com/{WHATSAPP_VERSION}/{waba_id}/message_templates",
+            waba_id=waba_id,
             params=params,
         )
         if response.status_code != 200:
@@ -64,8 +125,9 @@ class TemplateMessageRequest(object):
         params = dict(
             name=name, components=str(components), access_token=self._access_token
         )
-        response = requests.post(
-            url=f"https://graph.facebook.com/{WHATSAPP_VERSION}/{message_template_id}",
+        response = graph_request(
+            "POST",
+            f"https://graph.facebook.com/{WHATSAPP_VERSION}/{message_template_id}",
             params=params,
         )
         if response.status_code != 200:
@@ -75,7 +137,9 @@ class TemplateMessageRequest(object):
 
     def delete_template_message(self, waba_id: str, name: str) -> bool:
         params = dict(name=name, access_token=self._access_token)
-        return requests.delete(
-            url=f"https://graph.facebook.com/{WHATSAPP_VERSION}/{waba_id}/message_templates",
+        return graph_request(
+            "DELETE",
+            f"https://graph.facebook.com/{WHATSAPP_VERSION}/{waba_id}/message_templates",
+            waba_id=waba_id,
             params=params,
         )
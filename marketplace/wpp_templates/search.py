@@ -0,0 +1,55 @@
+"""
+Search of the templates of an app by name and translation body.
+
+The lookups compile to `UPPER(column::text) LIKE UPPER(...)` on PostgreSQL, which
+the trigram indexes created by the `0009_template_search_indexes` migration
+serve for both prefix and substring terms instead of scanning the table.
+"""
+
+from django.db import connection
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, QuerySet, When
+
+from .models import TemplateTranslation
+
+
+SEARCH_PREFIX = "prefix"
+SEARCH_CONTAINS = "contains"
+SEARCH_MODES = (SEARCH_PREFIX, SEARCH_CONTAINS)
+
+RELEVANCE = "relevance"
+
+
+def search_templates(
+    queryset: QuerySet, term: str, mode: str = SEARCH_CONTAINS
+) -> QuerySet:
+    """
+    Keeps the templates whose name or any translation body matches the term,
+    at its start with the `prefix` mode and anywhere with the `contains` one
+    """
+    lookup = "istartswith" if mode == SEARCH_PREFIX else "icontains"
+
+    # Exists keeps one row per template however many translations match
+    translations = TemplateTranslation.objects.filter(
+        template=OuterRef("pk"), **{f"body__{lookup}": term}
+    )
+    return queryset.filter(Q(**{f"name__{lookup}": term}) | Exists(translations))
+
+
+def order_by_relevance(queryset: QuerySet, term: str) -> QuerySet:
+    """
+    Orders the matches by trigram similarity of the name on PostgreSQL, other
+    backends list the names starting with the term first
+    """
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return queryset.annotate(relevance=TrigramSimilarity("name", term)).order_by(
+            "-relevance", "-created_on", "-id"
+        )
+
+    relevance = Case(
+        When(name__istartswith=term, then=1), default=0, output_field=IntegerField()
+    )
+    return queryset.annotate(relevance=relevance).order_by(
+        "-relevance", "-created_on", "-id"
+    )
@@ -1,6 +1,3 @@
-import requests
-import re
-import base64
 from datetime import datetime
 
 from django.core.exceptions import ValidationError
@@ -12,17 +9,33 @@ from rest_framework import serializers
 from marketplace.applications.models import App
 
 from .models import TemplateMessage, TemplateTranslation, TemplateButton, TemplateHeader
+from .media import HeaderMediaUploader
 from .requests import TemplateMessageRequest
-from marketplace.core.types.channels.whatsapp_cloud.requests import PhotoAPIRequest
-from marketplace.core.types.channels.whatsapp_base.exceptions import (
-    FacebookApiException,
-)
-
-WHATSAPP_VERSION = settings.WHATSAPP_VERSION
 
 User = get_user_model()
 
 
+def get_access_token(app: App) -> str:
+    if app.code == "wpp":
+        access_token = app.config.get("fb_access_token", None)
+
+        if access_token is None:
+            raise ValidationError(
+                f"This app: {app.uuid} does not have fb_access_token in config"
+            )
+
+        return access_token
+
+    return settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN
+
+
+def get_waba_id(app: App) -> str:
+    if app.config.get("wa_waba_id"):
+        return app.config.get("wa_waba_id")
+
+    return app.config.get("waba").get("id")
+
+
 class HeaderSerializer(serializers.ModelSerializer):
     text = serializers.CharField(required=False)
     example = serializers.CharField(required=False)
@@ -58,8 +71,10 @@ class TemplateTranslationSerializer(serializers.Serializer):
     def to_representation(self, instance):
         data = super().to_representation(instance)
 
-        if instance.headers.first():
-            data["header"] = instance.headers.first().to_dict()
+        # Reads the prefetched headers instead of querying them per translation
+        headers = list(instance.headers.all())
+        if headers:
+            data["header"] = min(headers, key=lambda header: header.pk).to_dict()
         return data
 
     def append_to_components(self, components: list() = [], component=None):
@@ -70,18 +85,39 @@ class TemplateTranslationSerializer(serializers.Serializer):
 
     def create(self, validated_data: dict) -> None:
         template = TemplateMessage.objects.get(uuid=validated_data.get("template_uuid"))
+        access_token = get_access_token(template.app)
 
-        if template.app.code == "wpp":
-            access_token = template.app.config.get("fb_access_token", None)
+        template_message_request = TemplateMessageRequest(access_token=access_token)
+        components = self.build_components(template.app, validated_data, access_token)
 
-            if access_token is None:
-                raise ValidationError(
-                    f"This app: {template.app.uuid} does not have fb_access_token in config"
-                )
-        else:
-            access_token = settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN
+        new_template = template_message_request.create_template_message(
+            waba_id=get_waba_id(template.app),
+            name=template.name,
+            category=template.category,
+            components=components,
+            language=validated_data.get("language"),
+        )
 
-        template_message_request = TemplateMessageRequest(access_token=access_token)
+        translation, header, buttons = self.build_translation(
+            template, validated_data, new_template["id"]
+        )
+        translation.save()
+
+        for button in buttons:
+            button.save()
+
+        if header is not None:
+            header.save()
+
+        return translation
+
+    def build_components(
+        self, app: App, validated_data: dict, access_token: str
+    ) -> list:
+        """
+        Builds the components submitted to Meta, uploading the media example of
+        the header when there is one
+        """
         components = [validated_data.get("body", {})]
         header = validated_data.get("header")
 
@@ -96,34 +132,10 @@ class TemplateTranslationSerializer(serializers.Serializer):
                 or header.get("format") == "DOCUMENT"
                 or header.get("format") == "VIDEO"
             ):
-                photo_api_request = PhotoAPIRequest(
-                    template.app.config.get("wa_waba_id")
-                )
-                photo = header.get("example")
-                file_type = re.search("(?<=data:)(.*)(?=;base64)", photo).group(0)
-                photo = photo.split(";base64,")[1]
-                upload_session_id = photo_api_request.create_upload_session(
-                    access_token,
-                    len(base64.b64decode(photo)),
-                    file_type=file_type,
-                )
-
-                url = (
-                    f"https://graph.facebook.com/{WHATSAPP_VERSION}/{upload_session_id}"
-                )
-                headers = {
-                    "Content-Type": file_type,
-                    "Authorization": f"OAuth {access_token}",
-                }
-                headers["file_offset"] = "0"
-                response = requests.post(
-                    url, headers=headers, data=base64.b64decode(photo)
+                uploader = HeaderMediaUploader(
+                    app.config.get("wa_waba_id"), access_token
                 )
-
-                if response.status_code != 200:
-                    raise FacebookApiException(response.json())
-
-                upload_handle = response.json().get("h", "")
+                upload_handle = uploader.upload(header.get("example"))
                 header.pop("example")
                 header["example"] = dict(header_handle=upload_handle)
 
@@ -155,20 +167,16 @@ class TemplateTranslationSerializer(serializers.Serializer):
         if buttons_component.get("buttons"):
             components = self.append_to_components(components, buttons_component)
 
-        waba_id = (
-            template.app.config.get("wa_waba_id")
-            if template.app.config.get("wa_waba_id")
-            else template.app.config.get("waba").get("id")
-        )
-        new_template = template_message_request.create_template_message(
-            waba_id=waba_id,
-            name=template.name,
-            category=template.category,
-            components=components,
-            language=validated_data.get("language"),
-        )
+        return components
 
-        translation = TemplateTranslation.objects.create(
+    def build_translation(
+        self, template: TemplateMessage, validated_data: dict, message_template_id: str
+    ) -> tuple:
+        """
+        Returns the unsaved translation created on Meta with its header, if any,
+        and buttons
+        """
+        translation = TemplateTranslation(
             template=template,
             status="PENDING",
             body=validated_data.get("body", {}).get("text", ""),
@@ -176,20 +184,71 @@ class TemplateTranslationSerializer(serializers.Serializer):
             language=validated_data.get("language"),
             country=validated_data.get("country", "Brasil"),
             variable_count=0,
-            message_template_id=new_template["id"],
+            message_template_id=message_template_id,
         )
 
-        for button in buttons:
-            button = dict(button)
-            TemplateButton.objects.create(translation=translation, **button)
+        buttons = [
+            TemplateButton(translation=translation, **dict(button))
+            for button in validated_data.get("buttons", {})
+        ]
 
+        header = None
         if validated_data.get("header"):
             hh = dict(validated_data.get("header"))
             if hh.get("example"):
                 hh.pop("example")
-            TemplateHeader.objects.create(translation=translation, **hh)
+            header = TemplateHeader(translation=translation, **hh)
 
-        return translation
+        return translation, header, buttons
+
+
+class BulkTemplateTranslationSerializer(TemplateTranslationSerializer):
+    template_uuid = None
+
+
+class BulkTemplateSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    category = serializers.CharField()
+    translations = BulkTemplateTranslationSerializer(many=True, allow_empty=False)
+
+    def validate(self, attrs: dict) -> dict:
+        template = TemplateMessage(name=attrs["name"], category=attrs["category"])
+        exclude = [
+            field.name
+            for field in TemplateMessage._meta.fields
+            if field.name not in ["name", "category"]
+        ]
+
+        try:
+            template.clean_fields(exclude=exclude)
+        except ValidationError as error:
+            raise serializers.ValidationError(error.message_dict)
+
+        languages = [translation["language"] for translation in attrs["translations"]]
+        if len(set(languages)) != len(languages):
+            raise serializers.ValidationError(
+                {"translations": "Each language can only be sent once per template"}
+            )
+
+        return attrs
+
+
+class BulkTemplatesSerializer(serializers.Serializer):
+    templates = BulkTemplateSerializer(many=True, allow_empty=False)
+
+    def validate_templates(self, templates: list) -> list:
+        names = [template["name"] for template in templates]
+        if len(set(names)) != len(names):
+            raise serializers.ValidationError("Each template can only be sent once")
+
+        translations = sum(len(template["translations"]) for template in templates)
+        limit = settings.WHATSAPP_TEMPLATES_BULK_MAX_TRANSLATIONS
+        if translations > limit:
+            raise serializers.ValidationError(
+                f"At most {limit} translations can be created at once"
+            )
+
+        return templates
 
 
 class TemplateMessageSerializer(serializers.Serializer):
@@ -203,9 +262,12 @@ class TemplateMessageSerializer(serializers.Serializer):
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
+        translations = list(instance.translations.all())
 
-        if instance.translations.first():
-            data["text_preview"] = instance.translations.first().body
+        if not translations:
+            data.pop("text_preview", None)
+        elif not hasattr(instance, "text_preview"):
+            data["text_preview"] = min(translations, key=lambda item: item.pk).body
         return data
 
     def create(self, validated_data: dict) -> TemplateMessage:
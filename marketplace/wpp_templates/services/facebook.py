@@ -1,9 +1,26 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable
+
+from django.conf import settings
+
+from marketplace.clients.facebook.transport import with_task_context
+from marketplace.core.sync.reconciliation import chunked
+from marketplace.wpp_templates.analytics.cache import (
+    DAY,
+    TemplateAnalyticsCache,
+    get_days,
+)
 from marketplace.wpp_templates.models import TemplateTranslation
 
 
+ANALYTICS_METRICS = ["sent", "delivered", "read"]
+
+
 class FacebookService:
-    def __init__(self, client):
+    def __init__(self, client, cache=None):
         self.client = client
+        self.cache = cache or TemplateAnalyticsCache()
 
     def get_fields(self, start: str, end: str, fba_template_ids):
         fields = {
@@ -16,38 +33,36 @@ class FacebookService:
         return fields
 
     def format_analytics_data(self, analytics_data):
-        formatted_data = []
-        totals = {"sent": 0, "delivered": 0, "read": 0}
-
-        data_points = analytics_data.get("data", [])[0].get("data_points", [])
-
+        return self.aggregate_data_points(
+            point
+            for data in analytics_data.get("data", [])
+            for point in data.get("data_points", [])
+        )
+
+    def aggregate_data_points(self, data_points: Iterable[dict]) -> dict:
+        """
+        Sums the data points per template and in total as they are consumed,
+        then names the templates with a single query
+        """
+        totals = {metric: 0 for metric in ANALYTICS_METRICS}
         template_totals = {}
 
         for point in data_points:
             template_id = point.get("template_id")
-            sent = point.get("sent")
-            delivered = point.get("delivered")
-            read = point.get("read")
-
-            if template_id not in template_totals:
-                template_totals[template_id] = {
-                    "template_id": template_id,
-                    "sent": sent,
-                    "delivered": delivered,
-                    "read": read,
-                }
-
-            else:
-                template_totals[template_id]["sent"] += sent
-                template_totals[template_id]["delivered"] += delivered
-                template_totals[template_id]["read"] += read
-
-            totals["sent"] += sent
-            totals["delivered"] += delivered
-            totals["read"] += read
+            template_data = template_totals.setdefault(
+                template_id,
+                dict(template_id=template_id, **dict.fromkeys(ANALYTICS_METRICS, 0)),
+            )
+
+            for metric in ANALYTICS_METRICS:
+                template_data[metric] += point.get(metric)
+                totals[metric] += point.get(metric)
+
+        template_names = self.get_template_names(template_totals.keys())
+        formatted_data = []
 
         for template_id, data in template_totals.items():
-            template_name = self.fba_template_id_to_template_name(template_id)
+            template_name = template_names.get(template_id)
             if template_name is not None:
                 data["template"] = template_name
 
@@ -71,16 +86,98 @@ class FacebookService:
         fba_template_ids = data.get("fba_template_ids")
 
         waba_id = self.get_waba(app=app).get("wa_waba_id")
-        fields = self.get_fields(start, end, fba_template_ids)
-        analytics = self.client.get_template_analytics(waba_id=waba_id, fields=fields)
-        return self.format_analytics_data(analytics)
-
-    def fba_template_id_to_template_name(self, fba_template_id):
-        translation = TemplateTranslation.objects.filter(
-            message_template_id=fba_template_id
-        ).last()
-
-        if translation:
-            return translation.template.name
-
-        return None
+        template_ids = [str(template_id) for template_id in fba_template_ids]
+        days = get_days(start, end)
+
+        buckets = self.cache.get_many(waba_id, template_ids, days)
+        missing = [
+            (template_id, day)
+            for template_id in template_ids
+            for day in days
+            if (template_id, day) not in buckets
+        ]
+
+        if missing:
+            fetched = self.fetch_analytics_buckets(waba_id, missing)
+            self.cache.set_many(waba_id, fetched)
+            buckets.update(fetched)
+
+        return self.aggregate_data_points(
+            buckets[(template_id, day)]
+            for template_id in template_ids
+            for day in days
+            if buckets.get((template_id, day))
+        )
+
+    def fetch_analytics_buckets(self, waba_id: str, missing: list) -> dict:
+        """
+        Requests the missing `(template_id, day)` buckets to Meta, split in the
+        template ids and days a single Graph call accepts and sent concurrently.
+        The buckets Meta has no data for come back empty
+        """
+        fetched = {bucket: {} for bucket in missing}
+        requests = self.get_analytics_requests(missing)
+        max_workers = min(
+            settings.WHATSAPP_TEMPLATES_ANALYTICS_CONCURRENCY, len(requests)
+        )
+
+        get_template_analytics = with_task_context(self.client.get_template_analytics)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(get_template_analytics, waba_id=waba_id, fields=fields)
+                for fields in requests
+            ]
+
+            # Each response is merged as soon as it arrives
+            for future in as_completed(futures):
+                for analytics_data in future.result().get("data", []):
+                    for point in analytics_data.get("data_points", []):
+                        start = point.get("start")
+                        bucket = (str(point.get("template_id")), start - start % DAY)
+
+                        if bucket in fetched:
+                            fetched[bucket] = point
+
+        return fetched
+
+    def get_analytics_requests(self, missing: list) -> list:
+        """
+        Groups the templates missing the same days and splits them in chunks of
+        ids and windows of days within the Graph limits
+        """
+        missing_days = defaultdict(set)
+        for template_id, day in missing:
+            missing_days[template_id].add(day)
+
+        templates_by_days = defaultdict(list)
+        for template_id, days in missing_days.items():
+            templates_by_days[tuple(sorted(days))].append(template_id)
+
+        ids_per_request = settings.WHATSAPP_TEMPLATES_ANALYTICS_IDS_PER_REQUEST
+        window_size = settings.WHATSAPP_TEMPLATES_ANALYTICS_DAYS_PER_REQUEST * DAY
+        requests = []
+
+        for days, template_ids in templates_by_days.items():
+            windows = []
+            for day in days:
+                if windows and day < windows[-1][0] + window_size:
+                    windows[-1][1] = day
+                else:
+                    windows.append([day, day])
+
+            for ids in chunked(template_ids, ids_per_request):
+                for start, last_day in windows:
+                    requests.append(self.get_fields(start, last_day + DAY - 1, ids))
+
+        return requests
+
+    def get_template_names(self, fba_template_ids) -> dict:
+        """
+        Maps the Meta template ids to the names of their templates with a single
+        joined query
+        """
+        translations = TemplateTranslation.objects.filter(
+            message_template_id__in=list(fba_template_ids)
+        )
+        return dict(translations.values_list("message_template_id", "template__name"))
@@ -1,5 +1,8 @@
 import uuid
-from django.test import TestCase
+
+from unittest.mock import MagicMock
+
+from django.test import TestCase, override_settings
 
 from marketplace.wpp_templates.services.facebook import FacebookService
 
@@ -79,10 +82,29 @@ class MockFacebookClientWithMultipleDataPoints:
         }
 
 
+class InMemoryAnalyticsCache:
+    def __init__(self):
+        self.buckets = {}
+
+    def get_many(self, waba_id, template_ids, days):
+        return {
+            (template_id, day): self.buckets[(waba_id, template_id, day)]
+            for template_id in template_ids
+            for day in days
+            if (waba_id, template_id, day) in self.buckets
+        }
+
+    def set_many(self, waba_id, points):
+        for (template_id, day), point in points.items():
+            self.buckets[(waba_id, template_id, day)] = point
+
+
 class SetUpBaseService(TestCase):
     def setUp(self):
         user, _bool = User.objects.get_or_create(email="user-fbaservice@marketplace.ai")
-        self.service = FacebookService(client=MockFacebookClient())
+        self.service = FacebookService(
+            client=MockFacebookClient(), cache=InMemoryAnalyticsCache()
+        )
         config = {
             "wa_business_id": "101010101010",
             "wa_waba_id": "10203040",
@@ -182,12 +204,15 @@ class TestFacebookServiceAnalytics(SetUpBaseService):
 
     def test_multiple_data_points(self):
         self.service = FacebookService(
-            client=MockFacebookClientWithMultipleDataPoints()
+            client=MockFacebookClientWithMultipleDataPoints(),
+            cache=InMemoryAnalyticsCache(),
         )
 
+        # The second data point starts on 1695945600, the range has to cover
+        # its day for it to be counted
         validated_data = {
             "start": 1695772800,
-            "end": 1695945599,
+            "end": 1696031999,
             "fba_template_ids": [
                 "831797345020910",
                 "831797345020911",
@@ -207,5 +232,171 @@ class TestFacebookServiceAnalytics(SetUpBaseService):
             "totals": {"sent": 5, "delivered": 5, "read": 2},
         }
         response = self.service.template_analytics(self.app, validated_data)
-        self.service = FacebookService(client=MockFacebookClient())
         self.assertEqual(response, expected_data)
+
+    def test_data_points_out_of_the_requested_days_are_not_counted(self):
+        self.service = FacebookService(
+            client=MockFacebookClientWithMultipleDataPoints(),
+            cache=InMemoryAnalyticsCache(),
+        )
+
+        validated_data = {
+            "start": 1695772800,
+            "end": 1695945599,
+            "fba_template_ids": ["831797345020910"],
+        }
+        response = self.service.template_analytics(self.app, validated_data)
+
+        self.assertEqual(response["totals"], {"sent": 3, "delivered": 3, "read": 1})
+
+
+class TestFacebookServiceAnalyticsCache(SetUpBaseService):
+    def setUp(self):
+        super().setUp()
+        self.client = MagicMock(wraps=MockFacebookClientWithMultipleDataPoints())
+        self.service = FacebookService(self.client, cache=InMemoryAnalyticsCache())
+        self.validated_data = {
+            "start": 1695859200,
+            "end": 1696031999,
+            "fba_template_ids": ["831797345020910", "831797345020911"],
+        }
+
+    def test_cached_days_are_not_requested_again(self):
+        first = self.service.template_analytics(self.app, self.validated_data)
+        second = self.service.template_analytics(self.app, self.validated_data)
+
+        self.assertEqual(first, second)
+        self.assertEqual(second["totals"], {"sent": 5, "delivered": 5, "read": 2})
+        self.client.get_template_analytics.assert_called_once()
+
+    def test_only_the_missing_days_are_requested(self):
+        self.service.template_analytics(
+            self.app, dict(self.validated_data, end=1695945599)
+        )
+
+        response = self.service.template_analytics(self.app, self.validated_data)
+
+        fields = self.client.get_template_analytics.call_args.kwargs["fields"]
+        self.assertEqual((fields["start"], fields["end"]), (1695945600, 1696031999))
+        self.assertEqual(fields["template_ids"], ["831797345020910", "831797345020911"])
+        self.assertEqual(response["totals"], {"sent": 5, "delivered": 5, "read": 2})
+
+
+class DailyPointsFacebookClient:
+    """Returns one point per requested template and day"""
+
+    def get_template_analytics(self, waba_id, fields):
+        return {
+            "data": [
+                {
+                    "data_points": [
+                        dict(
+                            template_id=template_id,
+                            start=start,
+                            end=start + 86400,
+                            sent=1,
+                            delivered=1,
+                            read=0,
+                        )
+                        for template_id in fields["template_ids"]
+                        for start in range(fields["start"], fields["end"], 86400)
+                    ]
+                }
+            ]
+        }
+
+
+@override_settings(
+    WHATSAPP_TEMPLATES_ANALYTICS_IDS_PER_REQUEST=2,
+    WHATSAPP_TEMPLATES_ANALYTICS_DAYS_PER_REQUEST=3,
+    WHATSAPP_TEMPLATES_ANALYTICS_CONCURRENCY=2,
+)
+class TestFacebookServiceAnalyticsRequests(SetUpBaseService):
+    def setUp(self):
+        super().setUp()
+        self.client = MagicMock(wraps=DailyPointsFacebookClient())
+        self.service = FacebookService(self.client, cache=InMemoryAnalyticsCache())
+        self.template_ids = ["831797345020910", "831797345020911", "1", "2", "3"]
+
+    def test_large_requests_are_split_in_ids_and_days(self):
+        # Five templates over seven days, chunks of two ids and three days
+        response = self.service.template_analytics(
+            self.app,
+            dict(start=1695772800, end=1696377599, fba_template_ids=self.template_ids),
+        )
+
+        self.assertEqual(self.client.get_template_analytics.call_count, 9)
+        for call in self.client.get_template_analytics.call_args_list:
+            fields = call.kwargs["fields"]
+            self.assertLessEqual(len(fields["template_ids"]), 2)
+            self.assertLessEqual(fields["end"] - fields["start"], 3 * 86400)
+
+        self.assertEqual(
+            [(data["template"], data["sent"]) for data in response["data"]],
+            [("test_template1", 7), ("test_template2", 7)],
+        )
+        self.assertEqual(response["totals"], {"sent": 35, "delivered": 35, "read": 0})
+
+    def test_templates_missing_different_days_are_requested_apart(self):
+        self.service.template_analytics(
+            self.app,
+            dict(start=1695772800, end=1695859199, fba_template_ids=["1"]),
+        )
+        self.client.reset_mock()
+
+        response = self.service.template_analytics(
+            self.app,
+            dict(start=1695772800, end=1695945599, fba_template_ids=["1", "2"]),
+        )
+
+        requested = sorted(
+            (call.kwargs["fields"]["template_ids"], call.kwargs["fields"]["start"])
+            for call in self.client.get_template_analytics.call_args_list
+        )
+        self.assertEqual(requested, [(["1"], 1695859200), (["2"], 1695772800)])
+        self.assertEqual(response["totals"]["sent"], 4)
+
+    def test_failed_requests_are_not_cached(self):
+        self.client.get_template_analytics.side_effect = [
+            DailyPointsFacebookClient().get_template_analytics(None, self.fields()),
+            Exception("Graph error"),
+        ]
+
+        with self.assertRaises(Exception):
+            self.service.template_analytics(
+                self.app,
+                dict(
+                    start=1695772800, end=1695945599, fba_template_ids=["1", "2", "3"]
+                ),
+            )
+
+        self.assertEqual(self.service.cache.buckets, {})
+
+    def fields(self):
+        return dict(start=1695772800, end=1695945599, template_ids=["1", "2"])
+
+
+class TestFormatAnalyticsData(SetUpBaseService):
+    def test_template_names_are_resolved_with_one_query(self):
+        data_points = [
+            dict(template_id=template_id, sent=1, delivered=1, read=0)
+            for template_id in ["831797345020910", "831797345020911"] * 50
+        ]
+
+        with self.assertNumQueries(1):
+            response = self.service.format_analytics_data(
+                {"data": [{"data_points": data_points}]}
+            )
+
+        self.assertEqual(
+            [(data["template"], data["sent"]) for data in response["data"]],
+            [("test_template1", 50), ("test_template2", 50)],
+        )
+        self.assertEqual(response["totals"], {"sent": 100, "delivered": 100, "read": 0})
+
+    def test_empty_analytics(self):
+        response = self.service.format_analytics_data({"data": []})
+
+        self.assertEqual(
+            response, {"data": [], "totals": {"sent": 0, "delivered": 0, "read": 0}}
+        )
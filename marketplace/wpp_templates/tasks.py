@@ -1,56 +1,78 @@
 from celery import shared_task
 import logging
+import time
+
+from contextlib import closing
+from itertools import islice
+from typing import Optional
 
 from django.conf import settings
+from django.db import transaction
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
 from sentry_sdk import capture_exception
 
-from .models import TemplateMessage
+from .analytics.cache import DAY, get_today
+from .analytics.rollup import TemplateMetricsRollup
 from .requests import TemplateMessageRequest
+from .services.facebook import FacebookService
+from .upsert import TemplateUpserter
+from .webhooks.events import apply_template_events
+from .webhooks.queue import pop_template_events, schedule_pending_template_events
 
 from marketplace.applications.models import App
-from marketplace.wpp_templates.models import (
-    TemplateTranslation,
-    TemplateHeader,
-    TemplateButton,
+from marketplace.clients.facebook.client import FacebookClient
+from marketplace.core.types.channels.whatsapp_base.exceptions import (
+    FacebookApiException,
 )
+from marketplace.core.sync.reports import SyncReport
+from marketplace.core.sync.sharding import SyncSharding
+from marketplace.wpp_templates.models import TemplateMessage, TemplateTranslation
 
 logger = logging.getLogger(__name__)
 
 
-def delete_unexistent_translations(app, templates):
-    templates_message = app.template.all()
-    templates_ids = [item["id"] for item in templates["data"]]
+TEMPLATES_REFRESHED_AT_KEY = "wpp-templates-refreshed-at"
 
-    for template in templates_message:
-        try:
-            template_translation = TemplateTranslation.objects.filter(template=template)
-            if not template_translation:
-                print(f"Removing template without translation: {template}")
-                template.delete()
-                continue
-
-            for translation in template_translation:
-                if translation.message_template_id not in templates_ids:
-                    print(
-                        f"Removing translation {translation.message_template_id}: {translation}"
-                    )
-                    translation.delete()
-
-            if template.translations.all().count() == 0:
-                print(f"Removing template after removing translations: {template}")
-                template.delete()
-
-        except Exception as e:
-            logger.error(
-                f"An error occurred 'on delete_unexistent_translations()': {e}"
-            )
-            continue
+
+def delete_unexistent_translations(app, templates_ids: set) -> dict:
+    """
+    Removes the translations of the app missing from the ids listed by Meta and
+    then the templates left without translations, returns how many of each
+    """
+    with transaction.atomic():
+        _, translations = (
+            TemplateTranslation.objects.filter(template__app=app)
+            .exclude(message_template_id__in=templates_ids)
+            .delete()
+        )
+        _, templates = TemplateMessage.objects.filter(
+            app=app, translations__isnull=True
+        ).delete()
+
+    # The totals of `delete` also count the cascaded headers and buttons
+    return dict(
+        translations=translations.get(TemplateTranslation._meta.label, 0),
+        templates=templates.get(TemplateMessage._meta.label, 0),
+    )
 
 
 @shared_task(track_started=True, name="refresh_whatsapp_templates_from_facebook")
-def refresh_whatsapp_templates_from_facebook():
-    for app in App.objects.filter(code__in=["wpp", "wpp-cloud"]):
+def refresh_whatsapp_templates_from_facebook(app_ids: list = None):
+    apps, sharded = SyncSharding.from_settings(
+        "refresh_whatsapp_templates_from_facebook",
+        shard_size=1,
+        max_parallel_shards=settings.WHATSAPP_TEMPLATES_REFRESH_CONCURRENCY,
+        time_limit=settings.WHATSAPP_TEMPLATES_REFRESH_APP_TIMEOUT,
+    ).shard(App.objects.filter(code__in=["wpp", "wpp-cloud"]), app_ids)
+    if sharded is not None:
+        return sharded
+
+    report = SyncReport(name="refresh_whatsapp_templates_from_facebook")
+
+    for app in apps:
         if not (app.config.get("wa_waba_id") or app.config.get("waba")):
+            report.add_skipped()
             continue
 
         waba_id = (
@@ -64,85 +86,129 @@ def refresh_whatsapp_templates_from_facebook():
             acess_token = settings.WHATSAPP_SYSTEM_USER_ACCESS_TOKEN
 
         template_message_request = TemplateMessageRequest(access_token=acess_token)
-        templates = template_message_request.list_template_messages(waba_id)
+        templates_ids = set()
 
-        if templates.get("error"):
+        try:
+            templates = template_message_request.iter_template_messages(
+                waba_id, prefetch=True
+            )
+            upserter = TemplateUpserter(app)
+
+            while True:
+                page = list(islice(templates, upserter.batch_size))
+                if not page:
+                    break
+
+                templates_ids.update(template.get("id") for template in page)
+                upserter.add_many(page)
+                upserter.commit()
+
+            # Only a complete listing tells which templates were removed on Meta
+            deleted = delete_unexistent_translations(app, templates_ids)
+
+        except FacebookApiException as error:
             logger.error(
-                f"A error occurred with waba_id: {waba_id}. \nThe error was:  {templates}\n"
+                f"A error occurred with waba_id: {waba_id}. \nThe error was:  {error}\n"
             )
+            report.add_failed(str(app.uuid), error)
+            continue
+
+        except Exception as error:
+            capture_exception(error)
+            report.add_failed(str(app.uuid), error)
             continue
 
-        if waba_id:
-            delete_unexistent_translations(app, templates)
-
-        for template in templates.get("data", []):
-            try:
-                translation = TemplateTranslation.objects.filter(
-                    message_template_id=template.get("id")
-                )
-                if translation:
-                    translation = translation.last()
-                    found_template = translation.template
-                else:
-                    found_template, _created = TemplateMessage.objects.get_or_create(
-                        app=app,
-                        name=template.get("name"),
-                    )
-
-                found_template.category = template.get("category")
-                found_template.save()
-
-                body = ""
-                footer = ""
-                for translation in template.get("components"):
-                    if translation.get("type") == "BODY":
-                        body = translation.get("text", "")
-
-                    if translation.get("type") == "FOOTER":
-                        footer = translation.get("text", "")
-
-                (
-                    returned_translation,
-                    _created,
-                ) = TemplateTranslation.objects.get_or_create(
-                    template=found_template,
-                    language=template.get("language"),
-                )
-                returned_translation.body = body
-                returned_translation.footer = footer
-                returned_translation.status = template.get("status")
-                returned_translation.variable_count = 0
-                returned_translation.message_template_id = template.get("id")
-                returned_translation.save()
-
-                for translation in template.get("components"):
-                    if translation.get("type") == "HEADER":
-                        (
-                            returned_header,
-                            _created,
-                        ) = TemplateHeader.objects.get_or_create(
-                            translation=returned_translation,
-                            header_type=translation.get("format"),
-                        )
-                        returned_header.text = translation.get("text", {})
-                        returned_header.example = translation.get("example", {}).get(
-                            "header_handle"
-                        )
-                        returned_header.save()
-
-                    if translation.get("type") == "BUTTONS":
-                        for button in translation.get("buttons"):
-                            (
-                                _returned_button,
-                                _created,
-                            ) = TemplateButton.objects.get_or_create(
-                                translation=returned_translation,
-                                button_type=button.get("type"),
-                                text=button.get("text"),
-                                url=button.get("url"),
-                                phone_number=button.get("phone_number"),
-                            )
-
-            except Exception as error:
-                capture_exception(error)
-                continue
+        report.add_deleted(deleted["translations"] + deleted["templates"])
+
+        report.add_synced()
+        record_time_to_fresh(app)
+
+    logger.info(str(report.finish()))
+    return report.as_dict()
+
+
+def record_time_to_fresh(app) -> Optional[float]:
+    """
+    Stores when the templates of the app were refreshed in a redis hash read by
+    the dashboards and logs how long they waited since the previous refresh
+    """
+    now = time.time()
+
+    try:
+        redis = get_redis_connection()
+        previous = redis.hget(TEMPLATES_REFRESHED_AT_KEY, str(app.uuid))
+        redis.hset(TEMPLATES_REFRESHED_AT_KEY, str(app.uuid), now)
+    except RedisError as error:
+        logger.warning(f"Could not record the templates refresh of {app.uuid}: {error}")
+        return None
+
+    if previous is None:
+        return None
+
+    time_to_fresh = now - float(previous)
+    logger.info(
+        f"templates_time_to_fresh app={app.uuid} seconds={round(time_to_fresh)}"
+    )
+    return time_to_fresh
+
+
+@shared_task(name="apply_template_webhook_events")
+def apply_template_webhook_events(events: list = None) -> int:
+    """
+    Applies the events received by the webhook, the buffered ones when called
+    without events, and returns how many translation updates were written
+    """
+    if events is not None:
+        return apply_template_events(events)
+
+    updated = 0
+    # Closing releases the drain lease even when a batch fails
+    with closing(pop_template_events()) as batches:
+        for batch in batches:
+            updated += apply_template_events(batch)
+
+    if schedule_pending_template_events():
+        apply_template_webhook_events.apply_async(
+            countdown=settings.WHATSAPP_TEMPLATES_WEBHOOK_BATCH_DELAY
+        )
+
+    logger.info(f"Applied {updated} template updates from the webhook")
+    return updated
+
+
+@shared_task(track_started=True, name="rollup_template_analytics")
+def rollup_template_analytics(app_ids: list = None, days: int = None):
+    """
+    Rolls up the analytics of the closed days among the last `days`, the nightly
+    run looks a few days back to fill the gaps left by failed runs and a larger
+    `days` backfills the history
+    """
+    days = days or settings.WHATSAPP_TEMPLATES_ANALYTICS_ROLLUP_DAYS
+    today = get_today()
+
+    apps = App.objects.filter(code__in=["wpp", "wpp-cloud"])
+    if app_ids:
+        apps = apps.filter(pk__in=app_ids)
+
+    rollup = TemplateMetricsRollup(FacebookService(FacebookClient()))
+    report = SyncReport(name="rollup_template_analytics")
+
+    for app in apps:
+        if not app.config.get("wa_waba_id"):
+            report.add_skipped()
+            continue
+
+        try:
+            created = rollup.roll_up(app, today - days * DAY, today - 1)
+        except Exception as error:
+            capture_exception(error)
+            report.add_failed(str(app.uuid), error)
+            continue
+
+        if created:
+            report.add_synced()
+        else:
+            report.add_unchanged()
+
+    logger.info(str(report.finish()))
+    return report.as_dict()
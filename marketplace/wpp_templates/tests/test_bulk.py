@@ -0,0 +1,187 @@
+import uuid
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+
+from marketplace.applications.models import App
+from marketplace.core.tests.base import APIBaseTestCase
+from marketplace.core.types.channels.whatsapp_base.exceptions import (
+    FacebookApiException,
+)
+from marketplace.wpp_templates.models import (
+    TemplateButton,
+    TemplateHeader,
+    TemplateMessage,
+    TemplateTranslation,
+)
+from marketplace.wpp_templates.views import TemplateMessageViewSet
+
+
+User = get_user_model()
+
+
+def _translation(language: str) -> dict:
+    return dict(
+        language=language,
+        body=dict(type="BODY", text=f"Hello {language}"),
+        header=dict(header_type="TEXT", text="Weni"),
+        buttons=[dict(button_type="QUICK_REPLY", text="Yes")],
+    )
+
+
+def _create_template_message(waba_id, name, category, components, language):
+    if language == "es":
+        raise FacebookApiException(dict(error=dict(message="Invalid language")))
+
+    return dict(id=f"{name}-{language}")
+
+
+@patch(
+    "marketplace.wpp_templates.requests.TemplateMessageRequest.create_template_message",
+    side_effect=_create_template_message,
+)
+class BulkTemplateCreationTestCase(APIBaseTestCase):
+    view_class = TemplateMessageViewSet
+
+    def setUp(self):
+        self.app = App.objects.create(
+            config=dict(wa_waba_id="432321321"),
+            project_uuid=uuid.uuid4(),
+            platform=App.PLATFORM_WENI_FLOWS,
+            code="wpp-cloud",
+            created_by=User.objects.get_admin_user(),
+        )
+        self.url = reverse("app-template-bulk", kwargs={"app_uuid": self.app.uuid})
+        super().setUp()
+
+    @property
+    def view(self):
+        return self.view_class.as_view(dict(post="bulk"))
+
+    def _post(self, templates: list):
+        return self.request.post(
+            self.url, body=dict(templates=templates), app_uuid=str(self.app.uuid)
+        )
+
+    def test_every_translation_has_its_own_status(self, create_mock):
+        response = self._post(
+            [
+                dict(
+                    name="welcome",
+                    category="MARKETING",
+                    translations=[_translation("pt_BR"), _translation("es")],
+                ),
+                dict(
+                    name="bye",
+                    category="UTILITY",
+                    translations=[_translation("en")],
+                ),
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (result["name"], result["language"], result["status"])
+                for result in response.json["results"]
+            ],
+            [
+                ("welcome", "pt_BR", "created"),
+                ("welcome", "es", "failed"),
+                ("bye", "en", "created"),
+            ],
+        )
+        self.assertEqual(
+            response.json["results"][1]["error"],
+            dict(error=dict(message="Invalid language")),
+        )
+        self.assertEqual(create_mock.call_count, 3)
+
+        translation = TemplateTranslation.objects.get(
+            message_template_id="welcome-pt_BR"
+        )
+        self.assertEqual(translation.template.category, "MARKETING")
+        self.assertEqual(translation.body, "Hello pt_BR")
+        self.assertEqual(translation.status, "PENDING")
+        self.assertEqual(TemplateTranslation.objects.count(), 2)
+        self.assertEqual(TemplateHeader.objects.count(), 2)
+        self.assertEqual(TemplateButton.objects.count(), 2)
+
+    def test_existing_template_receives_the_translations(self, create_mock):
+        template = TemplateMessage.objects.create(
+            app=self.app, name="welcome", category="MARKETING"
+        )
+
+        self._post(
+            [
+                dict(
+                    name="welcome",
+                    category="MARKETING",
+                    translations=[_translation("pt_BR"), _translation("en")],
+                )
+            ]
+        )
+
+        self.assertEqual(TemplateMessage.objects.count(), 1)
+        self.assertEqual(template.translations.count(), 2)
+
+    def test_translations_that_cannot_be_stored_keep_their_meta_id(self, create_mock):
+        # A row already holds the id Meta gives to the second translation
+        TemplateTranslation.objects.create(
+            template=TemplateMessage.objects.create(app=self.app, name="old"),
+            message_template_id="bye-en",
+        )
+
+        response = self._post(
+            [
+                dict(
+                    name="welcome",
+                    category="MARKETING",
+                    translations=[_translation("pt_BR")],
+                ),
+                dict(
+                    name="bye",
+                    category="UTILITY",
+                    translations=[_translation("en")],
+                ),
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (result["status"], result["message_template_id"])
+                for result in response.json["results"]
+            ],
+            [("created", "welcome-pt_BR"), ("not_stored", "bye-en")],
+        )
+        self.assertTrue(
+            TemplateTranslation.objects.filter(
+                message_template_id="welcome-pt_BR"
+            ).exists()
+        )
+        self.assertFalse(TemplateMessage.objects.filter(name="bye").exists())
+
+    def test_nothing_is_submitted_when_any_item_is_invalid(self, create_mock):
+        response = self._post(
+            [
+                dict(
+                    name="welcome",
+                    category="MARKETING",
+                    translations=[_translation("pt_BR")],
+                ),
+                dict(
+                    name="Invalid Name",
+                    category="MARKETING",
+                    translations=[_translation("pt_BR"), _translation("pt_BR")],
+                ),
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", response.json["templates"][1])
+        create_mock.assert_not_called()
+        self.assertFalse(TemplateMessage.objects.exists())
@@ -0,0 +1,131 @@
+import base64
+import io
+import os
+
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from requests.exceptions import ConnectionError
+
+from marketplace.core.tests.base import FakeRequestsResponse
+from marketplace.core.types.channels.whatsapp_base.exceptions import (
+    FacebookApiException,
+)
+from marketplace.wpp_templates.media import (
+    HeaderMediaUploader,
+    MediaStream,
+    decode_base64,
+    parse_data_uri,
+)
+
+
+def _response(data: dict, status_code: int = 200) -> FakeRequestsResponse:
+    response = FakeRequestsResponse(data)
+    response.status_code = status_code
+    return response
+
+
+class DecodeBase64TestCase(SimpleTestCase):
+    def test_data_uri_is_split_into_type_and_payload(self):
+        self.assertEqual(
+            parse_data_uri("data:video/mp4;base64,AAAA"), ("video/mp4", "AAAA")
+        )
+
+    def test_other_values_are_rejected(self):
+        with self.assertRaises(ValueError):
+            parse_data_uri("https://weni.ai/video.mp4")
+
+    def test_payload_is_decoded_slice_by_slice(self):
+        content = os.urandom(200 * 1024)
+
+        with decode_base64(
+            base64.b64encode(content).decode(), spool_size=1024
+        ) as media:
+            # Larger than the spool size, so it was moved to the disk
+            self.assertTrue(media._rolled)
+            media.seek(0)
+            self.assertEqual(media.read(), content)
+
+    def test_stream_reads_from_the_offset(self):
+        stream = MediaStream(io.BytesIO(b"0123456789"), 4, 10)
+
+        self.assertEqual(len(stream), 6)
+        self.assertEqual(b"".join(stream), b"456789")
+
+
+@override_settings(WHATSAPP_VERSION="v16.0")
+@patch(
+    "marketplace.wpp_templates.media.PhotoAPIRequest.create_upload_session",
+    return_value="upload:123",
+)
+@patch("marketplace.wpp_templates.media.graph_request")
+class HeaderMediaUploaderTestCase(SimpleTestCase):
+    content = b"video content"
+
+    def setUp(self):
+        self.uploader = HeaderMediaUploader("432321321", "token", max_attempts=3)
+        self.data_uri = (
+            f"data:video/mp4;base64,{base64.b64encode(self.content).decode()}"
+        )
+
+    def test_file_is_sent_from_the_start(self, graph_request_mock, session_mock):
+        sent = []
+
+        def graph_request(method, url, **kwargs):
+            sent.append(
+                (url, kwargs["headers"]["file_offset"], b"".join(kwargs["data"]))
+            )
+            return _response(dict(h="handle"))
+
+        graph_request_mock.side_effect = graph_request
+
+        self.assertEqual(self.uploader.upload(self.data_uri), "handle")
+
+        session_mock.assert_called_once_with(
+            "token", len(self.content), file_type="video/mp4"
+        )
+        self.assertEqual(
+            sent, [("https://graph.facebook.com/v16.0/upload:123", "0", self.content)]
+        )
+
+    def test_interrupted_upload_resumes_from_the_acknowledged_offset(
+        self, graph_request_mock, session_mock
+    ):
+        sent = []
+
+        def graph_request(method, url, **kwargs):
+            if method == "GET":
+                return _response(dict(id="upload:123", file_offset=6))
+
+            sent.append((kwargs["headers"]["file_offset"], b"".join(kwargs["data"])))
+            if len(sent) == 1:
+                raise ConnectionError()
+            return _response(dict(h="handle"))
+
+        graph_request_mock.side_effect = graph_request
+
+        self.assertEqual(self.uploader.upload(self.data_uri), "handle")
+        self.assertEqual(sent, [("0", self.content), ("6", self.content[6:])])
+
+    def test_server_errors_are_retried(self, graph_request_mock, session_mock):
+        graph_request_mock.side_effect = [
+            _response(dict(error="unavailable"), status_code=503),
+            _response(dict(file_offset=0)),
+            _response(dict(h="handle")),
+        ]
+
+        self.assertEqual(self.uploader.upload(self.data_uri), "handle")
+
+    def test_client_errors_are_not_retried(self, graph_request_mock, session_mock):
+        graph_request_mock.return_value = _response(dict(error="error"), 400)
+
+        with self.assertRaises(FacebookApiException):
+            self.uploader.upload(self.data_uri)
+
+        self.assertEqual(graph_request_mock.call_count, 1)
+
+    def test_last_failure_is_raised(self, graph_request_mock, session_mock):
+        graph_request_mock.side_effect = ConnectionError()
+
+        with self.assertRaises(ConnectionError):
+            self.uploader.upload(self.data_uri)
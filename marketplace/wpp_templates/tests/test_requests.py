@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from marketplace.core.tests.base import FakeRequestsResponse
+from marketplace.core.types.channels.whatsapp_base.exceptions import (
+    FacebookApiException,
+)
+from marketplace.wpp_templates.requests import TEMPLATE_FIELDS, TemplateMessageRequest
+
+
+def _page(ids: list, next_url: str = None) -> FakeRequestsResponse:
+    content = dict(data=[dict(id=template_id) for template_id in ids])
+    if next_url:
+        content["paging"] = dict(cursors=dict(after="cursor"), next=next_url)
+    return FakeRequestsResponse(content)
+
+
+@patch("marketplace.wpp_templates.requests.graph_request")
+class IterTemplateMessagesTestCase(SimpleTestCase):
+    def setUp(self):
+        self.request = TemplateMessageRequest(access_token="token")
+
+    def test_pages_are_followed_by_cursor(self, graph_request_mock):
+        graph_request_mock.side_effect = [
+            _page(["1", "2"], next_url="https://graph.facebook.com/page-2"),
+            _page(["3"]),
+        ]
+
+        templates = self.request.iter_template_messages("waba", limit=2)
+
+        self.assertEqual([template["id"] for template in templates], ["1", "2", "3"])
+        first_call, second_call = graph_request_mock.call_args_list
+        self.assertEqual(first_call.kwargs["params"]["fields"], TEMPLATE_FIELDS)
+        self.assertEqual(first_call.kwargs["params"]["limit"], 2)
+        self.assertEqual(second_call.args[1], "https://graph.facebook.com/page-2")
+        self.assertIsNone(second_call.kwargs["params"])
+
+    def test_next_page_is_prefetched(self, graph_request_mock):
+        graph_request_mock.side_effect = [
+            _page(["1"], next_url="https://graph.facebook.com/page-2"),
+            _page(["2"], next_url="https://graph.facebook.com/page-3"),
+            _page(["3"]),
+        ]
+
+        templates = self.request.iter_template_messages("waba", prefetch=True)
+
+        self.assertEqual([template["id"] for template in templates], ["1", "2", "3"])
+        self.assertEqual(graph_request_mock.call_count, 3)
+
+    def test_pages_are_requested_lazily(self, graph_request_mock):
+        graph_request_mock.side_effect = [
+            _page(["1"], next_url="https://graph.facebook.com/page-2"),
+            _page(["2"]),
+        ]
+
+        templates = self.request.iter_template_messages("waba")
+
+        self.assertEqual(next(templates)["id"], "1")
+        self.assertEqual(graph_request_mock.call_count, 1)
+
+    def test_failed_page_raises(self, graph_request_mock):
+        error = FakeRequestsResponse(dict(error=dict(message="Invalid token")))
+        error.status_code = 400
+        graph_request_mock.side_effect = [
+            _page(["1"], next_url="https://graph.facebook.com/page-2"),
+            error,
+        ]
+
+        templates = self.request.iter_template_messages("waba")
+
+        self.assertEqual(next(templates)["id"], "1")
+        with self.assertRaises(FacebookApiException):
+            next(templates)
+
+    def test_list_template_messages_returns_every_page(self, graph_request_mock):
+        graph_request_mock.side_effect = [
+            _page(["1"], next_url="https://graph.facebook.com/page-2"),
+            _page(["2"]),
+        ]
+
+        templates = self.request.list_template_messages("waba")
+
+        self.assertEqual(templates, dict(data=[dict(id="1"), dict(id="2")]))
@@ -0,0 +1,61 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from marketplace.applications.models import App
+from marketplace.wpp_templates.models import TemplateMessage, TemplateTranslation
+from marketplace.wpp_templates.search import (
+    SEARCH_PREFIX,
+    order_by_relevance,
+    search_templates,
+)
+
+
+User = get_user_model()
+
+
+class SearchTemplatesTestCase(TestCase):
+    def setUp(self):
+        self.app = App.objects.create(
+            config=dict(wa_waba_id="432321321"),
+            project_uuid=uuid.uuid4(),
+            platform=App.PLATFORM_WENI_FLOWS,
+            code="wpp-cloud",
+            created_by=User.objects.get_admin_user(),
+        )
+        for name, bodies in [
+            ("order_shipped", ["Your order has shipped", "Seu pedido foi enviado"]),
+            ("shipping_delay", ["We are sorry for the delay"]),
+            ("welcome", ["Welcome, we SHIP worldwide"]),
+        ]:
+            template = TemplateMessage.objects.create(app=self.app, name=name)
+            for body in bodies:
+                TemplateTranslation.objects.create(template=template, body=body)
+
+        self.queryset = TemplateMessage.objects.filter(app=self.app)
+
+    def _names(self, queryset) -> list:
+        return sorted(queryset.values_list("name", flat=True))
+
+    def test_substring_of_the_name_or_body(self):
+        templates = search_templates(self.queryset, "SHIP")
+
+        self.assertEqual(
+            self._names(templates), ["order_shipped", "shipping_delay", "welcome"]
+        )
+
+    def test_prefix_of_the_name_or_body(self):
+        templates = search_templates(self.queryset, "ship", SEARCH_PREFIX)
+
+        self.assertEqual(self._names(templates), ["shipping_delay"])
+
+    def test_template_is_listed_once_when_many_translations_match(self):
+        templates = search_templates(self.queryset, "o")
+
+        self.assertEqual(templates.count(), 3)
+
+    def test_names_starting_with_the_term_come_first(self):
+        templates = order_by_relevance(search_templates(self.queryset, "ship"), "ship")
+
+        self.assertEqual(templates.first().name, "shipping_delay")
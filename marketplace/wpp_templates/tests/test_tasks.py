@@ -0,0 +1,173 @@
+import uuid
+
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from redis.exceptions import ConnectionError
+
+from marketplace.applications.models import App
+from marketplace.core.types.channels.whatsapp_base.exceptions import (
+    FacebookApiException,
+)
+from marketplace.wpp_templates.models import TemplateMessage, TemplateTranslation
+from marketplace.wpp_templates.tasks import (
+    TEMPLATES_REFRESHED_AT_KEY,
+    delete_unexistent_translations,
+    record_time_to_fresh,
+    refresh_whatsapp_templates_from_facebook,
+)
+
+
+User = get_user_model()
+
+
+@patch("marketplace.wpp_templates.tasks.get_redis_connection")
+@patch("marketplace.wpp_templates.tasks.TemplateMessageRequest")
+class RefreshWhatsappTemplatesTaskTestCase(TestCase):
+    def setUp(self):
+        self.app = App.objects.create(
+            config=dict(wa_waba_id="432321321"),
+            project_uuid=uuid.uuid4(),
+            platform=App.PLATFORM_WENI_FLOWS,
+            code="wpp-cloud",
+            created_by=User.objects.get_admin_user(),
+        )
+        self.template = dict(
+            id="1234",
+            name="welcome",
+            category="MARKETING",
+            language="pt_BR",
+            status="APPROVED",
+            components=[
+                dict(type="BODY", text="Hello {{1}}"),
+                dict(type="FOOTER", text="Weni"),
+            ],
+        )
+
+    def test_app_templates_are_refreshed(self, request_mock, redis_mock):
+        request_mock.return_value.iter_template_messages.return_value = iter(
+            [self.template]
+        )
+        redis_mock.return_value.hget.return_value = None
+
+        report = refresh_whatsapp_templates_from_facebook(app_ids=[self.app.pk])
+
+        self.assertEqual(report["synced"], 1)
+        translation = TemplateTranslation.objects.get(message_template_id="1234")
+        self.assertEqual(translation.body, "Hello {{1}}")
+        self.assertEqual(translation.footer, "Weni")
+        self.assertEqual(translation.template.app, self.app)
+        redis_mock.return_value.hset.assert_called_once()
+
+    def test_templates_error_is_reported(self, request_mock, redis_mock):
+        template = TemplateMessage.objects.create(
+            app=self.app, name="old", created_by=User.objects.get_admin_user()
+        )
+        TemplateTranslation.objects.create(
+            template=template, language="pt_BR", message_template_id="1"
+        )
+        request_mock.return_value.iter_template_messages.side_effect = (
+            FacebookApiException(dict(error=dict(message="Invalid token")))
+        )
+
+        report = refresh_whatsapp_templates_from_facebook(app_ids=[self.app.pk])
+
+        self.assertEqual(report["failed"], 1)
+        self.assertTrue(TemplateMessage.objects.filter(pk=template.pk).exists())
+        redis_mock.return_value.hset.assert_not_called()
+
+    def test_templates_removed_on_meta_are_deleted(self, request_mock, redis_mock):
+        template = TemplateMessage.objects.create(
+            app=self.app, name="old", created_by=User.objects.get_admin_user()
+        )
+        TemplateTranslation.objects.create(
+            template=template, language="pt_BR", message_template_id="1"
+        )
+        request_mock.return_value.iter_template_messages.return_value = iter(
+            [self.template]
+        )
+
+        report = refresh_whatsapp_templates_from_facebook(app_ids=[self.app.pk])
+
+        self.assertEqual(report["deleted"], 2)
+        self.assertFalse(TemplateMessage.objects.filter(pk=template.pk).exists())
+        self.assertTrue(TemplateTranslation.objects.filter(message_template_id="1234"))
+
+
+class DeleteUnexistentTranslationsTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.get_admin_user()
+        self.app, self.other_app = [
+            App.objects.create(
+                config=dict(wa_waba_id="432321321"),
+                project_uuid=uuid.uuid4(),
+                platform=App.PLATFORM_WENI_FLOWS,
+                code="wpp-cloud",
+                created_by=user,
+            )
+            for _ in range(2)
+        ]
+
+        self.kept = TemplateMessage.objects.create(app=self.app, name="kept")
+        self.removed = TemplateMessage.objects.create(app=self.app, name="removed")
+        self.empty = TemplateMessage.objects.create(app=self.app, name="empty")
+        self.other = TemplateMessage.objects.create(app=self.other_app, name="other")
+
+        for template, message_template_id in [
+            (self.kept, "1"),
+            (self.kept, "2"),
+            (self.removed, "3"),
+            (self.other, "4"),
+        ]:
+            TemplateTranslation.objects.create(
+                template=template, message_template_id=message_template_id
+            )
+
+    def test_missing_translations_and_empty_templates_are_removed(self):
+        deleted = delete_unexistent_translations(self.app, {"1"})
+
+        self.assertEqual(deleted, dict(translations=2, templates=2))
+        self.assertEqual(
+            set(
+                TemplateTranslation.objects.values_list(
+                    "message_template_id", flat=True
+                )
+            ),
+            {"1", "4"},
+        )
+        self.assertEqual(
+            set(TemplateMessage.objects.values_list("name", flat=True)),
+            {"kept", "other"},
+        )
+
+    def test_queries_do_not_grow_with_the_templates(self):
+        # The translations are collected once and deleted with their headers and
+        # buttons, then the empty templates, all inside one savepoint
+        with self.assertNumQueries(9):
+            delete_unexistent_translations(self.app, set())
+
+
+@patch("marketplace.wpp_templates.tasks.time.time", return_value=1000.0)
+@patch("marketplace.wpp_templates.tasks.get_redis_connection")
+class RecordTimeToFreshTestCase(TestCase):
+    def setUp(self):
+        self.app = MagicMock(uuid=uuid.uuid4())
+
+    def test_time_since_the_previous_refresh(self, redis_mock, time_mock):
+        redis_mock.return_value.hget.return_value = b"400.0"
+
+        self.assertEqual(record_time_to_fresh(self.app), 600.0)
+        redis_mock.return_value.hset.assert_called_once_with(
+            TEMPLATES_REFRESHED_AT_KEY, str(self.app.uuid), 1000.0
+        )
+
+    def test_first_refresh_has_no_time_to_fresh(self, redis_mock, time_mock):
+        redis_mock.return_value.hget.return_value = None
+
+        self.assertIsNone(record_time_to_fresh(self.app))
+
+    def test_redis_errors_do_not_fail_the_refresh(self, redis_mock, time_mock):
+        redis_mock.return_value.hget.side_effect = ConnectionError()
+
+        self.assertIsNone(record_time_to_fresh(self.app))
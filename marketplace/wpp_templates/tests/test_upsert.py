@@ -0,0 +1,143 @@
+import uuid
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from marketplace.applications.models import App
+from marketplace.wpp_templates.models import (
+    TemplateButton,
+    TemplateHeader,
+    TemplateMessage,
+    TemplateTranslation,
+)
+from marketplace.wpp_templates.upsert import TemplateUpserter
+
+
+User = get_user_model()
+
+
+def _template(template_id: str, name: str, body: str = "Hello {{1}}") -> dict:
+    return dict(
+        id=template_id,
+        name=name,
+        category="MARKETING",
+        language="pt_BR",
+        status="APPROVED",
+        components=[
+            dict(type="HEADER", format="IMAGE", example=dict(header_handle=["h"])),
+            dict(type="BODY", text=body),
+            dict(type="FOOTER", text="Weni"),
+            dict(
+                type="BUTTONS",
+                buttons=[
+                    dict(type="QUICK_REPLY", text="Yes"),
+                    dict(type="URL", text="Site", url="https://weni.ai"),
+                ],
+            ),
+        ],
+    )
+
+
+class TemplateUpserterTestCase(TestCase):
+    def setUp(self):
+        self.app = self._create_app()
+
+    def _create_app(self) -> App:
+        return App.objects.create(
+            config=dict(wa_waba_id="432321321"),
+            project_uuid=uuid.uuid4(),
+            platform=App.PLATFORM_WENI_FLOWS,
+            code="wpp-cloud",
+            created_by=User.objects.get_admin_user(),
+        )
+
+    def _upsert(self, templates: list) -> dict:
+        upserter = TemplateUpserter(self.app)
+        upserter.add_many(templates)
+        return upserter.commit()
+
+    def test_new_templates_are_created(self):
+        counts = self._upsert([_template("1", "welcome"), _template("2", "bye")])
+
+        self.assertEqual(counts["templatemessage"], dict(created=2, updated=0))
+        self.assertEqual(counts["templatebutton"], dict(created=4, updated=0))
+        translation = TemplateTranslation.objects.get(message_template_id="1")
+        self.assertEqual(translation.template.app, self.app)
+        self.assertEqual(translation.template.category, "MARKETING")
+        self.assertEqual(translation.body, "Hello {{1}}")
+        self.assertEqual(translation.footer, "Weni")
+        self.assertEqual(translation.headers.get().header_type, "IMAGE")
+        self.assertEqual(translation.buttons.count(), 2)
+
+    def test_existing_templates_are_updated(self):
+        self._upsert([_template("1", "welcome")])
+
+        counts = self._upsert([_template("1", "welcome", body="Hi {{1}}")])
+
+        self.assertEqual(counts["templatemessage"], dict(created=0, updated=0))
+        self.assertEqual(counts["templatetranslation"], dict(created=0, updated=1))
+        self.assertEqual(counts["templateheader"], dict(created=0, updated=0))
+        self.assertEqual(counts["templatebutton"], dict(created=0, updated=0))
+        self.assertEqual(TemplateTranslation.objects.get().body, "Hi {{1}}")
+        self.assertEqual(TemplateButton.objects.count(), 2)
+        self.assertEqual(TemplateHeader.objects.count(), 1)
+
+    def test_queries_do_not_grow_with_the_templates(self):
+        with CaptureQueriesContext(connection) as one_template:
+            self._upsert([_template("1", "welcome")])
+
+        templates = [_template(str(index), f"name_{index}") for index in range(2, 50)]
+        with CaptureQueriesContext(connection) as many_templates:
+            self._upsert(templates)
+
+        self.assertEqual(len(one_template), len(many_templates))
+        self.assertEqual(TemplateMessage.objects.count(), 49)
+
+    def test_templates_of_another_app_are_skipped(self):
+        other_app = self.app
+        self._upsert([_template("1", "welcome")])
+        self.app = self._create_app()
+
+        counts = self._upsert([_template("1", "welcome"), _template("2", "bye")])
+
+        self.assertEqual(counts["templatemessage"], dict(created=1, updated=0))
+        translation = TemplateTranslation.objects.get(message_template_id="1")
+        self.assertEqual(translation.template.app, other_app)
+
+    @patch("marketplace.wpp_templates.upsert.capture_exception")
+    def test_invalid_template_does_not_stop_the_page(self, capture_mock):
+        invalid = _template("1", "welcome")
+        invalid["components"][2]["text"] = "f" * 61
+
+        self._upsert([invalid, _template("2", "bye")])
+
+        capture_mock.assert_called_once()
+        self.assertFalse(TemplateMessage.objects.filter(name="welcome").exists())
+        self.assertTrue(TemplateMessage.objects.filter(name="bye").exists())
+
+    @patch("marketplace.wpp_templates.upsert.capture_exception")
+    def test_constraint_error_only_leaves_out_its_template(self, capture_mock):
+        # Meta lists the same id under two languages, the second translation
+        # breaks the unique message_template_id
+        duplicated = dict(_template("1", "welcome"), language="en_US")
+
+        counts = self._upsert(
+            [_template("1", "welcome"), duplicated, _template("2", "bye")]
+        )
+
+        capture_mock.assert_called_once()
+        self.assertEqual(counts["templatemessage"], dict(created=2, updated=0))
+        self.assertEqual(counts["templatetranslation"], dict(created=2, updated=0))
+        self.assertEqual(
+            sorted(
+                TemplateTranslation.objects.values_list(
+                    "message_template_id", flat=True
+                )
+            ),
+            ["1", "2"],
+        )
+        self.assertEqual(TemplateButton.objects.count(), 4)
@@ -3,17 +3,25 @@ import uuid
 import textwrap
 
 from datetime import datetime
+from urllib.parse import parse_qs, urlparse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 
 from marketplace.applications.models import App
-from marketplace.wpp_templates.models import TemplateMessage, TemplateTranslation
+from marketplace.wpp_templates.models import (
+    TemplateButton,
+    TemplateHeader,
+    TemplateMessage,
+    TemplateTranslation,
+)
 from marketplace.wpp_templates.views import TemplateMessageViewSet
 from marketplace.core.tests.base import APIBaseTestCase
 from marketplace.core.types.channels.whatsapp_base.exceptions import (
@@ -303,7 +311,7 @@ class WhatsappCloudTemplateTranslationsTestCase(APIBaseTestCase):
     def view(self):
         return self.view_class.as_view(dict(post="translations"))
 
-    @patch("marketplace.wpp_templates.serializers.requests")
+    @patch("marketplace.wpp_templates.media.graph_request")
     @patch(
         "marketplace.core.types.channels.whatsapp_cloud.requests.PhotoAPIRequest.create_upload_session"
     )
@@ -311,7 +319,10 @@ class WhatsappCloudTemplateTranslationsTestCase(APIBaseTestCase):
         "marketplace.wpp_templates.requests.TemplateMessageRequest.create_template_message"
     )
     def test_create_template_translation(
-        self, mock_create_template_message, mock_create_upload_session, mock_requests
+        self,
+        mock_create_template_message,
+        mock_create_upload_session,
+        mock_graph_request,
     ):
         # create_template_message
         mock_create_template_message.return_value = {
@@ -325,7 +336,7 @@ class WhatsappCloudTemplateTranslationsTestCase(APIBaseTestCase):
         )
 
         # request
-        mock_post = mock_requests.post
+        mock_post = mock_graph_request
         mock_post.return_value.status_code = status.HTTP_200_OK
         mock_post.return_value.json.return_value = {"h": "upload_handle"}
 
@@ -337,12 +348,12 @@ class WhatsappCloudTemplateTranslationsTestCase(APIBaseTestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-    @patch("marketplace.wpp_templates.serializers.requests")
+    @patch("marketplace.wpp_templates.media.graph_request")
     @patch(
         "marketplace.core.types.channels.whatsapp_cloud.requests.PhotoAPIRequest.create_upload_session"
     )
     def test_create_template_translation_error(
-        self, mock_create_upload_session, mock_requests
+        self, mock_create_upload_session, mock_graph_request
     ):
         # create_upload_session
         mock_create_upload_session.return_value = MagicMock(
@@ -350,7 +361,7 @@ class WhatsappCloudTemplateTranslationsTestCase(APIBaseTestCase):
         )
 
         # request
-        mock_post = mock_requests.post
+        mock_post = mock_graph_request
         mock_post.return_value.status_code = status.HTTP_404_NOT_FOUND
         mock_post.return_value.json.return_value = {"error": "error"}
 
@@ -411,7 +422,7 @@ class WhatsappTemplateTranslationsTestCase(APIBaseTestCase):
     def view(self):
         return self.view_class.as_view(dict(post="translations"))
 
-    @patch("marketplace.wpp_templates.serializers.requests")
+    @patch("marketplace.wpp_templates.media.graph_request")
     @patch(
         "marketplace.core.types.channels.whatsapp_cloud.requests.PhotoAPIRequest.create_upload_session"
     )
@@ -419,7 +430,10 @@ class WhatsappTemplateTranslationsTestCase(APIBaseTestCase):
         "marketplace.wpp_templates.requests.TemplateMessageRequest.create_template_message"
     )
     def test_create_wpp_template_translation(
-        self, mock_create_template_message, mock_create_upload_session, mock_requests
+        self,
+        mock_create_template_message,
+        mock_create_upload_session,
+        mock_graph_request,
     ):
         # create_template_message
         mock_create_template_message.return_value = {
@@ -433,7 +447,7 @@ class WhatsappTemplateTranslationsTestCase(APIBaseTestCase):
         )
 
         # request
-        mock_post = mock_requests.post
+        mock_post = mock_graph_request
         mock_post.return_value.status_code = status.HTTP_200_OK
         mock_post.return_value.json.return_value = {"h": "upload_handle"}
 
@@ -542,7 +556,7 @@ class WhatsappTemplateUpdateTestCase(APIBaseTestCase):
     def view(self):
         return self.view_class.as_view({"patch": "partial_update"})
 
-    @patch("marketplace.wpp_templates.views.requests")
+    @patch("marketplace.wpp_templates.media.graph_request")
     @patch(
         "marketplace.wpp_templates.requests.TemplateMessageRequest.update_template_message"
     )
@@ -550,7 +564,10 @@ class WhatsappTemplateUpdateTestCase(APIBaseTestCase):
         "marketplace.core.types.channels.whatsapp_cloud.requests.PhotoAPIRequest.create_upload_session"
     )
     def test_update_template_translation(
-        self, mock_create_upload_session, mock_update_template_message, mock_requests
+        self,
+        mock_create_upload_session,
+        mock_update_template_message,
+        mock_graph_request,
     ):
         mock_update_template_message.return_value = {"success": True}
 
@@ -558,7 +575,7 @@ class WhatsappTemplateUpdateTestCase(APIBaseTestCase):
             create_upload_session=lambda x: "0123456789"
         )
 
-        mock_post = mock_requests.post
+        mock_post = mock_graph_request
         mock_post.return_value.status_code = status.HTTP_200_OK
         mock_post.return_value.json.return_value = {"h": "upload_handle"}
 
@@ -683,7 +700,7 @@ class WhatsappCloudTemplateUpdateTestCase(APIBaseTestCase):
     def view(self):
         return self.view_class.as_view({"patch": "partial_update"})
 
-    @patch("marketplace.wpp_templates.views.requests")
+    @patch("marketplace.wpp_templates.media.graph_request")
     @patch(
         "marketplace.wpp_templates.requests.TemplateMessageRequest.update_template_message"
     )
@@ -691,7 +708,10 @@ class WhatsappCloudTemplateUpdateTestCase(APIBaseTestCase):
         "marketplace.core.types.channels.whatsapp_cloud.requests.PhotoAPIRequest.create_upload_session"
     )
     def test_update_wpp_cloud_template_translation(
-        self, mock_create_upload_session, mock_update_template_message, mock_requests
+        self,
+        mock_create_upload_session,
+        mock_update_template_message,
+        mock_graph_request,
     ):
         mock_update_template_message.return_value = {"success": True}
 
@@ -699,7 +719,7 @@ class WhatsappCloudTemplateUpdateTestCase(APIBaseTestCase):
             create_upload_session=lambda x: "0123456789"
         )
 
-        mock_post = mock_requests.post
+        mock_post = mock_graph_request
         mock_post.return_value.status_code = status.HTTP_200_OK
         mock_post.return_value.json.return_value = {"h": "upload_handle"}
 
@@ -791,3 +811,159 @@ class TemplateMessageViewSetTestCase(APIBaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         data = response.json()
         self.assertEqual(len(data["results"]), 1)
+
+
+class TemplateMessageListQueriesTestCase(APIBaseTestCase):
+    view_class = TemplateMessageViewSet
+
+    def setUp(self):
+        self.app = App.objects.create(
+            config=dict(wa_waba_id="432321321"),
+            project_uuid=uuid.uuid4(),
+            platform=App.PLATFORM_WENI_FLOWS,
+            code="wpp-cloud",
+            created_by=User.objects.get_admin_user(),
+        )
+        self.url = reverse("app-template-list", kwargs={"app_uuid": str(self.app.uuid)})
+        super().setUp()
+
+    @property
+    def view(self):
+        return self.view_class.as_view(APIBaseTestCase.ACTION_LIST)
+
+    def _create_templates(self, start: int, count: int) -> None:
+        for index in range(start, start + count):
+            template = TemplateMessage.objects.create(
+                name=f"template_{index}", app=self.app, category="MARKETING"
+            )
+            for language in ["pt_BR", "en"]:
+                translation = TemplateTranslation.objects.create(
+                    template=template, language=language, body=f"{language} {index}"
+                )
+                TemplateHeader.objects.create(
+                    translation=translation, header_type="TEXT", text="Hi"
+                )
+                TemplateButton.objects.create(
+                    translation=translation, button_type="QUICK_REPLY", text="Yes"
+                )
+
+    def _list(self) -> tuple:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.request.get(
+                self.url, params=dict(page_size=500), app_uuid=str(self.app.uuid)
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(queries)
+
+    def test_queries_do_not_grow_with_the_page(self):
+        self._create_templates(0, 1)
+        _, one_template = self._list()
+
+        self._create_templates(1, 30)
+        response, many_templates = self._list()
+
+        self.assertEqual(one_template, many_templates)
+        self.assertEqual(len(response.json["results"]), 31)
+
+    def test_listing_keeps_the_first_translation_preview_and_header(self):
+        self._create_templates(0, 1)
+        TemplateMessage.objects.create(name="empty", app=self.app)
+
+        response, _ = self._list()
+
+        empty, template = sorted(
+            response.json["results"], key=lambda item: item["name"]
+        )
+        self.assertNotIn("text_preview", empty)
+        self.assertEqual(template["text_preview"], "pt_BR 0")
+        translation = template["translations"][0]
+        self.assertEqual(translation["header"], dict(header_type="TEXT", text="Hi"))
+        self.assertEqual(translation["buttons"][0]["text"], "Yes")
+
+
+class TemplateMessageCursorPaginationTestCase(APIBaseTestCase):
+    view_class = TemplateMessageViewSet
+
+    def setUp(self):
+        self.app = App.objects.create(
+            config=dict(wa_waba_id="432321321"),
+            project_uuid=uuid.uuid4(),
+            platform=App.PLATFORM_WENI_FLOWS,
+            code="wpp-cloud",
+            created_by=User.objects.get_admin_user(),
+        )
+        created_on = datetime(2023, 10, 1)
+        for index in range(5):
+            # Equal creation dates must not repeat nor skip rows between pages
+            TemplateMessage.objects.create(
+                name=f"template_{4 - index}",
+                app=self.app,
+                category="MARKETING" if index % 2 else "UTILITY",
+                created_on=created_on,
+            )
+        self.url = reverse("app-template-list", kwargs={"app_uuid": str(self.app.uuid)})
+        super().setUp()
+
+    @property
+    def view(self):
+        return self.view_class.as_view(APIBaseTestCase.ACTION_LIST)
+
+    def _walk(self, params: dict) -> list:
+        pages = []
+
+        while params is not None:
+            response = self.request.get(
+                self.url, params=params, app_uuid=str(self.app.uuid)
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.json)
+            pages.append([template["name"] for template in response.json["results"]])
+
+            next_url = response.json["next"]
+            params = next_url and parse_qs(urlparse(next_url).query)
+
+        return pages
+
+    def test_pages_follow_the_composite_key(self):
+        pages = self._walk(dict(pagination="cursor", page_size=2))
+
+        expected = TemplateMessage.objects.order_by("-created_on", "-id")
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(sum(pages, []), list(expected.values_list("name", flat=True)))
+
+    def test_sort_and_filters_are_kept(self):
+        pages = self._walk(
+            dict(pagination="cursor", page_size=1, sort="name", category="UTILITY")
+        )
+
+        self.assertEqual(pages, [["template_0"], ["template_2"], ["template_4"]])
+
+    def test_search_is_combined_with_the_filters(self):
+        template = TemplateMessage.objects.get(name="template_1")
+        TemplateTranslation.objects.create(template=template, body="Order shipped")
+
+        response = self.request.get(
+            self.url,
+            params=dict(search="shipped", category="MARKETING", sort="relevance"),
+            app_uuid=str(self.app.uuid),
+        )
+
+        self.assertEqual(
+            [item["name"] for item in response.json["results"]], ["template_1"]
+        )
+
+    def test_relevance_is_rejected_with_the_cursor_pagination(self):
+        response = self.request.get(
+            self.url,
+            params=dict(search="template", sort="relevance", pagination="cursor"),
+            app_uuid=str(self.app.uuid),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("sort", response.json)
+
+    def test_page_number_mode_is_the_default(self):
+        response = self.request.get(self.url, app_uuid=str(self.app.uuid))
+
+        self.assertEqual(response.json["count"], 5)
@@ -0,0 +1,336 @@
+"""
+Bulk upsert of the templates listed by Meta for an app.
+
+The templates, translations, headers and buttons of the app are preloaded once
+and every listed template is applied to them in memory. `commit` writes the
+collected rows with one `bulk_create` and one `bulk_update` per model, so a
+page of templates costs a handful of queries instead of dozens per template.
+When the page breaks a constraint its templates are written one by one instead,
+so only the offending ones are left out.
+"""
+
+import logging
+
+from typing import Iterable
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from sentry_sdk import capture_exception
+
+from marketplace.applications.models import App
+from .models import TemplateButton, TemplateHeader, TemplateMessage, TemplateTranslation
+
+
+logger = logging.getLogger(__name__)
+
+
+def assign_pks(model, instances: Iterable) -> None:
+    """
+    Backends that do not return the ids of a bulk insert get them back through
+    the `uuid` every model is created with
+    """
+    missing = {str(instance.uuid): instance for instance in instances}
+    missing = {uuid: item for uuid, item in missing.items() if item.pk is None}
+    if not missing:
+        return
+
+    for uuid, pk in model.objects.filter(uuid__in=missing).values_list("uuid", "pk"):
+        missing[str(uuid)].pk = pk
+
+
+class TemplateUpserter(object):
+    TRANSLATION_FIELDS = [
+        "body",
+        "footer",
+        "status",
+        "variable_count",
+        "message_template_id",
+    ]
+    HEADER_FIELDS = ["text", "example"]
+    BUTTON_FIELDS = ["button_type", "text", "url", "phone_number"]
+
+    def __init__(self, app: App, batch_size: int = None) -> None:
+        self.app = app
+        self.batch_size = batch_size or settings.WHATSAPP_SYNC_DB_CHUNK_SIZE
+
+        self._load()
+
+    @property
+    def _models(self) -> list:
+        return [TemplateMessage, TemplateTranslation, TemplateHeader, TemplateButton]
+
+    def _load(self) -> None:
+        self._templates = {}
+        self._translations = {}
+        self._translations_by_id = {}
+        self._headers = {}
+        self._buttons = set()
+
+        self._added = []
+        self._to_create = {model: [] for model in self._models}
+        self._to_update = {model: {} for model in self._models}
+
+        templates = {}
+        translations = {}
+
+        for template in TemplateMessage.objects.filter(app=self.app):
+            templates[template.pk] = template
+            self._templates[template.name] = template
+
+        for translation in TemplateTranslation.objects.filter(template__app=self.app):
+            # Shares the preloaded template instead of querying it on access
+            translation.template = templates[translation.template_id]
+            translations[translation.pk] = translation
+            self._index_translation(translation)
+
+        for header in TemplateHeader.objects.filter(
+            translation__template__app=self.app
+        ):
+            translation = translations[header.translation_id]
+            self._headers[(translation.uuid, header.header_type)] = header
+
+        buttons = TemplateButton.objects.filter(translation__template__app=self.app)
+        for button in buttons.values_list("translation_id", *self.BUTTON_FIELDS):
+            translation_id, *values = button
+            self._buttons.add((translations[translation_id].uuid, *values))
+
+    def _index_translation(self, translation: TemplateTranslation) -> None:
+        key = (translation.template.uuid, translation.language)
+        self._translations[key] = translation
+
+        if translation.message_template_id:
+            self._translations_by_id[translation.message_template_id] = translation
+
+    def add_many(self, templates: list) -> None:
+        """
+        Applies a page of templates, the ones whose translation belongs to another
+        app are left untouched and the invalid ones are reported to sentry
+        """
+        foreign_ids = set(
+            TemplateTranslation.objects.filter(
+                message_template_id__in=[template.get("id") for template in templates]
+            )
+            .exclude(template__app=self.app)
+            .values_list("message_template_id", flat=True)
+        )
+
+        for template in templates:
+            if template.get("id") in foreign_ids:
+                logger.info(
+                    f"Skipping the template {template.get('id')}, it belongs to another app"
+                )
+                continue
+
+            try:
+                self.add(template)
+            except Exception as error:
+                capture_exception(error)
+
+    def add(self, template: dict) -> None:
+        """
+        Applies a template listed by Meta to the preloaded rows, raises ValueError
+        without applying anything when a value does not fit its column
+        """
+        components = template.get("components") or []
+        body, footer = "", ""
+
+        for component in components:
+            if component.get("type") == "BODY":
+                body = component.get("text", "")
+
+            if component.get("type") == "FOOTER":
+                footer = component.get("text", "")
+
+        translation_values = dict(
+            body=body,
+            footer=footer,
+            status=template.get("status"),
+            variable_count=0,
+            message_template_id=template.get("id"),
+        )
+        headers = [
+            dict(
+                header_type=component.get("format"),
+                text=component.get("text", {}),
+                example=component.get("example", {}).get("header_handle"),
+            )
+            for component in components
+            if component.get("type") == "HEADER"
+        ]
+        buttons = [
+            dict(
+                button_type=button.get("type"),
+                text=button.get("text"),
+                url=button.get("url"),
+                phone_number=button.get("phone_number"),
+            )
+            for component in components
+            if component.get("type") == "BUTTONS"
+            for button in component.get("buttons")
+        ]
+
+        self._validate(TemplateMessage, dict(name=template.get("name")))
+        self._validate(TemplateTranslation, translation_values)
+        for values in headers:
+            self._validate(TemplateHeader, values)
+        for values in buttons:
+            self._validate(TemplateButton, values)
+
+        message = self._get_template(template)
+        self._set(message, category=template.get("category"))
+
+        translation = self._get_translation(message, template.get("language"))
+        self._set(translation, **translation_values)
+        self._index_translation(translation)
+
+        for values in headers:
+            self._add_header(translation, values)
+
+        for values in buttons:
+            self._add_button(translation, values)
+
+        self._added.append(template)
+
+    def commit(self) -> dict:
+        """
+        Writes the collected rows in a single transaction and returns how many
+        were created and updated per model
+        """
+        try:
+            return self._commit()
+        except IntegrityError as error:
+            logger.warning(
+                f"Could not write the templates of the app {self.app.uuid} at once, "
+                f"writing them one by one: {error}"
+            )
+            return self._commit_one_by_one()
+
+    def _commit(self) -> dict:
+        counts = {}
+
+        with transaction.atomic():
+            for model in self._models:
+                created = self._create(model, self._to_create[model])
+                updated = self._update(model, list(self._to_update[model].values()))
+                counts[model._meta.model_name] = dict(created=created, updated=updated)
+
+        self._added = []
+        self._to_create = {model: [] for model in self._models}
+        self._to_update = {model: {} for model in self._models}
+        return counts
+
+    def _commit_one_by_one(self) -> dict:
+        """
+        Applies the templates of the failed page again over the rows stored, each
+        in its own transaction, the ones breaking a constraint are reported to
+        sentry
+        """
+        templates = self._added
+        counts = {
+            model._meta.model_name: dict(created=0, updated=0) for model in self._models
+        }
+
+        # The rolled back rows may hold primary keys that were never stored
+        self._load()
+
+        for template in templates:
+            self.add(template)
+
+            try:
+                template_counts = self._commit()
+            except IntegrityError as error:
+                capture_exception(error)
+                self._load()
+                continue
+
+            for model_name, model_counts in template_counts.items():
+                for field, count in model_counts.items():
+                    counts[model_name][field] += count
+
+        return counts
+
+    def _get_template(self, template: dict) -> TemplateMessage:
+        translation = self._translations_by_id.get(template.get("id"))
+        if translation is not None:
+            return translation.template
+
+        message = self._templates.get(template.get("name"))
+        if message is None:
+            message = TemplateMessage(app=self.app, name=template.get("name"))
+            self._templates[message.name] = message
+            self._to_create[TemplateMessage].append(message)
+
+        return message
+
+    def _get_translation(
+        self, message: TemplateMessage, language: str
+    ) -> TemplateTranslation:
+        translation = self._translations.get((message.uuid, language))
+
+        if translation is None:
+            translation = TemplateTranslation(template=message, language=language)
+            self._to_create[TemplateTranslation].append(translation)
+
+        return translation
+
+    def _add_header(self, translation: TemplateTranslation, values: dict) -> None:
+        key = (translation.uuid, values["header_type"])
+        header = self._headers.get(key)
+
+        if header is None:
+            header = TemplateHeader(translation=translation, **values)
+            self._headers[key] = header
+            self._to_create[TemplateHeader].append(header)
+        else:
+            self._set(header, text=values["text"], example=values["example"])
+
+    def _add_button(self, translation: TemplateTranslation, values: dict) -> None:
+        key = (translation.uuid, *[values[field] for field in self.BUTTON_FIELDS])
+
+        if key not in self._buttons:
+            self._buttons.add(key)
+            self._to_create[TemplateButton].append(
+                TemplateButton(translation=translation, **values)
+            )
+
+    def _set(self, instance: models.Model, **values) -> None:
+        changed = False
+
+        for field, value in values.items():
+            # Compares the value as the column stores it
+            value = instance._meta.get_field(field).to_python(value)
+            if getattr(instance, field) != value:
+                setattr(instance, field, value)
+                changed = True
+
+        if changed and instance.pk is not None:
+            self._to_update[type(instance)][instance.pk] = instance
+
+    def _validate(self, model, values: dict) -> None:
+        for field, value in values.items():
+            max_length = getattr(model._meta.get_field(field), "max_length", None)
+
+            if max_length and value is not None and len(str(value)) > max_length:
+                raise ValueError(
+                    f"{model.__name__}.{field} exceeds {max_length} characters: {value}"
+                )
+
+    def _create(self, model, instances: list) -> int:
+        if not instances:
+            return 0
+
+        model.objects.bulk_create(instances, batch_size=self.batch_size)
+        assign_pks(model, instances)
+        return len(instances)
+
+    def _update(self, model, instances: list) -> int:
+        if not instances:
+            return 0
+
+        fields = {
+            TemplateMessage: ["category"],
+            TemplateTranslation: self.TRANSLATION_FIELDS,
+            TemplateHeader: self.HEADER_FIELDS,
+        }[model]
+        model.objects.bulk_update(instances, fields, batch_size=self.batch_size)
+        return len(instances)
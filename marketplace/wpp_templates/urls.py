@@ -30,3 +30,5 @@ urlpatterns.append(
         include("marketplace.wpp_templates.analytics.urls"),
     ),
 )
+
+urlpatterns.append(path("", include("marketplace.wpp_templates.webhooks.urls")))
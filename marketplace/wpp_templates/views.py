@@ -1,10 +1,8 @@
 import datetime
-import requests
-import re
-import base64
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db.models import OuterRef, Prefetch, Subquery
 import pytz
 
 
@@ -12,33 +10,46 @@ from sentry_sdk import capture_exception
 
 from rest_framework import viewsets
 from rest_framework import status
+from rest_framework import exceptions
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from django.core.exceptions import ValidationError
 
 from marketplace.applications.models import App
+from marketplace.core.pagination import OptionalCursorPagination
 from marketplace.core.types.channels.whatsapp_base.exceptions import (
     FacebookApiException,
 )
 from marketplace.core.types.channels.whatsapp_base.mixins import QueryParamsParser
-from marketplace.core.types.channels.whatsapp_cloud.requests import PhotoAPIRequest
 
 from .models import TemplateHeader, TemplateMessage, TemplateTranslation, TemplateButton
-from .serializers import TemplateMessageSerializer, TemplateTranslationSerializer
+from .bulk import BulkTemplateCreator
+from .serializers import (
+    BulkTemplatesSerializer,
+    TemplateMessageSerializer,
+    TemplateTranslationSerializer,
+)
+from .media import HeaderMediaUploader
 from .requests import TemplateMessageRequest
 from .languages import LANGUAGES
+from .search import (
+    RELEVANCE,
+    SEARCH_CONTAINS,
+    SEARCH_MODES,
+    order_by_relevance,
+    search_templates,
+)
 
 
-WHATSAPP_VERSION = settings.WHATSAPP_VERSION
-
 User = get_user_model()
 
 
-class CustomResultsPagination(PageNumberPagination):
+class CustomResultsPagination(OptionalCursorPagination):
     page_size = 12
     page_size_query_param = "page_size"
     max_page_size = 500
+    cursor_ordering = ("-created_on", "-id")
+    cursor_sort_fields = ("name", "-name", "created_on", "-created_on")
 
 
 class AppsViewSet(viewsets.ViewSet):
@@ -56,6 +67,7 @@ class TemplateMessageViewSet(viewsets.ModelViewSet):
         category = params.get("category")
         order_by = params.get("sort")
         date_params = params.get("start")
+        search = params.get("search")
         filters = {}
 
         if category:
@@ -75,12 +87,29 @@ class TemplateMessageViewSet(viewsets.ModelViewSet):
             filters["created_on__range"] = (start, end)
 
         if name:
-            queryset = queryset.filter(name__icontains=name)
+            filters["name__icontains"] = name
 
         if filters:
-            for field, value in filters.items():
-                queryset = queryset.filter(**{field: value})
-        if order_by:
+            queryset = queryset.filter(**filters)
+
+        if search:
+            mode = params.get("search_mode")
+            if mode not in SEARCH_MODES:
+                mode = SEARCH_CONTAINS
+            queryset = search_templates(queryset, search, mode)
+
+        if order_by == RELEVANCE:
+            # The cursor pages follow an indexed key, a computed score is not one
+            if self.paginator.use_cursor(self.request):
+                raise exceptions.ValidationError(
+                    {
+                        "sort": "The relevance sort is not available with cursor pagination"
+                    }
+                )
+
+            if search:
+                queryset = order_by_relevance(queryset, search)
+        elif order_by:
             queryset = queryset.order_by(order_by)
 
         return queryset
@@ -89,8 +118,29 @@ class TemplateMessageViewSet(viewsets.ModelViewSet):
         app = App.objects.get(uuid=self.kwargs["app_uuid"])
         queryset = TemplateMessage.objects.filter(app=app).order_by("-created_on")
 
+        if self.action in ["list", "retrieve"]:
+            queryset = self.prefetch_translations(queryset)
+
         return queryset
 
+    @staticmethod
+    def prefetch_translations(queryset):
+        """
+        Loads the translations, headers and buttons of a whole page with one query
+        each and annotates the body of the first translation as `text_preview`
+        """
+        translations = TemplateTranslation.objects.order_by("pk").prefetch_related(
+            Prefetch("headers", queryset=TemplateHeader.objects.order_by("pk")),
+            "buttons",
+        )
+        first_body = TemplateTranslation.objects.filter(
+            template=OuterRef("pk")
+        ).order_by("pk")
+
+        return queryset.annotate(
+            text_preview=Subquery(first_body.values("body")[:1])
+        ).prefetch_related(Prefetch("translations", queryset=translations))
+
     def create(self, request, *args, **kwargs):
         request.data.update(self.kwargs)
 
@@ -157,6 +207,18 @@ class TemplateMessageViewSet(viewsets.ModelViewSet):
 
         return Response(status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["POST"])
+    def bulk(self, request, app_uuid=None):
+        serializer = BulkTemplatesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        app = App.objects.get(uuid=app_uuid)
+        results = BulkTemplateCreator(app).create(
+            serializer.validated_data["templates"]
+        )
+
+        return Response(data=dict(results=results), status=status.HTTP_200_OK)
+
     @action(detail=False, methods=["GET"])
     def languages(self, request, app_uuid=None):
         return Response(data=LANGUAGES, status=status.HTTP_200_OK)
@@ -199,34 +261,10 @@ class TemplateMessageViewSet(viewsets.ModelViewSet):
                 or header.get("format") == "DOCUMENT"
                 or header.get("format") == "VIDEO"
             ):
-                photo_api_request = PhotoAPIRequest(
-                    template.app.config.get("wa_waba_id")
-                )
-                photo = header.get("example")
-                file_type = re.search("(?<=data:)(.*)(?=;base64)", photo).group(0)
-                photo = photo.split(";base64,")[1]
-                upload_session_id = photo_api_request.create_upload_session(
-                    access_token,
-                    len(base64.b64decode(photo)),
-                    file_type=file_type,
+                uploader = HeaderMediaUploader(
+                    template.app.config.get("wa_waba_id"), access_token
                 )
-
-                url = (
-                    f"https://graph.facebook.com/{WHATSAPP_VERSION}/{upload_session_id}"
-                )
-                headers = {
-                    "Content-Type": file_type,
-                    "Authorization": f"OAuth {access_token}",
-                }
-                headers["file_offset"] = "0"
-                response = requests.post(
-                    url, headers=headers, data=base64.b64decode(photo)
-                )
-
-                if response.status_code != 200:
-                    raise FacebookApiException(response.json())
-
-                upload_handle = response.json().get("h", "")
+                upload_handle = uploader.upload(header.get("example"))
                 header.pop("example")
                 header["example"] = dict(header_handle=upload_handle)
 
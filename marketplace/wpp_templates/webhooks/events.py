@@ -0,0 +1,92 @@
+"""
+Template events pushed by the Meta webhook.
+
+Meta signs every payload with the app secret, the status and quality changes it
+carries are applied to the translations by `message_template_id`, collapsing a
+batch of events into one UPDATE per distinct value.
+"""
+
+import hashlib
+import hmac
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from marketplace.core.sync.reconciliation import chunked
+from marketplace.wpp_templates.models import TemplateTranslation
+
+
+STATUS_UPDATE = "message_template_status_update"
+QUALITY_UPDATE = "message_template_quality_update"
+TEMPLATE_FIELDS = (STATUS_UPDATE, QUALITY_UPDATE)
+
+# Events that do not match the status stored by the listing
+STATUS_ALIASES = {"REINSTATED": "APPROVED"}
+
+
+def is_valid_signature(body: bytes, signature: str, secret: str) -> bool:
+    """
+    Checks the `X-Hub-Signature-256` header against the HMAC-SHA256 of the raw
+    body, without a configured secret no payload is trusted
+    """
+    if not secret or not signature:
+        return False
+
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(f"sha256={digest}", signature)
+
+
+def get_template_events(payload: dict) -> list:
+    """
+    Extracts the template status and quality changes of a webhook payload,
+    every other subscribed field is ignored
+    """
+    events = []
+
+    for entry in payload.get("entry") or []:
+        for change in entry.get("changes") or []:
+            if change.get("field") not in TEMPLATE_FIELDS:
+                continue
+
+            events.append(dict(change.get("value") or {}, field=change["field"]))
+
+    return events
+
+
+def apply_template_events(events: list) -> int:
+    """
+    Applies the events in their arrival order, so the last change of a template
+    wins, and returns how many translation updates were written
+    """
+    changes = defaultdict(dict)
+
+    for event in events:
+        template_id = event.get("message_template_id")
+        if template_id is None:
+            continue
+
+        # Meta sends the id as a number while the column stores it as text
+        change = changes[str(template_id)]
+
+        if event.get("field") == STATUS_UPDATE and event.get("event"):
+            change["status"] = STATUS_ALIASES.get(event["event"], event["event"])
+
+        if event.get("field") == QUALITY_UPDATE and event.get("new_quality_score"):
+            change["quality_score"] = event["new_quality_score"]
+
+    templates_ids = defaultdict(list)
+    for template_id, change in changes.items():
+        for field, value in change.items():
+            templates_ids[(field, value)].append(template_id)
+
+    updated = 0
+    with transaction.atomic():
+        for (field, value), ids in templates_ids.items():
+            for chunk in chunked(ids, settings.WHATSAPP_TEMPLATES_WEBHOOK_BATCH_SIZE):
+                updated += TemplateTranslation.objects.filter(
+                    message_template_id__in=chunk
+                ).update(**{field: value})
+
+    return updated
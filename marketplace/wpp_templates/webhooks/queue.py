@@ -0,0 +1,116 @@
+"""
+Redis buffer of the template events received by the webhook.
+
+The webhook only pushes the events and schedules a single delayed task for the
+whole burst, the task drains the buffer in batches so a storm of status changes
+turns into a few grouped updates instead of one write per request. A batch is
+moved to a processing list while it is applied and only dropped once applied,
+the batch of a drain that failed is applied first by the next one. A lease lets a
+single drain run at a time, so the processing list only ever holds its batch.
+"""
+
+import json
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from marketplace.core.sync.locks import SyncLease
+
+
+TEMPLATE_EVENTS_KEY = "wpp-templates-webhook-events"
+TEMPLATE_EVENTS_SCHEDULED_KEY = "wpp-templates-webhook-events:scheduled"
+TEMPLATE_EVENTS_PROCESSING_KEY = "wpp-templates-webhook-events:processing"
+TEMPLATE_EVENTS_DRAIN_KEY = "wpp-templates-webhook-events:drain"
+
+# Moves the first events of the buffer to the processing list and returns them
+MOVE_EVENTS_SCRIPT = """
+local events = redis.call("LRANGE", KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #events > 0 then
+    redis.call("RPUSH", KEYS[2], unpack(events))
+    redis.call("LTRIM", KEYS[1], #events, -1)
+end
+return events
+"""
+
+# Lets a lost drain task be scheduled again by the next event
+SCHEDULED_GRACE = 60
+
+
+def push_template_events(events: list) -> bool:
+    """
+    Buffers the events and returns whether a drain must be scheduled, that is,
+    whether no other drain is already waiting for them
+    """
+    redis = get_redis_connection()
+
+    pipeline = redis.pipeline()
+    pipeline.rpush(TEMPLATE_EVENTS_KEY, *[json.dumps(event) for event in events])
+    pipeline.set(
+        TEMPLATE_EVENTS_SCHEDULED_KEY,
+        1,
+        nx=True,
+        ex=settings.WHATSAPP_TEMPLATES_WEBHOOK_BATCH_DELAY + SCHEDULED_GRACE,
+    )
+    _, scheduled = pipeline.execute()
+
+    return bool(scheduled)
+
+
+def pop_template_events(batch_size: int = None):
+    """
+    Yields the buffered events batch by batch, the events pushed while draining
+    are picked up by the same drain. A batch is only removed from redis when the
+    next one is asked for, that is, after the caller applied it. Returns at once
+    while another drain holds the lease
+    """
+    redis = get_redis_connection()
+    batch_size = batch_size or settings.WHATSAPP_TEMPLATES_WEBHOOK_BATCH_SIZE
+    move_events = redis.register_script(MOVE_EVENTS_SCRIPT)
+
+    # Events pushed from now on schedule the next drain
+    redis.delete(TEMPLATE_EVENTS_SCHEDULED_KEY)
+
+    lease = SyncLease(redis, TEMPLATE_EVENTS_DRAIN_KEY)
+    if not lease.acquire():
+        return
+
+    try:
+        # The batch left by a drain that failed while applying it
+        events = redis.lrange(TEMPLATE_EVENTS_PROCESSING_KEY, 0, -1)
+
+        while not lease.lost:
+            if not events:
+                events = move_events(
+                    keys=[TEMPLATE_EVENTS_KEY, TEMPLATE_EVENTS_PROCESSING_KEY],
+                    args=[batch_size],
+                )
+
+            if not events:
+                return
+
+            yield [json.loads(event) for event in events]
+
+            redis.delete(TEMPLATE_EVENTS_PROCESSING_KEY)
+            events = None
+    finally:
+        lease.release()
+
+
+def schedule_pending_template_events() -> bool:
+    """
+    Returns whether a drain must be scheduled for the events left in the buffer,
+    those pushed while another drain held the lease
+    """
+    redis = get_redis_connection()
+
+    if not redis.exists(TEMPLATE_EVENTS_KEY, TEMPLATE_EVENTS_PROCESSING_KEY):
+        return False
+
+    return bool(
+        redis.set(
+            TEMPLATE_EVENTS_SCHEDULED_KEY,
+            1,
+            nx=True,
+            ex=settings.WHATSAPP_TEMPLATES_WEBHOOK_BATCH_DELAY + SCHEDULED_GRACE,
+        )
+    )
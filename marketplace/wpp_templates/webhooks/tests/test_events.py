@@ -0,0 +1,118 @@
+import json
+import os
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from marketplace.applications.models import App
+from marketplace.wpp_templates.models import TemplateMessage, TemplateTranslation
+from marketplace.wpp_templates.webhooks.events import (
+    apply_template_events,
+    get_template_events,
+    is_valid_signature,
+)
+
+
+User = get_user_model()
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_payload(name: str) -> dict:
+    with open(os.path.join(FIXTURES_PATH, f"{name}.json")) as fixture:
+        return json.load(fixture)
+
+
+class SignatureTestCase(SimpleTestCase):
+    body = b'{"object": "whatsapp_business_account"}'
+    # HMAC-SHA256 of the body above with the secret "secret"
+    signature = (
+        "sha256=094150950ffe69f3a6f3481fc94479a1a7cffa627bcb3de261b1c44765de3010"
+    )
+
+    def test_signature_of_the_body_is_accepted(self):
+        self.assertTrue(is_valid_signature(self.body, self.signature, "secret"))
+
+    def test_signature_of_another_body_is_rejected(self):
+        self.assertFalse(is_valid_signature(b"{}", self.signature, "secret"))
+
+    def test_nothing_is_trusted_without_a_secret(self):
+        self.assertFalse(is_valid_signature(self.body, self.signature, ""))
+
+
+class GetTemplateEventsTestCase(SimpleTestCase):
+    def test_status_update_is_extracted(self):
+        events = get_template_events(load_payload("message_template_status_update"))
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["field"], "message_template_status_update")
+        self.assertEqual(events[0]["event"], "APPROVED")
+        self.assertEqual(events[0]["message_template_id"], 1234)
+
+    def test_other_fields_are_ignored(self):
+        payload = load_payload("message_template_status_update")
+        payload["entry"][0]["changes"][0]["field"] = "phone_number_quality_update"
+
+        self.assertEqual(get_template_events(payload), [])
+
+
+class ApplyTemplateEventsTestCase(TestCase):
+    def setUp(self):
+        app = App.objects.create(
+            config=dict(wa_waba_id="432321321"),
+            project_uuid=uuid.uuid4(),
+            platform=App.PLATFORM_WENI_FLOWS,
+            code="wpp-cloud",
+            created_by=User.objects.get_admin_user(),
+        )
+        template = TemplateMessage.objects.create(app=app, name="welcome")
+        for message_template_id in ["1234", "5678"]:
+            TemplateTranslation.objects.create(
+                template=template,
+                status="PENDING",
+                message_template_id=message_template_id,
+            )
+
+    def test_recorded_payloads_are_applied(self):
+        events = get_template_events(load_payload("message_template_status_update"))
+        events += get_template_events(load_payload("message_template_quality_update"))
+
+        self.assertEqual(apply_template_events(events), 2)
+
+        translation = TemplateTranslation.objects.get(message_template_id="1234")
+        self.assertEqual(translation.status, "APPROVED")
+        self.assertEqual(translation.quality_score, "YELLOW")
+        self.assertEqual(
+            TemplateTranslation.objects.get(message_template_id="5678").status,
+            "PENDING",
+        )
+
+    def test_last_event_of_a_template_wins(self):
+        field = "message_template_status_update"
+        events = [
+            dict(field=field, event="REJECTED", message_template_id=1234),
+            dict(field=field, event="APPROVED", message_template_id=1234),
+        ]
+
+        apply_template_events(events)
+
+        translation = TemplateTranslation.objects.get(message_template_id="1234")
+        self.assertEqual(translation.status, "APPROVED")
+
+    def test_events_are_grouped_by_value(self):
+        field = "message_template_status_update"
+        events = [
+            dict(field=field, event="REINSTATED", message_template_id=1234),
+            dict(field=field, event="APPROVED", message_template_id=5678),
+            dict(field=field, event="APPROVED", message_template_id=9999),
+        ]
+
+        # A single UPDATE inside the savepoint
+        with self.assertNumQueries(3):
+            self.assertEqual(apply_template_events(events), 2)
+
+        self.assertEqual(
+            set(TemplateTranslation.objects.values_list("status", flat=True)),
+            {"APPROVED"},
+        )
@@ -0,0 +1,171 @@
+import json
+
+from collections import defaultdict
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from marketplace.core.sync.locks import RELEASE_SCRIPT, RENEW_SCRIPT
+from marketplace.wpp_templates.tasks import apply_template_webhook_events
+from marketplace.wpp_templates.webhooks.queue import (
+    MOVE_EVENTS_SCRIPT,
+    TEMPLATE_EVENTS_KEY,
+    TEMPLATE_EVENTS_PROCESSING_KEY,
+    TEMPLATE_EVENTS_SCHEDULED_KEY,
+    pop_template_events,
+    schedule_pending_template_events,
+)
+
+
+class FakeRedis:
+    """Keeps the strings and lists the template events queue uses in memory"""
+
+    def __init__(self):
+        self.values = {}
+        self.lists = defaultdict(list)
+
+    def set(self, key, value, nx=False, **kwargs):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.lists.pop(key, None)
+
+    def exists(self, *keys):
+        return sum(key in self.values or bool(self.lists.get(key)) for key in keys)
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def rpush(self, key, *values):
+        self.lists[key].extend(values)
+
+    def register_script(self, script):
+        return {
+            MOVE_EVENTS_SCRIPT: self._move,
+            RELEASE_SCRIPT: self._release,
+            RENEW_SCRIPT: lambda keys, args: 1,
+        }[script]
+
+    def _move(self, keys, args):
+        events = self.lists[keys[0]][: int(args[0])]
+        del self.lists[keys[0]][: len(events)]
+        self.lists[keys[1]].extend(events)
+        return events
+
+    def _release(self, keys, args):
+        if self.values.get(keys[0]) == args[0]:
+            self.delete(keys[0])
+
+
+def status_event(message_template_id: int, status: str) -> dict:
+    return dict(
+        field="message_template_status_update",
+        message_template_id=message_template_id,
+        event=status,
+    )
+
+
+class TemplateEventsQueueTestCase(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = FakeRedis()
+        patcher = patch(
+            "marketplace.wpp_templates.webhooks.queue.get_redis_connection",
+            return_value=self.redis,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def push(self, *events):
+        self.redis.rpush(TEMPLATE_EVENTS_KEY, *[json.dumps(event) for event in events])
+
+
+@patch("marketplace.wpp_templates.tasks.apply_template_events", return_value=1)
+class ApplyTemplateWebhookEventsTestCase(TemplateEventsQueueTestCase):
+    @patch("marketplace.wpp_templates.webhooks.queue.settings")
+    def test_buffer_is_drained_in_batches(self, settings_mock, apply_mock):
+        settings_mock.WHATSAPP_TEMPLATES_WEBHOOK_BATCH_SIZE = 2
+        event = status_event(1, "APPROVED")
+        self.push(event, event, event)
+        self.redis.set(TEMPLATE_EVENTS_SCHEDULED_KEY, 1)
+
+        self.assertEqual(apply_template_webhook_events(), 2)
+
+        self.assertNotIn(TEMPLATE_EVENTS_SCHEDULED_KEY, self.redis.values)
+        self.assertEqual(apply_mock.call_args_list[0].args[0], [event, event])
+        self.assertEqual(apply_mock.call_args_list[1].args[0], [event])
+        self.assertFalse(self.redis.exists(TEMPLATE_EVENTS_PROCESSING_KEY))
+        self.assertEqual(self.redis.values, {})
+
+    def test_failed_batch_is_kept_for_the_next_drain(self, apply_mock):
+        event = status_event(1, "APPROVED")
+        self.push(event)
+        apply_mock.side_effect = Exception("database error")
+
+        with self.assertRaises(Exception):
+            apply_template_webhook_events()
+
+        self.assertEqual(
+            self.redis.lists[TEMPLATE_EVENTS_PROCESSING_KEY], [json.dumps(event)]
+        )
+
+        # The next drain applies the batch left in the processing list first
+        apply_mock.side_effect = None
+
+        self.assertEqual(apply_template_webhook_events(), 1)
+        apply_mock.assert_called_with([event])
+        self.assertFalse(self.redis.exists(TEMPLATE_EVENTS_PROCESSING_KEY))
+
+    @patch("marketplace.wpp_templates.tasks.apply_template_webhook_events.apply_async")
+    def test_events_left_to_a_running_drain_are_rescheduled(
+        self, apply_async_mock, apply_mock
+    ):
+        running = pop_template_events()
+        self.push(status_event(1, "PENDING"))
+        next(running)
+
+        self.push(status_event(1, "APPROVED"))
+        self.assertEqual(apply_template_webhook_events(), 0)
+
+        apply_mock.assert_not_called()
+        apply_async_mock.assert_called_once()
+        running.close()
+
+    def test_events_given_are_applied_directly(self, apply_mock):
+        with patch(
+            "marketplace.wpp_templates.webhooks.queue.get_redis_connection"
+        ) as redis_mock:
+            apply_template_webhook_events([dict(message_template_id=1)])
+
+        apply_mock.assert_called_once_with([dict(message_template_id=1)])
+        redis_mock.assert_not_called()
+
+
+class InterleavedDrainsTestCase(TemplateEventsQueueTestCase):
+    def test_second_drain_leaves_the_running_one_alone(self):
+        pending, approved = status_event(1, "PENDING"), status_event(1, "APPROVED")
+        self.push(pending)
+
+        first = pop_template_events(batch_size=1)
+        self.assertEqual(next(first), [pending])
+
+        # Drain B starts while A is still applying its batch
+        self.push(approved)
+        self.assertEqual(list(pop_template_events(batch_size=1)), [])
+        self.assertEqual(
+            self.redis.lists[TEMPLATE_EVENTS_PROCESSING_KEY], [json.dumps(pending)]
+        )
+        self.assertTrue(schedule_pending_template_events())
+
+        # A applies the newer status after the older one, and only once
+        self.assertEqual(list(first), [[approved]])
+        self.assertFalse(self.redis.exists(TEMPLATE_EVENTS_PROCESSING_KEY))
+        self.assertEqual(list(pop_template_events(batch_size=1)), [])
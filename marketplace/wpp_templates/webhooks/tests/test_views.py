@@ -0,0 +1,105 @@
+import hashlib
+import hmac
+import json
+
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from redis.exceptions import ConnectionError
+from rest_framework.test import APIClient
+
+from marketplace.wpp_templates.webhooks.queue import (
+    TEMPLATE_EVENTS_KEY,
+    TEMPLATE_EVENTS_SCHEDULED_KEY,
+)
+from .test_events import load_payload
+
+
+SECRET = "app-secret"
+
+
+@override_settings(
+    WHATSAPP_TEMPLATES_WEBHOOK_APP_SECRET=SECRET,
+    WHATSAPP_TEMPLATES_WEBHOOK_VERIFY_TOKEN="verify-token",
+    WHATSAPP_TEMPLATES_WEBHOOK_BATCH_DELAY=5,
+)
+@patch("marketplace.wpp_templates.webhooks.views.apply_template_webhook_events")
+@patch("marketplace.wpp_templates.webhooks.queue.get_redis_connection")
+class TemplateWebhookViewTestCase(SimpleTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("template-webhook")
+
+    def _post(self, payload: dict, secret: str = SECRET):
+        body = json.dumps(payload).encode()
+        digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            self.url,
+            body,
+            content_type="application/json",
+            HTTP_X_HUB_SIGNATURE_256=f"sha256={digest}",
+        )
+
+    def test_subscription_handshake(self, redis_mock, task_mock):
+        response = self.client.get(
+            self.url,
+            {
+                "hub.mode": "subscribe",
+                "hub.verify_token": "verify-token",
+                "hub.challenge": "1158201444",
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"1158201444")
+
+    def test_handshake_with_wrong_token_is_rejected(self, redis_mock, task_mock):
+        response = self.client.get(
+            self.url,
+            {"hub.mode": "subscribe", "hub.verify_token": "x", "hub.challenge": "1"},
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_unsigned_payload_is_rejected(self, redis_mock, task_mock):
+        response = self._post(load_payload("message_template_status_update"), "x")
+
+        self.assertEqual(response.status_code, 403)
+        redis_mock.assert_not_called()
+
+    def test_events_are_buffered_and_a_drain_is_scheduled(self, redis_mock, task_mock):
+        pipeline = redis_mock.return_value.pipeline.return_value
+        pipeline.execute.return_value = [1, True]
+
+        response = self._post(load_payload("message_template_status_update"))
+
+        self.assertEqual(response.status_code, 200)
+        key, event = pipeline.rpush.call_args.args
+        self.assertEqual(key, TEMPLATE_EVENTS_KEY)
+        self.assertEqual(json.loads(event)["message_template_id"], 1234)
+        self.assertEqual(pipeline.set.call_args.args[0], TEMPLATE_EVENTS_SCHEDULED_KEY)
+        task_mock.apply_async.assert_called_once_with(countdown=5)
+
+    def test_pending_drain_is_not_scheduled_again(self, redis_mock, task_mock):
+        pipeline = redis_mock.return_value.pipeline.return_value
+        pipeline.execute.return_value = [2, None]
+
+        self._post(load_payload("message_template_quality_update"))
+
+        task_mock.apply_async.assert_not_called()
+
+    def test_events_are_applied_directly_without_redis(self, redis_mock, task_mock):
+        redis_mock.side_effect = ConnectionError()
+
+        response = self._post(load_payload("message_template_quality_update"))
+
+        self.assertEqual(response.status_code, 200)
+        (events,) = task_mock.delay.call_args.args
+        self.assertEqual(events[0]["new_quality_score"], "YELLOW")
+
+    def test_payload_without_template_events(self, redis_mock, task_mock):
+        response = self._post(dict(object="whatsapp_business_account", entry=[]))
+
+        self.assertEqual(response.status_code, 200)
+        redis_mock.assert_not_called()
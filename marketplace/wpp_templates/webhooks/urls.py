@@ -0,0 +1,12 @@
+from django.urls import path
+
+from marketplace.wpp_templates.webhooks.views import TemplateWebhookView
+
+
+urlpatterns = [
+    path(
+        "webhooks/whatsapp/templates/",
+        TemplateWebhookView.as_view(),
+        name="template-webhook",
+    )
+]
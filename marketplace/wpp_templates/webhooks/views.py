@@ -0,0 +1,78 @@
+import json
+import logging
+
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.http import HttpResponse
+from redis.exceptions import RedisError
+from rest_framework import status, views
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from marketplace.wpp_templates.tasks import apply_template_webhook_events
+from .events import get_template_events, is_valid_signature
+from .queue import push_template_events
+
+
+if TYPE_CHECKING:
+    from rest_framework.request import Request
+
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateWebhookView(views.APIView):
+    """
+    Receives the template status and quality updates Meta pushes for the
+    subscribed WABAs
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request: "Request") -> HttpResponse:
+        verify_token = settings.WHATSAPP_TEMPLATES_WEBHOOK_VERIFY_TOKEN
+
+        if (
+            verify_token
+            and request.query_params.get("hub.mode") == "subscribe"
+            and request.query_params.get("hub.verify_token") == verify_token
+        ):
+            return HttpResponse(request.query_params.get("hub.challenge", ""))
+
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+
+    def post(self, request: "Request") -> Response:
+        # The signature covers the raw body, so it is read before any parsing
+        body = request.body
+
+        if not is_valid_signature(
+            body,
+            request.headers.get("X-Hub-Signature-256", ""),
+            settings.WHATSAPP_TEMPLATES_WEBHOOK_APP_SECRET,
+        ):
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            events = get_template_events(json.loads(body))
+        except (ValueError, AttributeError):
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+        if events:
+            self.enqueue(events)
+
+        return Response(status=status.HTTP_200_OK)
+
+    def enqueue(self, events: list) -> None:
+        try:
+            scheduled = push_template_events(events)
+        except RedisError as error:
+            logger.warning(f"Could not buffer the template events: {error}")
+            apply_template_webhook_events.delay(events)
+            return
+
+        if scheduled:
+            apply_template_webhook_events.apply_async(
+                countdown=settings.WHATSAPP_TEMPLATES_WEBHOOK_BATCH_DELAY
+            )